@@ -14,6 +14,25 @@ class Aero(Component):
         self.add_output('drag', 0.0, desc='drag force', units='N')
 
     def solve_nonlinear(self, params, unknowns, resids):
-        # drag = Cd * rho * Velocity ** 2 * Area / 2.0
-        unknowns['drag'] = params['coef_drag'] * params['rho'] * params['velocity_capsule'] ** 2 * params['area_frontal'] / 2.0
+        unknowns['drag'] = Aero.calc(params['coef_drag'], params['rho'], params['velocity_capsule'], params['area_frontal'])
         unknowns['net_force'] = params['gross_thrust'] - unknowns['drag']
+
+    def linearize(self, params, unknowns, resids):
+        J = {}
+        J['drag', 'coef_drag'] = params['rho'] * params['velocity_capsule'] ** 2 * params['area_frontal'] / 2.0
+        J['drag', 'rho'] = params['coef_drag'] * params['velocity_capsule'] ** 2 * params['area_frontal'] / 2.0
+        J['drag', 'velocity_capsule'] = params['coef_drag'] * params['rho'] * params['velocity_capsule'] * params['area_frontal']
+        J['drag', 'area_frontal'] = params['coef_drag'] * params['rho'] * params['velocity_capsule'] ** 2 / 2.0
+        for name in ('coef_drag', 'rho', 'velocity_capsule', 'area_frontal'):
+            J['net_force', name] = -J['drag', name]
+        J['net_force', 'gross_thrust'] = 1.0
+        return J
+
+    @staticmethod
+    def calc(coef_drag, rho, velocity_capsule, area_frontal):
+        '''
+        Drag force in N; arguments may be scalars or NumPy arrays, which are
+        broadcast against each other.
+        '''
+        # drag = Cd * rho * Velocity ** 2 * Area / 2.0
+        return coef_drag * rho * velocity_capsule ** 2 * area_frontal / 2.0
@@ -0,0 +1,326 @@
+'''
+benchmark.py -
+    Times setup and run() of every model in the package and writes the
+    statistics as JSON, so that results from different commits can be
+    compared with `compare` (or the --compare command line option).
+
+    python benchmark.py -o bench.json
+    python benchmark.py -o new.json --compare bench.json
+'''
+
+import sys
+import json
+import platform
+import subprocess
+from os import devnull, path
+from argparse import ArgumentParser
+from datetime import datetime
+from timeit import default_timer as timer
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+
+from cycle.compression_system import CompressionSystem
+from cycle.splitter import SplitterW
+from cycle.transmogrifier import Transmogrifier
+from geometry.air_bearing import AirBearing
+from geometry.battery import Battery
+from geometry.inlet import InletGeom
+from geometry.passenger_capsule import PassengerCapsule
+from geometry.pod import Pod
+from geometry.tube_structure import TubeStructural
+from aero import Aero
+from hyperloop_sim import HyperloopSim
+from tube_limit_flow import TubeLimitFlow, limit_flow
+from tube_wall_temp import TubeWallTemp
+from mission import simulate_mission
+from continuation import Continuation
+from cache import code_version
+from sweep import sweep
+from template import ProblemTemplate
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# converged HyperloopSim problem whose subsystems are timed in place
+_model = None
+# HyperloopSim template whose pooled problem is reset for every repeat
+_template = None
+
+
+def _quiet(func, *args):
+    '''Calls func(*args) with stdout discarded; pyCycle solvers print freely.'''
+    sys.stdout = open(devnull, 'w')
+    try:
+        return func(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+
+
+def _standalone(system, settings=()):
+    '''Sets up a problem holding `system` as 'comp' and applies settings.'''
+    p = Problem(root=Group())
+    p.root.add('comp', system)
+    p.setup(check=False)
+    for name, val in settings:
+        p['comp.' + name] = val
+    return p
+
+
+def _model_problem():
+    '''Returns the converged default HyperloopSim problem, built on first use.'''
+    global _model
+    if _model is None:
+        _model = HyperloopSim.p_factory()
+        _quiet(_model.run)
+    return _model
+
+
+def _copy_state(system, p):
+    '''
+    Gives 'comp' in `p` the unknowns of `system`, an instance of the same
+    class, and the values `system` receives for the params 'comp' leaves
+    unconnected.
+    '''
+    comp = p.root.find_subsystem('comp')
+    for name in system.unknowns:
+        comp.unknowns[name] = system.unknowns[name]
+    for name, paths in p.root._probdata.dangling.items():
+        rel_name = sorted(paths)[0][len('comp.'):]
+        if rel_name in system.params:
+            p[name] = system.params[rel_name]
+
+
+def _in_model(system_class, pathname):
+    '''
+    Returns a setup function for a pyCycle block: it sets up a standalone
+    problem holding a new `system_class` and copies the inputs and converged
+    outputs of the instance at `pathname` in the HyperloopSim problem to it,
+    so that its run is timed with the flow conditions of the full model.
+    '''
+    def setup():
+        p = _standalone(system_class())
+        _copy_state(_model_problem().root.find_subsystem(pathname), p)
+        return p
+
+    return setup
+
+
+def _template_problem():
+    global _template
+    if _template is None:
+        _template = ProblemTemplate()
+    return _template.checkout()
+
+
+def _run_template(p):
+    '''Runs a problem checked out by `_template_problem` and returns it to the pool.'''
+    try:
+        p.run()
+    finally:
+        _template.release(p)
+
+
+def _tube_limit_flow(engine):
+    def setup():
+        system = TubeLimitFlow(engine=engine)
+        system.ln_solver = ScipyGMRES()
+        p = Problem(root=Group())
+        p.root.add('comp', system)
+        p.root.ln_solver = ScipyGMRES()
+        p.setup(check=False)
+        p['comp.tube_r'] = 1.5
+        p['comp.inlet_area'] = 1.4
+        p['comp.Mach'] = 0.7
+        return p
+    return setup
+
+
+def _tube_wall_temp(mode='balance'):
+    return _standalone(TubeWallTemp(mode), (('flow_nozzle:in:Tt', 1710.0),
+            ('flow_nozzle:in:Pt', 0.304434211), ('flow_nozzle:in:W', 1.08),
+            ('flow_bearings:in:W', 0.0), ('r_tube_outer', 2.22504 / 2.0),
+            ('tube_len', 482803.0), ('n_pods', 34), ('temp_ambient', 305.6)))
+
+
+def _run(p):
+    p.run()
+
+
+def _sweep_pod_MN(p):
+    sweep(np.linspace(0.2, 0.5, 8), 'pod_MN', ['bypass_W', 'comp1_cfm'], p=p)
+
+
+def _sweep_pod_MN_continuation(p):
+    sweep(np.linspace(0.2, 0.5, 8), 'pod_MN', ['bypass_W', 'comp1_cfm'],
+            continuation=Continuation(p, 'pod_MN'))
+
+
+def _simulate_full_route(p):
+    simulate_mission(560000.0, dt=0.1)
+
+
+def _limit_flow_grid(p):
+    limit_flow(np.linspace(0.2, 1.0, 100)[:, None, None], np.linspace(1.0, 2.0, 100)[None, :, None],
+            np.linspace(0.5, 1.4, 10)[None, None, :])
+
+
+# (name, setup, run): setup() returns the object that is passed to run()
+CASES = [
+    ('HyperloopSim.p_factory', HyperloopSim.p_factory, _run),
+    ('HyperloopSim.template', _template_problem, _run_template),
+    ('CompressionSystem', _in_model(CompressionSystem, 'compression_system'), _run),
+    ('SplitterW', _in_model(SplitterW, 'split'), _run),
+    ('Transmogrifier', _in_model(Transmogrifier, 'compression_system.diffuser'), _run),
+    ('TubeLimitFlow.pycycle', _tube_limit_flow('pycycle'), _run),
+    ('TubeLimitFlow.analytic', _tube_limit_flow('analytic'), _run),
+    ('TubeWallTemp', _tube_wall_temp, _run),
+    ('TubeWallTemp.equilibrium', lambda: _tube_wall_temp('equilibrium'), _run),
+    ('Pod', lambda: _standalone(Pod()), _run),
+    ('PassengerCapsule', lambda: _standalone(PassengerCapsule()), _run),
+    ('TubeStructural', lambda: _standalone(TubeStructural()), _run),
+    ('InletGeom', lambda: _standalone(InletGeom()), _run),
+    ('Battery', lambda: _standalone(Battery()), _run),
+    ('AirBearing', lambda: _standalone(AirBearing()), _run),
+    ('Aero', lambda: _standalone(Aero()), _run),
+    ('sweep.pod_MN', HyperloopSim.p_factory, _sweep_pod_MN),
+    ('sweep.pod_MN.continuation', HyperloopSim.p_factory, _sweep_pod_MN_continuation),
+    ('limit_flow.grid', lambda: None, _limit_flow_grid),
+    ('simulate_mission.full_route', lambda: None, _simulate_full_route),
+]
+
+
+def summarize(times):
+    '''Returns the statistics recorded for a list of timings in seconds.'''
+    times = np.asarray(times, dtype=float)
+    stats = {'n': len(times), 'mean': float(times.mean()), 'min': float(times.min()),
+            'max': float(times.max()), 'median': float(np.median(times))}
+    for q, val in zip(PERCENTILES, np.percentile(times, PERCENTILES)):
+        stats['p%d' % q] = float(val)
+    return stats
+
+
+def time_case(setup, run, repeats=5, warmup=1):
+    '''
+    Times `repeats` fresh setups, each followed by a single run, after
+    `warmup` untimed setup and run pairs.
+
+    Returns
+    -------
+    dict
+        Statistics of the 'setup' and 'run' timings, or an 'error' message
+        if either raised an exception.
+    '''
+    setup_times = []
+    run_times = []
+    try:
+        for i in range(warmup + repeats):
+            start = timer()
+            p = _quiet(setup)
+            mid = timer()
+            _quiet(run, p)
+            end = timer()
+            if i >= warmup:
+                setup_times.append(mid - start)
+                run_times.append(end - mid)
+    except Exception as e:
+        return {'error': '%s: %s' % (type(e).__name__, e)}
+    return {'setup': summarize(setup_times), 'run': summarize(run_times)}
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                cwd=path.dirname(path.abspath(__file__))).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, repeats=5, warmup=1, cases=CASES):
+    '''
+    Times every case (or the ones whose name contains one of `names`) and
+    returns the results with metadata describing the environment.
+    '''
+    results = {}
+    for name, setup, run in cases:
+        if names and not any(n in name for n in names):
+            continue
+        results[name] = time_case(setup, run, repeats, warmup)
+    return {
+        'meta': {
+            'commit': _commit(),
+            'code_version': code_version(),
+            'date': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeats': repeats,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def compare(old, new, tolerance=0.1, phase='run'):
+    '''
+    Compares the median timings of two `run_benchmarks` results.
+
+    Returns
+    -------
+    list of tuple
+        (name, old median, new median, ratio, regressed) for every case
+        timed successfully in both, where regressed is True if the new
+        median is slower by more than `tolerance` (a fraction).
+    '''
+    rows = []
+    for name in sorted(new['results']):
+        before = old['results'].get(name, {}).get(phase)
+        after = new['results'][name].get(phase)
+        if before is None or after is None:
+            continue
+        ratio = after['median'] / before['median']
+        rows.append((name, before['median'], after['median'], ratio, ratio > 1.0 + tolerance))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Times setup and run of the hyperloop models.')
+    parser.add_argument('-o', '--output', default='bench.json', help='JSON file to write')
+    parser.add_argument('-n', '--repeats', type=int, default=5)
+    parser.add_argument('-w', '--warmup', type=int, default=1)
+    parser.add_argument('-k', '--select', action='append',
+            help='only run cases whose name contains this text (repeatable)')
+    parser.add_argument('--compare', help='earlier JSON output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+            help='fractional slowdown of a median reported as a regression')
+    args = parser.parse_args()
+
+    data = run_benchmarks(args.select, args.repeats, args.warmup)
+    with open(args.output, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+    print '%-28s %12s %12s' % ('case', 'setup (ms)', 'run (ms)')
+    for name, _, _ in CASES:
+        if name not in data['results']:
+            continue
+        result = data['results'][name]
+        if 'error' in result:
+            print '%-28s %s' % (name, result['error'])
+        else:
+            print '%-28s %12.3f %12.3f' % (name, 1e3 * result['setup']['median'],
+                    1e3 * result['run']['median'])
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        rows = compare(old, data, args.tolerance)
+        print ''
+        print '%-28s %12s %12s %8s' % ('case', 'old (ms)', 'new (ms)', 'ratio')
+        for name, before, after, ratio, regressed in rows:
+            print '%-28s %12.3f %12.3f %8.2f%s' % (name, 1e3 * before, 1e3 * after, ratio,
+                    '  REGRESSION' if regressed else '')
+        if any(row[4] for row in rows):
+            sys.exit(1)
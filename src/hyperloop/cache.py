@@ -0,0 +1,202 @@
+'''
+cache.py -
+    On-disk cache of converged OpenMDAO solutions, keyed by a hash of every
+    boundary input of the problem and of the model source code.
+'''
+
+import os
+import hashlib
+import tempfile
+from time import time
+
+import numpy as np
+
+from openmdao.solvers.run_once import RunOnce
+
+from util import input_names, set_unknowns
+
+_code_version = None
+
+
+def code_version():
+    '''Hash of the source of every module in the hyperloop package.'''
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha1()
+        root = os.path.dirname(os.path.abspath(__file__))
+        for dirpath, dirnames, filenames in sorted(os.walk(root)):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.py'):
+                    digest.update(filename.encode('utf-8'))
+                    with open(os.path.join(dirpath, filename), 'rb') as f:
+                        digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+class SolverWatch(object):
+    '''
+    Records, while active, whether every iterative nonlinear solver under
+    `root` stopped before reaching its iteration limit. OpenMDAO's Newton
+    and Gauss-Seidel solvers return quietly at maxiter, so this is the only
+    sign of an unconverged solve that does not cost another evaluation.
+    '''
+
+    def __init__(self, root):
+        self.converged = True
+        self._originals = []
+        for group in root.subgroups(recurse=True, include_self=True):
+            solver = group.nl_solver
+            if not isinstance(solver, RunOnce) and 'maxiter' in solver.options:
+                self._wrap(solver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for solver, original in reversed(self._originals):
+            if original is None:
+                del solver.solve
+            else:
+                solver.solve = original
+        self._originals = []
+
+    def _wrap(self, solver):
+        solve = solver.solve
+        self._originals.append((solver, solver.__dict__.get('solve')))
+
+        def watched_solve(*args, **kwargs):
+            result = solve(*args, **kwargs)
+            if getattr(solver, 'iter_count', 0) >= solver.options['maxiter']:
+                self.converged = False
+            return result
+
+        solver.solve = watched_solve
+
+
+class ResultCache(object):
+    '''
+    Stores the unknowns vector of converged problems on disk so that a
+    repeated configuration is restored instead of solved again.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the cache entries; created if it does not exist.
+    max_entries : int
+        Least recently used entries are removed beyond this count.
+    version : str
+        Code version included in every key. Defaults to `code_version()`,
+        so editing any module of the package invalidates the cache.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Lookups answered from the cache and lookups that required a solve,
+        counted for this instance (i.e. per process).
+    unconverged : int
+        Solves that were not stored because an iterative solver stopped at
+        its iteration limit.
+    time_saved : float
+        Sum of the original solve times of every hit, in seconds.
+    '''
+
+    def __init__(self, path, max_entries=1000, version=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.version = code_version() if version is None else version
+        self.hits = 0
+        self.misses = 0
+        self.unconverged = 0
+        self.time_saved = 0.0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def key(self, p):
+        '''Hash of the code version, variable layout and boundary inputs of `p`.'''
+        digest = hashlib.sha1(self.version.encode('utf-8'))
+        for name in sorted(p.root.unknowns):
+            digest.update(('%s:%d;' % (name, p.root.unknowns.metadata(name)['size']))
+                    .encode('utf-8'))
+        for name in sorted(input_names(p)):
+            digest.update(name.encode('utf-8'))
+            digest.update(np.ascontiguousarray(p[name], dtype=float).tobytes())
+        return digest.hexdigest()
+
+    def run(self, p, run=None):
+        '''
+        Restores the cached solution for the current inputs of `p`, or runs
+        it and stores the result.
+
+        Parameters
+        ----------
+        p : openmdao.core.problem.Problem
+        run : function
+            Called to solve the problem on a miss. Defaults to p.run.
+        '''
+        key = self.key(p)
+        filename = os.path.join(self.path, key + '.npz')
+        try:
+            with open(filename, 'rb') as f:
+                entry = np.load(f)
+                vec, solve_time = entry['unknowns'], float(entry['solve_time'])
+        except (IOError, OSError, KeyError, ValueError):
+            pass
+        else:
+            if vec.shape == p.root.unknowns.vec.shape:
+                set_unknowns(p, vec)
+                os.utime(filename, None)
+                self.hits += 1
+                self.time_saved += solve_time
+                return
+
+        if run is None:
+            # p.run of an attached problem would route back through a cache
+            run = getattr(p.run, 'uncached_run', p.run)
+        self.misses += 1
+        start_time = time()
+        with SolverWatch(p.root) as watch:
+            run()
+        if watch.converged:
+            self._store(filename, p.root.unknowns.vec, time() - start_time)
+        else:
+            self.unconverged += 1
+
+    def attach(self, p):
+        '''Routes every later call of p.run() through this cache; attaching twice has no effect.'''
+        if getattr(p.run, 'result_cache', None) is self:
+            return p
+        run = getattr(p.run, 'uncached_run', p.run)
+
+        def cached_run():
+            self.run(p, run)
+
+        cached_run.result_cache = self
+        cached_run.uncached_run = run
+        p.run = cached_run
+        return p
+
+    def clear(self):
+        '''Removes every entry.'''
+        for filename in self._entries():
+            os.remove(filename)
+
+    def _entries(self):
+        return [os.path.join(self.path, filename) for filename in os.listdir(self.path)
+                if filename.endswith('.npz')]
+
+    def _store(self, filename, vec, solve_time):
+        fd, tmp_name = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, unknowns=vec, solve_time=solve_time)
+        os.rename(tmp_name, filename)
+
+        entries = self._entries()
+        if len(entries) > self.max_entries:
+            entries.sort(key=os.path.getmtime)
+            for old in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass # another process evicted it first
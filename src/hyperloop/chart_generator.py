@@ -1,14 +1,15 @@
 from hyperloop_sim import HyperloopSim
+from sweep import sweep
 from openmdao.units.units import convert_units as cu
 from matplotlib import pyplot, rcParams
 import numpy as np
 from time import time
 import sys
-from os import devnull
 
 def plot(p, x_array, x_varname, y_varnames, x_label, y_label,
         title='HyperloopSim', postprocess_funcs=tuple(),
-        show=True, filename='', suppress_errs=True):
+        show=True, filename='', suppress_errs=True, n_procs=1,
+        factory_kwargs=None, settings=None, continuation=None, cache=None):
     '''
     Runs an OpenMDAO problem for multiple values of x and plots the specified
     results.
@@ -16,6 +17,7 @@ def plot(p, x_array, x_varname, y_varnames, x_label, y_label,
     Parameters
     ----------
     p : openmdao.core.problem.problem
+        Problem to run when `n_procs` is 1.
     x_array : numpy.array
         X values to sample.
     x_varname : str
@@ -35,45 +37,62 @@ def plot(p, x_array, x_varname, y_varnames, x_label, y_label,
     filename : str
         If specified, the location to save a PNG of the plot.
     suppress_errs : bool
-        Attempts to plot data instead of raising an exception if OpenMDAO
-        encounters an error.
+        Plots the remaining points, leaving gaps, instead of raising an
+        exception if OpenMDAO encounters an error at some values of x.
+    n_procs : int
+        Number of worker processes to spread the points over; None uses
+        every CPU. Each worker builds its own problem from `factory_kwargs`
+        and `settings` instead of using `p`.
+    factory_kwargs : dict
+        Keyword arguments for `HyperloopSim.p_factory` in worker processes.
+    settings : sequence of (str, value)
+        Values assigned to each worker problem after the factory.
+    continuation : continuation.Continuation
+        Warm-starts each point from the converged states of the previous
+        points; the sweep then runs serially on `continuation.p`, whose
+        solvers are restored when it ends.
+    cache : cache.ResultCache
+        Restores points that were solved before instead of running them.
     '''
     progress_width = 50
-    y_arrays = list([] for varname in y_varnames)
-    opt_num = 0
     print 'Running optimizations...'
     print ''
     start_time = time()
-    for val in x_array:
+
+    def progress(n_done, n_total):
         elapsed_s = time() - start_time
-        progress = float(opt_num) / len(x_array)
-        remaining = elapsed_s / progress - elapsed_s if progress > 0 else float('nan')
+        fraction = float(n_done) / n_total
+        remaining = elapsed_s / fraction - elapsed_s if fraction > 0 else float('nan')
         sys.stdout.write('[%s] %.2f minutes remaining    \r' %
-            ('#' * int(progress * progress_width) + '-' * (progress_width - int(progress * progress_width)),
+            ('#' * int(fraction * progress_width) + '-' * (progress_width - int(fraction * progress_width)),
             float(remaining) / 60))
         sys.stdout.flush()
-        p[x_varname] = val
-        sys.stdout = open(devnull, 'w')
-        try:
-            p.run()
-            sys.stdout.close()
-            sys.stdout = sys.__stdout__
-            for i in range(len(y_varnames)):
-                out = p[y_varnames[i]]
-                if len(postprocess_funcs) > i and postprocess_funcs[i] != None:
-                    out = postprocess_funcs[i](out)
-                y_arrays[i].append(out)
-        except:
-            sys.stdout.close()
-            sys.stdout = sys.__stdout__
-            print 'WARNING: Error encountered running system. Plotting prematurely.'
-            break
-        opt_num += 1
+
+    progress(0, len(x_array))
+    y_arrays, errors = sweep(x_array, x_varname, y_varnames, p=p, n_procs=n_procs,
+            factory_kwargs=factory_kwargs, settings=settings, callback=progress,
+            continuation=continuation, cache=cache)
     sys.stdout.write('[%s] %.2f minutes elapsed    \r' %
-        ('#' * progress_width, float(elapsed_s) / 60))
+        ('#' * progress_width, float(time() - start_time) / 60))
     sys.stdout.flush()
     print ''
     print ''
+    if errors:
+        if not suppress_errs:
+            index = min(errors)
+            raise RuntimeError('Error encountered running system at %s = %s: %s' %
+                    (x_varname, x_array[index], errors[index]))
+        print 'WARNING: Errors encountered running system at %d of %d points. Plotting remaining ' \
+                'points.' % (len(errors), len(x_array))
+    if cache is not None:
+        print 'Cache hits: %d, misses: %d, solve time avoided: %.1f s' % (cache.hits,
+                cache.misses, cache.time_saved)
+    if continuation is not None and continuation.iterations_saved:
+        print 'Solver iterations saved by continuation:', \
+                np.nansum(continuation.iterations_saved), continuation.iterations_saved
+    for i in range(len(y_varnames)):
+        if len(postprocess_funcs) > i and postprocess_funcs[i] != None:
+            y_arrays[i] = [postprocess_funcs[i](out) for out in y_arrays[i]]
     colors = ('r', 'g', 'b', 'c', 'm', 'y', 'k')
 
     f = pyplot.figure()
@@ -118,8 +137,8 @@ if __name__ == "__main__":
 
    # Compressor CFM
     p['percent_into_bypass'] = 1.0 - p['inlet_area'] / p['tube_area']
-    p['compression_system.comp1.eff_design'] = 0.8
-    p['compression_system.comp1.PR_design'] = 1.5
+    p['comp1_eff_design'] = 0.8
+    p['comp1_PR_design'] = 1.5
     plot(p, x_array=np.arange(0.05, 0.5875, 0.0125),
             x_varname='pod_MN',
             y_varnames=('comp1_cfm',),
@@ -0,0 +1,223 @@
+'''
+climate.py -
+    Evaluates the tube wall heat balance of TubeWallTemp for every row of a
+    weather file (e.g. a year of hourly ambient temperature and insolation),
+    chunk by chunk with NumPy arrays, and streams the per-row equilibrium
+    results to a CSV or .npy file.
+
+    python climate.py weather.csv -o results.npy --pod-W-cp 491.8 --pod-W-cp-Tt 467240
+'''
+
+from math import pi
+from itertools import islice
+
+import numpy as np
+
+from tube_wall_temp import natural_convection, solar_flux, radiated_flux, equilibrium_temp
+
+# weather columns, in the order assumed for plain 2D arrays; n_pods is optional
+WEATHER_COLUMNS = ('temp_ambient', 'insolation', 'n_pods')
+
+RESULT_DTYPE = np.dtype([(name, float) for name in ('temp_ambient', 'insolation', 'n_pods',
+        'temp_equilibrium', 'Qsolar_tot', 'Qradiated_tot', 'Qradiated_nat_convection_tot',
+        'heat_rate_tot', 'Qout_tot', 'Qin_tot', 'Ra')] + [('Ra_valid', bool)])
+
+# upper end of the Rayleigh number range of the Churchill-Chu correlation
+RA_MAX = 1e12
+
+
+def _columns(names, columns):
+    '''Maps every weather column to its index in `names`.'''
+    columns = dict(columns or {})
+    index = {}
+    for name in WEATHER_COLUMNS:
+        source = columns.get(name, name)
+        if source in names:
+            index[name] = names.index(source)
+        elif name != 'n_pods':
+            raise ValueError('weather data has no %r column (columns: %s)' %
+                    (source, ', '.join(names)))
+    return index
+
+
+def _array_chunks(data, chunksize, columns):
+    if data.dtype.names:
+        index = _columns(list(data.dtype.names), columns)
+        names = data.dtype.names
+        for start in range(0, len(data), chunksize):
+            chunk = data[start:start + chunksize]
+            yield dict((name, np.asarray(chunk[names[i]], dtype=float))
+                    for name, i in index.items())
+    else:
+        if data.ndim != 2:
+            raise ValueError('weather array must be structured or 2D, not %dD' % data.ndim)
+        index = _columns(list(WEATHER_COLUMNS[:data.shape[1]]), columns)
+        for start in range(0, len(data), chunksize):
+            chunk = data[start:start + chunksize]
+            yield dict((name, np.asarray(chunk[:, i], dtype=float))
+                    for name, i in index.items())
+
+
+def _csv_chunks(filename, chunksize, columns, delimiter):
+    with open(filename) as f:
+        names = [name.strip() for name in f.readline().split(delimiter)]
+        index = _columns(names, columns)
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                break
+            chunk = np.loadtxt(lines, delimiter=delimiter, ndmin=2)
+            yield dict((name, chunk[:, i]) for name, i in index.items())
+
+
+def weather_chunks(source, chunksize=8760, columns=None, delimiter=','):
+    '''
+    Yields the weather data in `source` as dicts of float arrays of at most
+    `chunksize` rows, keyed by 'temp_ambient' (degK), 'insolation'
+    (W/m**2) and, if present, 'n_pods'.
+
+    Parameters
+    ----------
+    source : str or numpy.array
+        CSV file with a header line, .npy file (memory mapped, so only the
+        current chunk is read), or an array. Structured arrays and CSV files
+        are read by column name; plain 2D arrays hold the columns in the
+        order of WEATHER_COLUMNS.
+    columns : dict
+        Column names in `source` keyed by weather column, for files that
+        name them differently, e.g. {'temp_ambient': 'T_K'}.
+    '''
+    if isinstance(source, basestring):
+        if source.endswith('.npy'):
+            source = np.load(source, mmap_mode='r')
+        else:
+            return _csv_chunks(source, chunksize, columns, delimiter)
+    return _array_chunks(np.asarray(source), chunksize, columns)
+
+
+def _n_rows(source, delimiter=','):
+    if isinstance(source, basestring):
+        if source.endswith('.npy'):
+            return len(np.load(source, mmap_mode='r'))
+        with open(source) as f:
+            return sum(1 for line in f if line.strip()) - 1
+    return len(source)
+
+
+def evaluate(weather, pod_W_cp, pod_W_cp_Tt, n_pods=34, r_tube_outer=3.006, tube_len=482803.0,
+        reflectance=0.5, nn_incidence_factor=0.7, emissivity=0.5, sb_const=5.670373e-8):
+    '''
+    Solves the equilibrium wall temperature for one chunk of weather data
+    and evaluates the TubeWallTemp heat terms there.
+
+    Rows outside the range of the convection correlation are evaluated
+    anyway and flagged with Ra_valid = False rather than raising, so one bad
+    hour does not stop a year long sweep. `n_pods` is used where the
+    weather has no n_pods column; pod_W_cp and pod_W_cp_Tt are the
+    TubeWallTemp outputs of the same name.
+
+    Returns
+    -------
+    numpy.array
+        Structured array with the fields of RESULT_DTYPE.
+    '''
+    temp_ambient = weather['temp_ambient']
+    insolation = weather['insolation']
+    n_pods = np.broadcast_to(weather.get('n_pods', n_pods), temp_ambient.shape)
+
+    T = equilibrium_temp(temp_ambient, insolation, n_pods, pod_W_cp, pod_W_cp_Tt, r_tube_outer,
+            tube_len, reflectance, nn_incidence_factor, emissivity, sb_const)
+    h, Gr, Ra = natural_convection(T, temp_ambient, r_tube_outer, check_range=False)[:3]
+
+    area = pi * tube_len * 2.0 * r_tube_outer
+    result = np.empty(temp_ambient.shape, dtype=RESULT_DTYPE)
+    result['temp_ambient'] = temp_ambient
+    result['insolation'] = insolation
+    result['n_pods'] = n_pods
+    result['temp_equilibrium'] = T
+    result['Qsolar_tot'] = solar_flux(insolation, reflectance, nn_incidence_factor) * \
+            tube_len * 2.0 * r_tube_outer
+    result['Qradiated_tot'] = radiated_flux(T, temp_ambient, emissivity, sb_const) * area
+    result['Qradiated_nat_convection_tot'] = h * (T - temp_ambient) * area
+    result['heat_rate_tot'] = n_pods * (pod_W_cp_Tt - pod_W_cp * T)
+    result['Qout_tot'] = result['Qradiated_tot'] + result['Qradiated_nat_convection_tot']
+    result['Qin_tot'] = result['Qsolar_tot'] + result['heat_rate_tot']
+    result['Ra'] = Ra
+    result['Ra_valid'] = np.abs(Ra) <= RA_MAX
+    return result
+
+
+def iter_climate(source, pod_W_cp, pod_W_cp_Tt, chunksize=8760, columns=None, **kwargs):
+    '''
+    Yields the `evaluate` results for every chunk of `weather_chunks(source)`.
+    Extra keyword arguments are passed to `evaluate`.
+    '''
+    for weather in weather_chunks(source, chunksize, columns):
+        yield evaluate(weather, pod_W_cp, pod_W_cp_Tt, **kwargs)
+
+
+def climate_sweep(source, pod_W_cp, pod_W_cp_Tt, output=None, chunksize=8760, columns=None,
+        **kwargs):
+    '''
+    Evaluates every row of `source` (see `weather_chunks`) and writes the
+    results as they are computed.
+
+    Parameters
+    ----------
+    output : str
+        A .npy file (written through a memory map) or a CSV file with a
+        header line. If None the results are returned instead.
+    kwargs :
+        Passed to `evaluate`.
+
+    Returns
+    -------
+    numpy.array or int
+        The structured results if `output` is None, otherwise the number
+        of rows written.
+    '''
+    chunks = iter_climate(source, pod_W_cp, pod_W_cp_Tt, chunksize, columns, **kwargs)
+    if output is None:
+        return np.concatenate(list(chunks) or [np.empty(0, dtype=RESULT_DTYPE)])
+
+    n = 0
+    if output.endswith('.npy'):
+        out = np.lib.format.open_memmap(output, mode='w+', dtype=RESULT_DTYPE,
+                shape=(_n_rows(source),))
+        for chunk in chunks:
+            out[n:n + len(chunk)] = chunk
+            n += len(chunk)
+        out.flush()
+        del out
+    else:
+        with open(output, 'w') as f:
+            f.write(','.join(RESULT_DTYPE.names) + '\n')
+            for chunk in chunks:
+                np.savetxt(f, chunk, delimiter=',',
+                        fmt=['%.10g'] * (len(RESULT_DTYPE.names) - 1) + ['%d'])
+                n += len(chunk)
+    return n
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from time import time
+
+    parser = ArgumentParser(description='Tube wall equilibrium for every row of a weather file.')
+    parser.add_argument('weather', help='CSV with a header line or .npy weather file')
+    parser.add_argument('-o', '--output', default='climate.npy', help='.npy or CSV file to write')
+    parser.add_argument('--pod-W-cp', type=float, required=True,
+            help='TubeWallTemp pod_W_cp output (W/degK)')
+    parser.add_argument('--pod-W-cp-Tt', type=float, required=True,
+            help='TubeWallTemp pod_W_cp_Tt output (W)')
+    parser.add_argument('--n-pods', type=float, default=34)
+    parser.add_argument('--r-tube-outer', type=float, default=3.006)
+    parser.add_argument('--tube-len', type=float, default=482803.0)
+    parser.add_argument('--chunksize', type=int, default=8760)
+    args = parser.parse_args()
+
+    start = time()
+    n = climate_sweep(args.weather, args.pod_W_cp, args.pod_W_cp_Tt, args.output,
+            args.chunksize, n_pods=args.n_pods, r_tube_outer=args.r_tube_outer,
+            tube_len=args.tube_len)
+    print 'Evaluated %d rows in %.2f s, written to %s' % (n, time() - start, args.output)
@@ -0,0 +1,166 @@
+'''
+continuation.py -
+    Warm-starts the implicit states of an OpenMDAO problem along a sweep by
+    extrapolating the converged states of the neighbouring points.
+'''
+
+import sys
+from os import devnull
+
+import numpy as np
+
+from openmdao.solvers.run_once import RunOnce
+
+from util import state_names, set_unknowns
+
+
+class IterationCounter(object):
+    '''
+    Accumulates the iterations taken by every iterative nonlinear solver
+    under `root` until `remove` is called, or the `with` block ends.
+    '''
+
+    def __init__(self, root):
+        self.count = 0
+        self._originals = []
+        for group in root.subgroups(recurse=True, include_self=True):
+            if not isinstance(group.nl_solver, RunOnce):
+                self._wrap(group.nl_solver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.remove()
+
+    def remove(self):
+        '''Restores the original solve methods; the count is kept.'''
+        for obj, attr, original in reversed(self._originals):
+            if original is None:
+                delattr(obj, attr)
+            else:
+                setattr(obj, attr, original)
+        self._originals = []
+
+    def _wrap(self, solver):
+        solve = solver.solve
+        self._originals.append((solver, 'solve', solver.__dict__.get('solve')))
+
+        def counted_solve(*args, **kwargs):
+            try:
+                return solve(*args, **kwargs)
+            finally:
+                self.count += solver.iter_count
+
+        solver.solve = counted_solve
+
+
+class Continuation(object):
+    '''
+    Predicts the converged states at the next point of a one-dimensional sweep
+    by polynomial extrapolation through the previous converged points, and
+    keeps track of the solver iterations used at each point. The solvers of
+    `p` are wrapped to count iterations from the first `predict` or `record`
+    until `remove` is called or the `with` block ends, and wrapped again if
+    the sweep goes on after that.
+
+    Parameters
+    ----------
+    p : openmdao.core.problem.Problem
+        Problem being swept; it must already be set up.
+    x_varname : str
+        OpenMDAO variable name of the sweep variable.
+    order : int
+        0 reuses the last converged states, 1 extrapolates linearly and 2
+        quadratically. Lower orders are used until enough points exist.
+    states : list of str
+        States to predict. Defaults to every state in `p`.
+    compare : bool
+        Also solves each point from the previous converged states, without
+        prediction, so that `iterations_saved` can be reported. This doubles
+        the cost of the sweep and is meant for tuning only.
+    '''
+
+    def __init__(self, p, x_varname, order=1, states=None, compare=False):
+        self.p = p
+        self.x_varname = x_varname
+        self.order = order
+        self.states = state_names(p) if states is None else list(states)
+        self.compare = compare
+        self.counter = None
+
+        self.history = [] # (x, state values) of converged points, oldest first
+        self.iterations = [] # solver iterations of each recorded point
+        self.iterations_saved = [] # only filled in when compare is True, NaN where unknown
+        self._baseline = None
+        self._start_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.remove()
+
+    def remove(self):
+        '''Restores the solvers of `p`; the recorded points are kept.'''
+        if self.counter is not None:
+            self.counter.remove()
+            self.counter = None
+
+    def _count(self):
+        if self.counter is None:
+            self.counter = IterationCounter(self.p.root)
+        return self.counter.count
+
+    def predict(self, point):
+        '''Sets the predicted states for `point` ahead of running it.'''
+        x = point[self.x_varname]
+        if self.compare:
+            self._baseline = self._count_cold_iterations(point)
+        pts = self.history[-(self.order + 1):]
+        for k, name in enumerate(self.states):
+            if pts:
+                self.p[name] = self._extrapolate([h[0] for h in pts], [h[1][k] for h in pts], x)
+        self._start_count = self._count()
+
+    def record(self, point):
+        '''Stores the converged states of `point` after a successful run.'''
+        iterations = self._count() - self._start_count
+        self.iterations.append(iterations)
+        if self.compare:
+            # NaN when the cold solve of the point failed, so that the list
+            # stays aligned with `iterations` and the sweep points
+            self.iterations_saved.append(np.nan if self._baseline is None
+                    else self._baseline - iterations)
+        x = point[self.x_varname]
+        self.history = [h for h in self.history if h[0] != x]
+        self.history.append((x, [np.copy(self.p[name]) for name in self.states]))
+        del self.history[:-(self.order + 1)]
+
+    def _count_cold_iterations(self, point):
+        snapshot = self.p.root.unknowns.vec.copy()
+        for name, val in point.items():
+            self.p[name] = val
+        start = self._count()
+        sys.stdout = open(devnull, 'w')
+        try:
+            self.p.run()
+        except Exception:
+            return None
+        finally:
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+            set_unknowns(self.p, snapshot)
+        return self._count() - start
+
+    @staticmethod
+    def _extrapolate(xs, ys, x):
+        '''Evaluates the Lagrange polynomial through (xs, ys) at x.'''
+        pred = 0.0
+        for j in range(len(xs)):
+            weight = 1.0
+            for m in range(len(xs)):
+                if m != j:
+                    weight *= (x - xs[m]) / (xs[j] - xs[m])
+            pred = pred + weight * ys[j]
+        return pred
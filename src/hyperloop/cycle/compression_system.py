@@ -12,6 +12,10 @@ from pycycle.components.compressor import Compressor
 from pycycle.components.nozzle import Nozzle
 from pycycle.flowstation import FlowIn
 
+from thermo_registry import get_thermo
+from compressor_map import CompressorMap
+from flow_bundle import station_vars
+
 from splitter import SplitterW
 from transmogrifier import Transmogrifier
 
@@ -42,29 +46,41 @@ class Performance(Component):
         unknowns['Fnet'] = params['Fg'] + params['F_ram']
         resids['Ps_bearing_resid'] = params['Ps_bearing'] - params['Ps_bearing_target']
 
+    def linearize(self, params, unknowns, resids):
+        J = {}
+        J['pwr', 'C1_pwr'] = J['pwr', 'C2_pwr'] = 1.0
+        J['Fnet', 'Fg'] = J['Fnet', 'F_ram'] = 1.0
+        J['Ps_bearing_resid', 'Ps_bearing'] = 1.0
+        J['Ps_bearing_resid', 'Ps_bearing_target'] = -1.0
+        return J
+
 
 class CompressionSystem(Group):
+    '''
+    Inlet, compressors, bearing split and nozzle of the pod. `maps` holds a
+    compressor_map.MapData for 'comp1' and/or 'comp2' to run them off
+    design on their map (see CompressorMap, added as 'comp1_map' and
+    'comp2_map'); compressors without a map are sized at PR_design and
+    eff_design.
+    '''
 
     @staticmethod
     def connect_flow(group, Fl_O_name, Fl_I_name, connect_stat=True, connect_FAR=True):
-        for v_name in ('h', 'T', 'P', 'rho', 'gamma', 'Cp', 'Cv', 'S', 'n'):
-            for prefix in (('tot', 'stat') if connect_stat else ('tot',)):
-                group.connect('%s:%s:%s' % (Fl_O_name, prefix, v_name), '%s:%s:%s' % (Fl_I_name, prefix, v_name))
-        if connect_stat:
-            for stat in ('V', 'MN', 'area', 'W'):
-                group.connect('%s:stat:%s' % (Fl_O_name, stat), '%s:stat:%s' % (Fl_I_name, stat))
-        else:
-            group.connect('%s:stat:W' % Fl_O_name, '%s:stat:W' % Fl_I_name)
-        if connect_FAR:
-            group.connect('%s:FAR' % Fl_O_name, '%s:FAR' % Fl_I_name)
+        for name in station_vars(connect_stat, connect_FAR):
+            group.connect('%s:%s' % (Fl_O_name, name), '%s:%s' % (Fl_I_name, name))
 
-    def __init__(self):
+    def __init__(self, maps=None):
         super(CompressionSystem, self).__init__()
 
+        self.maps = dict(maps or {})
+        for name in self.maps:
+            if name not in ('comp1', 'comp2'):
+                raise ValueError("maps may only be given for 'comp1' and 'comp2', not %r" % name)
+
         self.thermo_data = species_data.janaf
         self.elements = AIR_MIX
 
-        gas_thermo = species_data.Thermo(self.thermo_data, init_reacts=self.elements)
+        gas_thermo = get_thermo(self.thermo_data, self.elements)
         self.gas_prods = gas_thermo.products
         self.num_prod = len(self.gas_prods)
 
@@ -72,10 +88,14 @@ class CompressionSystem(Group):
         #self.add('start', FlowStart())
         self.add('inlet', Inlet())
         self.add('diffuser', Transmogrifier())
+        if 'comp1' in self.maps:
+            self.add('comp1_map', CompressorMap(self.maps['comp1']))
         self.add('comp1', Compressor())
         self.add('comp1_funnel', Transmogrifier()) # calculates statics based on exit Mach
         self.add('split', SplitterW())
         self.add('nozzle', Nozzle(elements=AIR_MIX))
+        if 'comp2' in self.maps:
+            self.add('comp2_map', CompressorMap(self.maps['comp2']))
         self.add('comp2', Compressor())
         self.add('comp2_funnel', Transmogrifier()) # calculates statics based on exit Mach
         self.add('perf', Performance())
@@ -95,6 +115,14 @@ class CompressionSystem(Group):
         conn_fl(self, 'comp2.Fl_O', 'comp2_funnel.Fl_I', connect_stat=False)
         conn_fl(self, 'split.Fl_O2', 'nozzle.Fl_I', connect_FAR=False)
 
+        for comp, upstream in (('comp1', 'diffuser.Fl_O'), ('comp2', 'split.Fl_O1')):
+            if comp in self.maps:
+                self.connect('%s:stat:W' % upstream, '%s_map.W' % comp)
+                self.connect('%s:tot:T' % upstream, '%s_map.Tt' % comp)
+                self.connect('%s:tot:P' % upstream, '%s_map.Pt' % comp)
+                self.connect('%s_map.PR' % comp, '%s.PR_design' % comp)
+                self.connect('%s_map.eff' % comp, '%s.eff_design' % comp)
+
         self.connect('comp1.power', 'perf.C1_pwr')
         self.connect('comp2.power', 'perf.C2_pwr')
         self.connect('comp2_funnel.Fl_O:stat:P', 'perf.Ps_bearing')
@@ -0,0 +1,248 @@
+'''
+compressor_map.py -
+    Off-design compressor performance from a map of corrected flow, pressure
+    ratio and efficiency over corrected speed and R-line (beta), scaled to a
+    design point. CompressorMap feeds the PR and efficiency of the operating
+    point into the PR_design/eff_design inputs of a pyCycle Compressor, so a
+    compressor sized once is evaluated along its operating line.
+'''
+
+import os
+import json
+
+import numpy as np
+
+from openmdao.core.component import Component
+
+from grid_table import load_table, read_csv_grid
+
+T_STD = 518.67 # degR
+P_STD = 14.696 # psi
+
+MAP_VARS = ('Wc', 'PR', 'eff')
+
+
+def corrected_flow(W, Tt, Pt):
+    '''Corrected flow in lbm/s from W (lbm/s), Tt (degR) and Pt (psi).'''
+    return W * np.sqrt(Tt / T_STD) / (Pt / P_STD)
+
+
+class MapData(object):
+    '''
+    A compressor map on a grid of corrected speed Nc and R-line beta,
+    both ascending, with Wc, PR and eff shaped (len(Nc), len(beta)).
+
+    The three maps are stacked into one array of cells at construction, so
+    each lookup is a binary search per axis and one gather; it is
+    bilinear inside the grid and extrapolates linearly outside.
+    '''
+
+    def __init__(self, Nc, beta, Wc, PR, eff):
+        self._set(Nc, beta, np.dstack([np.asarray(v, dtype=float) for v in (Wc, PR, eff)]))
+
+    @classmethod
+    def from_table(cls, table):
+        '''
+        Map on the grid_table.Table `table`, with axes Nc and beta and vars
+        Wc, PR and eff. Tables in that order are used in place, so a
+        memory mapped map is shared rather than copied.
+        '''
+        if [name for name, values in table.axes] != ['Nc', 'beta']:
+            raise ValueError('compressor map table axes must be Nc and beta')
+        self = cls.__new__(cls)
+        if table.vars == MAP_VARS:
+            self._set(table.axis('Nc'), table.axis('beta'), table.values)
+        else:
+            self._set(table.axis('Nc'), table.axis('beta'),
+                    np.dstack([table[name] for name in MAP_VARS]))
+        return self
+
+    def _set(self, Nc, beta, values):
+        self.Nc = np.asarray(Nc, dtype=float)
+        self.beta = np.asarray(beta, dtype=float)
+        self.values = np.ascontiguousarray(values, dtype=float)
+        if self.values.shape[:2] != (len(self.Nc), len(self.beta)):
+            raise ValueError('map arrays must be shaped (%d, %d), not %s' %
+                    (len(self.Nc), len(self.beta), self.values.shape[:2]))
+        if np.any(np.diff(self.Nc) <= 0.0) or np.any(np.diff(self.beta) <= 0.0):
+            raise ValueError('map Nc and beta must be strictly ascending')
+
+    def lookup(self, Nc, beta):
+        '''
+        Map values at (Nc, beta), scalars or arrays.
+
+        Returns
+        -------
+        tuple
+            (values, d/dNc, d/dbeta), each with a last axis of
+            (Wc, PR, eff).
+        '''
+        Nc = np.asarray(Nc, dtype=float)[..., None]
+        beta = np.asarray(beta, dtype=float)[..., None]
+        i = np.clip(np.searchsorted(self.Nc, Nc[..., 0]) - 1, 0, len(self.Nc) - 2)
+        j = np.clip(np.searchsorted(self.beta, beta[..., 0]) - 1, 0, len(self.beta) - 2)
+        dN = self.Nc[i + 1] - self.Nc[i]
+        dB = self.beta[j + 1] - self.beta[j]
+        t = (Nc - self.Nc[i][..., None]) / dN[..., None]
+        u = (beta - self.beta[j][..., None]) / dB[..., None]
+        v00, v10 = self.values[i, j], self.values[i + 1, j]
+        v01, v11 = self.values[i, j + 1], self.values[i + 1, j + 1]
+        values = (1 - t) * (1 - u) * v00 + t * (1 - u) * v10 + (1 - t) * u * v01 + t * u * v11
+        d_Nc = ((1 - u) * (v10 - v00) + u * (v11 - v01)) / dN[..., None]
+        d_beta = ((1 - t) * (v01 - v00) + t * (v11 - v10)) / dB[..., None]
+        return values, d_Nc, d_beta
+
+    def solve_beta(self, Nc, Wc, beta=0.5, tol=1e-10, max_iter=50):
+        '''
+        R-line at which the map passes corrected flow Wc on speed line Nc.
+        Raises RuntimeError if Newton's method has not converged after
+        `max_iter` iterations.
+        '''
+        for _ in range(max_iter):
+            values, d_Nc, d_beta = self.lookup(Nc, beta)
+            resid = values[0] - Wc
+            if abs(resid) <= tol * max(abs(Wc), 1.0):
+                return float(beta)
+            if d_beta[0] == 0.0:
+                raise ValueError('compressor map flow does not vary with beta at Nc=%g' % Nc)
+            beta = beta - resid / d_beta[0]
+        raise RuntimeError('compressor map R-line for Wc=%g at Nc=%g did not converge in %d '
+                'iterations' % (Wc, Nc, max_iter))
+
+
+def generic_map(Nc=np.linspace(0.4, 1.1, 15), beta=np.linspace(0.0, 1.0, 11)):
+    '''
+    Normalized map of a single stage centrifugal compressor: Wc = 1,
+    PR = 2 and eff = 0.85 at Nc = 1, beta = 0.5, for use until a measured
+    map is available.
+    '''
+    N, B = np.meshgrid(Nc, beta, indexing='ij')
+    Wc = N ** 1.2 * (1.1 - 0.2 * B)
+    PR = 1.0 + N ** 2 * (0.75 + 0.5 * B)
+    eff = 0.85 - 0.4 * (N - 0.95) ** 2 - 0.3 * (B - 0.5) ** 2
+    return MapData(Nc, beta, Wc, PR, eff)
+
+
+def read_map(filename):
+    '''
+    Reads a map from a grid_table file (.tbl, memory mapped), from JSON
+    with 'Nc' and 'beta' lists and 'Wc', 'PR' and 'eff' nested lists
+    indexed [Nc][beta], or from CSV with a header line and one row of Nc,
+    beta, Wc, PR, eff per grid point. CSV maps convert to .tbl with
+    `python grid_table.py convert map.csv map.tbl --axes Nc beta`.
+    '''
+    if filename.endswith('.tbl'):
+        return MapData.from_table(load_table(filename))
+    if filename.endswith('.json'):
+        with open(filename) as f:
+            data = json.load(f)
+        return MapData(data['Nc'], data['beta'], *[data[name] for name in MAP_VARS])
+
+    ((_, Nc), (_, beta)), vars = read_csv_grid(filename, ('Nc', 'beta'))
+    vars = dict(vars)
+    return MapData(Nc, beta, *[vars[name] for name in MAP_VARS])
+
+
+_maps = {}
+
+def load_map(filename):
+    '''`read_map`, reusing the preprocessed map while the file is unchanged.'''
+    key = (os.path.abspath(filename), os.path.getmtime(filename))
+    if key not in _maps:
+        _maps[key] = read_map(filename)
+    return _maps[key]
+
+
+class CompressorMap(Component):
+    '''
+    Operating point of a compressor on its map. The map is scaled so that
+    it passes Wc_design at PR_design and eff_design on the design speed line
+    and R-line; off design the R-line 'beta' is the one on which the map
+    passes the corrected flow of the incoming W, Tt and Pt at corrected
+    speed Nc. Nc follows from the mechanical speed N and the inlet total
+    temperature, N / sqrt(Tt / Tt_design), both relative to the design
+    point, so a compressor held at constant shaft speed moves to another
+    speed line as its inlet temperature changes. The design point sits at
+    (Nc_map, beta_map) of the map.
+
+    beta is solved by Newton's method inside the component, so it needs no
+    solver in the enclosing groups; its derivatives follow from the
+    implicit function theorem.
+    '''
+    def __init__(self, map_data, Nc_map=1.0, beta_map=0.5):
+        super(CompressorMap, self).__init__()
+        self.map_data = map_data
+        self.Nc_map = Nc_map
+        self.design = map_data.lookup(Nc_map, beta_map)[0]
+
+        self.add_param('W', 1.0, desc='weight flow entering the compressor', units='lbm/s')
+        self.add_param('Tt', T_STD, desc='total temperature entering the compressor', units='degR')
+        self.add_param('Pt', P_STD, desc='total pressure entering the compressor', units='psi')
+        self.add_param('N', 1.0, desc='mechanical speed relative to the design speed')
+        self.add_param('Tt_design', T_STD, desc='total temperature entering the compressor at the '
+                'design point', units='degR')
+        self.add_param('Wc_design', 1.0, desc='corrected flow at the design point', units='lbm/s')
+        self.add_param('PR_design', 1.5, desc='pressure ratio at the design point')
+        self.add_param('eff_design', 0.8, desc='adiabatic efficiency at the design point')
+
+        self.add_output('Nc', 1.0, desc='corrected speed relative to the design speed')
+        self.add_output('beta', beta_map, desc='map R-line of the operating point')
+        self.add_output('Wc', 1.0, desc='corrected flow', units='lbm/s')
+        self.add_output('PR', 1.5, desc='pressure ratio')
+        self.add_output('eff', 0.8, desc='adiabatic efficiency')
+
+    def _scalars(self, params):
+        design = self.design
+        return (params['Wc_design'] / design[0], (params['PR_design'] - 1.0) / (design[1] - 1.0),
+                params['eff_design'] / design[2])
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        s_Wc, s_PR, s_eff = self._scalars(params)
+        Nc = params['N'] / np.sqrt(params['Tt'] / params['Tt_design'])
+        Nc_map = Nc * self.Nc_map
+        Wc = corrected_flow(params['W'], params['Tt'], params['Pt'])
+        beta = self.map_data.solve_beta(Nc_map, Wc / s_Wc, unknowns['beta'])
+        values = self.map_data.lookup(Nc_map, beta)[0]
+        unknowns['Nc'] = Nc
+        unknowns['beta'] = beta
+        unknowns['Wc'] = Wc
+        unknowns['PR'] = 1.0 + s_PR * (values[1] - 1.0)
+        unknowns['eff'] = s_eff * values[2]
+
+    def linearize(self, params, unknowns, resids):
+        s_Wc, s_PR, s_eff = self._scalars(params)
+        Nc = unknowns['Nc']
+        values, d_Nc, d_beta = self.map_data.lookup(Nc * self.Nc_map, unknowns['beta'])
+        W, Tt, Pt = params['W'], params['Tt'], params['Pt']
+        Wc = unknowns['Wc']
+        design = self.design
+
+        J = {}
+        J['Nc', 'N'] = np.sqrt(params['Tt_design'] / Tt)
+        J['Nc', 'Tt'] = -0.5 * Nc / Tt
+        J['Nc', 'Tt_design'] = 0.5 * Nc / params['Tt_design']
+        J['Wc', 'W'] = Wc / W
+        J['Wc', 'Tt'] = 0.5 * Wc / Tt
+        J['Wc', 'Pt'] = -Wc / Pt
+        # s_Wc * Wc_map(Nc, beta) = Wc holds along the operating line
+        dR_dbeta = s_Wc * d_beta[0]
+        dbeta_dNc = -s_Wc * d_Nc[0] * self.Nc_map / dR_dbeta
+        J['beta', 'W'] = J['Wc', 'W'] / dR_dbeta
+        J['beta', 'Tt'] = J['Wc', 'Tt'] / dR_dbeta + dbeta_dNc * J['Nc', 'Tt']
+        J['beta', 'Pt'] = J['Wc', 'Pt'] / dR_dbeta
+        J['beta', 'N'] = dbeta_dNc * J['Nc', 'N']
+        J['beta', 'Tt_design'] = dbeta_dNc * J['Nc', 'Tt_design']
+        J['beta', 'Wc_design'] = -values[0] / design[0] / dR_dbeta
+
+        for out, k, scale in (('PR', 1, s_PR), ('eff', 2, s_eff)):
+            for name in ('W', 'Pt', 'Wc_design'):
+                J[out, name] = scale * d_beta[k] * J['beta', name]
+            # total derivative along the speed line
+            dout_dNc = scale * (d_Nc[k] * self.Nc_map + d_beta[k] * dbeta_dNc)
+            J[out, 'Tt'] = scale * d_beta[k] * J['Wc', 'Tt'] / dR_dbeta + \
+                    dout_dNc * J['Nc', 'Tt']
+            J[out, 'N'] = dout_dNc * J['Nc', 'N']
+            J[out, 'Tt_design'] = dout_dNc * J['Nc', 'Tt_design']
+        J['PR', 'PR_design'] = (values[1] - 1.0) / (design[1] - 1.0)
+        J['eff', 'eff_design'] = values[2] / design[2]
+        return J
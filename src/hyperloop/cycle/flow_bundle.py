@@ -0,0 +1,67 @@
+'''
+flow_bundle.py -
+    Variables of a pyCycle flow station, as connected between stations and
+    copied through splitters and area changes. FlowPassThrough copies the
+    total conditions of an incoming station to any number of outgoing
+    stations in one component, replacing one pyCycle PassThrough per
+    variable and per station.
+'''
+
+import numpy as np
+
+from openmdao.core.component import Component
+
+# variables connected between stations for both the total and the static
+# conditions, variables that exist only for the static conditions, and
+# the total conditions copied unchanged through splitters and area changes
+FLOW_VARS = ('h', 'T', 'P', 'rho', 'gamma', 'Cp', 'Cv', 'S', 'n')
+STAT_ONLY_VARS = ('V', 'MN', 'area', 'W')
+TOT_PASSTHRU_VARS = ('h', 'T', 'P', 'rho', 'gamma', 'Cp', 'Cv', 'S', 'n_moles', 'n')
+
+
+def station_vars(connect_stat=True, connect_FAR=True):
+    '''Variable suffixes CompressionSystem.connect_flow connects between two stations.'''
+    names = ['tot:%s' % name for name in FLOW_VARS]
+    if connect_stat:
+        names += ['stat:%s' % name for name in FLOW_VARS + STAT_ONLY_VARS]
+    else:
+        names.append('stat:W')
+    if connect_FAR:
+        names.append('FAR')
+    return names
+
+
+class FlowPassThrough(Component):
+    '''
+    Copies the total conditions and FAR of station `in_name` to every
+    station in `out_names`. Its params share the promoted names of the
+    FlowIn of the enclosing group, like pyCycle's PassThrough, and its
+    partials are constant identities, built once.
+    '''
+
+    def __init__(self, in_name, out_names, num_prod):
+        super(FlowPassThrough, self).__init__()
+        self.in_name = in_name
+        self.out_names = tuple(out_names)
+        self.names = tuple(['tot:%s' % name for name in TOT_PASSTHRU_VARS] + ['FAR'])
+
+        for name in self.names:
+            val = np.zeros(num_prod) if name == 'tot:n' else 0.0
+            self.add_param('%s:%s' % (in_name, name), val)
+            for out_name in self.out_names:
+                self.add_output('%s:%s' % (out_name, name), val)
+
+        self._J = {}
+        for name in self.names:
+            eye = np.eye(num_prod) if name == 'tot:n' else 1.0
+            for out_name in self.out_names:
+                self._J['%s:%s' % (out_name, name), '%s:%s' % (in_name, name)] = eye
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        for name in self.names:
+            val = params['%s:%s' % (self.in_name, name)]
+            for out_name in self.out_names:
+                unknowns['%s:%s' % (out_name, name)] = val
+
+    def linearize(self, params, unknowns, resids):
+        return self._J
@@ -1,16 +1,15 @@
-import numpy as np
-
 from openmdao.core.group import Group
 from openmdao.core.component import Component
 from openmdao.components.indep_var_comp import IndepVarComp
 
-from scipy.optimize import newton
-
 from pycycle.constants import g_c, AIR_FUEL_MIX, AIR_MIX
 from pycycle.set_total import SetTotal
 from pycycle.thermo_static import SetStaticMN, SetStaticArea
 from pycycle import species_data
-from pycycle.flowstation import FlowIn, PassThrough
+from pycycle.flowstation import FlowIn
+
+from thermo_registry import get_thermo
+from flow_bundle import FlowPassThrough
 
 
 class SplitterWCalc(Component):
@@ -47,7 +46,7 @@ class SplitterW(Group):
         self.thermo_data = thermo_data
         self.elements = elements
 
-        gas_thermo = species_data.Thermo(thermo_data, init_reacts=elements)
+        gas_thermo = get_thermo(thermo_data, elements)
         self.gas_prods = gas_thermo.products
         self.num_prod = len(self.gas_prods)
 
@@ -90,14 +89,8 @@ class SplitterW(Group):
         self.connect('Fl_I:tot:n', 'out2_stat.n_guess')
 
         # total vars
-        for v_name in ('h','T','P','S','rho','gamma','Cp','Cv','n_moles'):
-            for n in (1, 2):
-                self.add('%s_passthru%d' % (v_name, n), PassThrough('Fl_I:tot:%s' % v_name, 'Fl_O%d:tot:%s' % (n, v_name), 0.0), promotes=['*'])
-        for n in (1, 2):
-            self.add('n_passthru%d' % n, PassThrough('Fl_I:tot:n', 'Fl_O%d:tot:n' % n, np.zeros(self.num_prod)), promotes=['*'])
-
-        for n in (1, 2):
-            self.add('FAR_passthru%d' % n, PassThrough('Fl_I:FAR', 'Fl_O%d:FAR' % n, 0.0), promotes=['*'])
+        self.add('passthru', FlowPassThrough('Fl_I', ('Fl_O1', 'Fl_O2'), self.num_prod),
+                promotes=['*'])
 
 
 if __name__ == "__main__":
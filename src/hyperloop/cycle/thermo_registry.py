@@ -0,0 +1,32 @@
+'''
+thermo_registry.py -
+    Process-wide cache of the pyCycle Thermo objects the hyperloop groups
+    use to size their flow stations, so that SplitterW, Transmogrifier and
+    CompressionSystem share one per gas mixture. The SetTotal and
+    SetStaticMN blocks inside them take only the thermo data module and
+    still build their own Thermo objects; sharing those needs pyCycle's
+    constructors to accept a Thermo.
+'''
+
+from pycycle import species_data
+
+# Thermo objects keyed by (id of thermo data module, sorted element items);
+# the modules are kept alive alongside so their ids cannot be reused
+_registry = {}
+
+
+def get_thermo(thermo_data=species_data.janaf, elements=None):
+    '''
+    Returns the shared species_data.Thermo for `thermo_data` initialised with
+    the reactants `elements`, building it on first use. The returned object
+    must be treated as read only.
+    '''
+    key = (id(thermo_data), tuple(sorted((elements or {}).items())))
+    if key not in _registry:
+        _registry[key] = (thermo_data, species_data.Thermo(thermo_data, init_reacts=elements))
+    return _registry[key][1]
+
+
+def clear():
+    '''Drops every cached Thermo object.'''
+    _registry.clear()
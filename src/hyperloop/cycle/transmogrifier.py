@@ -1,5 +1,3 @@
-import numpy as np
-
 from openmdao.core.group import Group
 from openmdao.core.component import Component
 from openmdao.solvers.newton import Newton
@@ -9,7 +7,10 @@ from openmdao.solvers.newton import Newton
 from pycycle.constants import AIR_MIX
 from pycycle.thermo_static import SetStaticMN
 from pycycle import species_data
-from pycycle.flowstation import FlowIn, PassThrough
+from pycycle.flowstation import FlowIn
+
+from thermo_registry import get_thermo
+from flow_bundle import FlowPassThrough
 
 
 class TransmogrifierCalc(Component):
@@ -36,7 +37,7 @@ class Transmogrifier(Group):
         self.thermo_data = thermo_data
         self.elements = elements
 
-        gas_thermo = species_data.Thermo(thermo_data, init_reacts=elements)
+        gas_thermo = get_thermo(thermo_data, elements)
         self.gas_prods = gas_thermo.products
         self.num_prod = len(self.gas_prods)
 
@@ -57,7 +58,4 @@ class Transmogrifier(Group):
 
         self.connect('MN_out_target', 'set_stat.MN_target')
 
-        for v_name in ('h', 'T', 'P', 'rho', 'gamma', 'Cp', 'Cv', 'S', 'n_moles'):
-            self.add('passthru_tot:%s' % v_name, PassThrough('Fl_I:tot:%s' % v_name, 'Fl_O:tot:%s' % v_name, 0.0), promotes=['*'])
-        self.add('passthru_tot:n', PassThrough('Fl_I:tot:n', 'Fl_O:tot:n', np.zeros(self.num_prod)), promotes=['*'])
-        self.add('passthru_FAR', PassThrough('Fl_I:FAR', 'Fl_O:FAR', 0.0), promotes=['*'])
+        self.add('passthru', FlowPassThrough('Fl_I', ('Fl_O',), self.num_prod), promotes=['*'])
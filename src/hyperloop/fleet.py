@@ -0,0 +1,227 @@
+'''
+fleet.py -
+    Time-stepped simulation of a fleet of pods departing on a headway
+    schedule through one tube. Each pod ingests air at the local tube
+    pressure and temperature (the TubeFlow inputs), moves it behind itself
+    and deposits its nozzle and bearing heat there; the air in every tube
+    segment mixes axially and exchanges heat with the tube wall, which
+    loses heat outside. Instead of multiplying one pod by n_pods as
+    TubeWallTemp does, this resolves how closely spaced pods heat and
+    pressurize the air the following pods fly through.
+'''
+
+from math import pi
+
+import numpy as np
+from scipy.linalg import solve_banded
+
+from hyperloop_sim import TubeFlow
+from mission import simulate_mission
+from tube_wall_temp import natural_convection, solar_flux, radiated_flux
+
+# one record per scheduled pod; the active pods are a contiguous slice
+POD_DTYPE = np.dtype([
+    ('t_depart', float), # s
+    ('x', float), # m along the tube
+    ('v', float), # m/s
+    ('tube_P', float), # Pa, local static pressure ahead of the pod
+    ('tube_T', float), # degK, local static temperature ahead of the pod
+    ('W', float), # kg/s, captured by the inlet
+    ('Pt', float), # Pa
+    ('Tt', float), # degK
+    ('heat_rate', float), # W, deposited behind the pod
+    ('P_max', float), # Pa, highest tube_P met on the trip
+    ('T_max', float), # degK, highest tube_T met on the trip
+])
+
+
+def simulate_fleet(n_pods=100, headway=60.0, trace=None, tube_len=563270.0, tube_r=1.11252,
+        n_segments=1000, dt=1.0, duration=None, tube_P=99.0, tube_T=292.6, inlet_area=0.785,
+        pod_W_cp=491.8, pod_W_cp_Tt=663700.0, h_wall=5.0, wall_thickness=0.0254,
+        rho_wall=7850.0, cp_wall=490.0, axial_diffusivity=1e5, temp_ambient=305.6,
+        insolation=0.0, reflectance=0.5, nn_incidence_factor=0.7, emissivity=0.5,
+        sb_const=5.670373e-8, gamma=1.41, R=286.0, save_every=60):
+    '''
+    Runs the fleet until the last pod arrives, or for `duration` s.
+
+    Parameters
+    ----------
+    n_pods, headway : int, float
+        Pods departing from x = 0, one every `headway` s.
+    trace : dict
+        Trip of one pod as returned by mission.simulate_mission (or
+        trajectory.optimize_trajectory); every pod flies it. Defaults to
+        simulate_mission(tube_len).
+    tube_len, tube_r : float
+        Tube length and inner radius in m.
+    n_segments, dt : int, float
+        Axial segments of the tube air and wall, and time step in s.
+    tube_P, tube_T : float
+        Initial air pressure (Pa) and temperature (degK) in the tube, at
+        which the pods are designed.
+    inlet_area : float
+        Flow area captured by each pod in m**2.
+    pod_W_cp, pod_W_cp_Tt : float
+        TubeWallTemp outputs of the same name at the design conditions; a
+        pod deposits pod_W_cp_Tt - pod_W_cp * tube_T, scaled by the flow it
+        captures relative to the design flow.
+    h_wall : float
+        Heat transfer coefficient between the tube air and the wall, W/m**2/degK.
+    wall_thickness, rho_wall, cp_wall : float
+        Steel wall heat capacity, as in tube_wall_transient.
+    axial_diffusivity : float
+        Rate at which pressure and temperature differences between
+        segments even out, m**2/s; of the order of the speed of sound
+        times the segment length.
+    temp_ambient, insolation, reflectance, nn_incidence_factor, emissivity, sb_const :
+        Outside conditions and wall surface, as in TubeWallTemp.
+    save_every : int
+        Steps between saved tube profiles.
+
+    Returns
+    -------
+    dict
+        'x' (segment centres, m), 't' (saved times, s), 'tube_P', 'tube_T'
+        and 'wall_T' (saved profiles shaped (len(t), n_segments)), 'pods'
+        (POD_DTYPE records), 'max_in_tube', 'min_spacing' (m, between
+        pods in flight) and 'pods_per_hour'.
+    '''
+    if trace is None:
+        trace = simulate_mission(tube_len)
+    trip_t, trip_x, trip_v = trace['t'], trace['x'], trace['v']
+    time_trip = trip_t[-1]
+
+    pods = np.zeros(n_pods, dtype=POD_DTYPE)
+    pods['t_depart'] = np.arange(n_pods) * headway
+    if duration is None:
+        duration = pods['t_depart'][-1] + time_trip
+
+    tube_area = pi * tube_r ** 2
+    dx = tube_len / n_segments
+    x_seg = (np.arange(n_segments) + 0.5) * dx
+    cv = R / (gamma - 1.0)
+    mass = np.full(n_segments, tube_P / (R * tube_T) * tube_area * dx) # kg of air per segment
+    temp = np.full(n_segments, float(tube_T))
+    temp_wall = np.full(n_segments, float(tube_T))
+    r_outer = tube_r + wall_thickness
+    cap_wall = rho_wall * cp_wall * pi * (r_outer ** 2 - tube_r ** 2) * dx
+    hA = h_wall * 2.0 * pi * tube_r * dx
+    outside_area = 2.0 * pi * r_outer * dx
+    q_solar = 2.0 * r_outer * dx * solar_flux(insolation, reflectance, nn_incidence_factor)
+    W_design = TubeFlow.calc(trip_v.max() / np.sqrt(gamma * R * tube_T), tube_T, tube_P,
+            inlet_area, gamma, R)[2]
+
+    # implicit axial mixing, (I - dt D d2/dx2) in solve_banded layout, ends closed
+    k = dt * axial_diffusivity / dx ** 2
+    bands = np.zeros((3, n_segments))
+    bands[0, 1:] = -k
+    bands[2, :-1] = -k
+    bands[1] = 1.0 + 2.0 * k
+    bands[1, [0, -1]] = 1.0 + k
+
+    n_steps = int(round(duration / dt))
+    saved_t, saved_P, saved_T, saved_wall = [], [], [], []
+    max_in_tube = 0
+    min_spacing = np.inf
+    t = 0.0
+    for step in range(n_steps + 1):
+        lo = np.searchsorted(pods['t_depart'], t - time_trip, side='left')
+        hi = np.searchsorted(pods['t_depart'], t, side='right')
+        active = pods[lo:hi]
+        if len(active):
+            max_in_tube = max(max_in_tube, len(active))
+            tau = t - active['t_depart']
+            active['x'] = np.interp(tau, trip_t, trip_x)
+            active['v'] = np.interp(tau, trip_t, trip_v)
+            if len(active) > 1:
+                min_spacing = min(min_spacing, np.min(active['x'][:-1] - active['x'][1:]))
+
+            seg = np.minimum((active['x'] / dx).astype(int), n_segments - 1)
+            behind = np.maximum(seg - 1, 0)
+            P_local = mass[seg] * R * temp[seg] / (tube_area * dx)
+            T_local = temp[seg]
+            Pt, Tt, W = TubeFlow.calc(active['v'] / np.sqrt(gamma * R * T_local), T_local,
+                    P_local, inlet_area, gamma, R)
+            W = np.minimum(W, 0.5 * mass[seg] / dt)
+            active['tube_P'] = P_local
+            active['tube_T'] = T_local
+            active['Pt'], active['Tt'], active['W'] = Pt, Tt, W
+            active['heat_rate'] = W / W_design * (pod_W_cp_Tt - pod_W_cp * T_local)
+            active['P_max'] = np.maximum(active['P_max'], P_local)
+            active['T_max'] = np.maximum(active['T_max'], T_local)
+
+            # captured air and the pod heat end up behind the pod
+            energy = mass * cv * temp
+            moved = np.bincount(seg, W * dt, minlength=n_segments)
+            energy -= moved * cv * temp
+            mass -= moved
+            mass += np.bincount(behind, W * dt, minlength=n_segments)
+            energy += np.bincount(behind, W * dt * cv * T_local + active['heat_rate'] * dt,
+                    minlength=n_segments)
+            temp = energy / (mass * cv)
+
+        # axial mixing of mass and internal energy
+        energy = solve_banded((1, 1), bands, mass * temp, check_finite=False)
+        mass = solve_banded((1, 1), bands, mass, check_finite=False)
+        temp = energy / mass
+
+        # air-wall exchange, exact for the pair over the step
+        cap_air = mass * cv
+        temp_mix = (cap_air * temp + cap_wall * temp_wall) / (cap_air + cap_wall)
+        diff = (temp - temp_wall) * np.exp(-hA * (1.0 / cap_air + 1.0 / cap_wall) * dt)
+        temp = temp_mix + cap_wall / (cap_air + cap_wall) * diff
+        temp_wall = temp_mix - cap_air / (cap_air + cap_wall) * diff
+
+        # wall to outside
+        h = natural_convection(temp_wall, temp_ambient, r_outer, check_range=False)[0]
+        q_out = outside_area * (h * (temp_wall - temp_ambient) +
+                radiated_flux(temp_wall, temp_ambient, emissivity, sb_const))
+        temp_wall += (q_solar - q_out) * dt / cap_wall
+
+        if step % save_every == 0 or step == n_steps:
+            saved_t.append(t)
+            saved_P.append(mass * R * temp / (tube_area * dx))
+            saved_T.append(temp.copy())
+            saved_wall.append(temp_wall.copy())
+        t += dt
+
+    return {'x': x_seg, 't': np.array(saved_t), 'tube_P': np.array(saved_P),
+            'tube_T': np.array(saved_T), 'wall_T': np.array(saved_wall), 'pods': pods,
+            'max_in_tube': max_in_tube, 'min_spacing': min_spacing,
+            'pods_per_hour': 3600.0 / headway}
+
+
+def headway_sweep(headways, n_pods=100, **kwargs):
+    '''
+    Runs `simulate_fleet` for every headway (s) and summarizes the
+    conditions the pods meet, for picking the shortest headway the pod
+    design tolerates.
+
+    Returns
+    -------
+    numpy.array
+        Records of 'headway', 'pods_per_hour', 'max_in_tube', 'P_max' and
+        'T_max' (the highest tube_P and tube_T met by any pod).
+    '''
+    result = np.zeros(len(headways), dtype=[('headway', float), ('pods_per_hour', float),
+            ('max_in_tube', int), ('P_max', float), ('T_max', float)])
+    for row, headway in zip(result, headways):
+        fleet = simulate_fleet(n_pods, headway, **kwargs)
+        row['headway'] = headway
+        row['pods_per_hour'] = fleet['pods_per_hour']
+        row['max_in_tube'] = fleet['max_in_tube']
+        row['P_max'] = fleet['pods']['P_max'].max()
+        row['T_max'] = fleet['pods']['T_max'].max()
+    return result
+
+
+if __name__ == '__main__':
+    from time import time
+
+    start = time()
+    trace = simulate_mission()
+    sweep = headway_sweep([240.0, 120.0, 60.0, 30.0], trace=trace)
+    print 'Simulated %d headways in %.1f s' % (len(sweep), time() - start)
+    print '%8s %10s %8s %10s %10s' % ('headway', 'pods/h', 'in tube', 'P_max', 'T_max')
+    for row in sweep:
+        print '%8.0f %10.0f %8d %10.2f %10.2f' % tuple(row)
@@ -1,4 +1,4 @@
-from math import pi, sin
+from math import pi, sin, cos
 
 from openmdao.core.component import Component
 
@@ -21,10 +21,28 @@ class AirBearing(Component):
         arc_len = params['tube_radius'] * params['sweep_angle'] * pi / 180.0
         unknowns['total_area'] = params['capsule_mass'] * 9.81 / (params['P_in'] * 1000.0) / params['eff'] #convert to Pa from kPa
         unknowns['bearing_width'] = 2.0 * params['tube_radius'] * sin(params['sweep_angle'] * pi / 180.0 / 2.0)
-        total_len = unknowns['total_area'] / arc_length / 2.0 # divide by 2 because there are 2 parallel skis
+        total_len = unknowns['total_area'] / arc_len / 2.0 # divide by 2 because there are 2 parallel skis
         unknowns['bearing_len'] = total_len / params['n_bearings'] / 2.0
         unknowns['bearing_area'] = unknowns['total_area'] / params['n_bearings'] / 2.0
 
+    def linearize(self, params, unknowns, resids):
+        J = {}
+        total_area, bearing_len = unknowns['total_area'], unknowns['bearing_len']
+        arc_len = params['tube_radius'] * params['sweep_angle'] * pi / 180.0
+        J['total_area', 'capsule_mass'] = 9.81 / (params['P_in'] * 1000.0) / params['eff']
+        J['total_area', 'P_in'] = -total_area / params['P_in']
+        J['total_area', 'eff'] = -total_area / params['eff']
+        J['bearing_width', 'tube_radius'] = 2.0 * sin(params['sweep_angle'] * pi / 180.0 / 2.0)
+        J['bearing_width', 'sweep_angle'] = params['tube_radius'] * cos(params['sweep_angle'] * pi / 180.0 / 2.0) * pi / 180.0
+        for name in ('capsule_mass', 'P_in', 'eff'):
+            J['bearing_len', name] = J['total_area', name] / arc_len / params['n_bearings'] / 4.0
+            J['bearing_area', name] = J['total_area', name] / params['n_bearings'] / 2.0
+        J['bearing_len', 'tube_radius'] = -bearing_len / params['tube_radius']
+        J['bearing_len', 'sweep_angle'] = -bearing_len / params['sweep_angle']
+        J['bearing_len', 'n_bearings'] = -bearing_len / params['n_bearings']
+        J['bearing_area', 'n_bearings'] = -unknowns['bearing_area'] / params['n_bearings']
+        return J
+
 if __name__ == '__main__':
     from openmdao.core.problem import Problem
     from openmdao.core.group import Group
@@ -35,6 +53,6 @@ if __name__ == '__main__':
     p.run()
 
     print 'total_area (m**2): %f' % p.root.comp.unknowns['total_area']
-    print 'area_per_bearing (m**2): %f' % p.root.comp.unknowns['area_per_bearing']
-    print 'length_per_bearing (m): %f' % p.root.comp.unknowns['length_per_bearing']
+    print 'area_per_bearing (m**2): %f' % p.root.comp.unknowns['bearing_area']
+    print 'length_per_bearing (m): %f' % p.root.comp.unknowns['bearing_len']
     print 'bearing_width (m): %f' % p.root.comp.unknowns['bearing_width']
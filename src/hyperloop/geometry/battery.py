@@ -20,6 +20,17 @@ class Battery(Component):
         unknowns['volume'] = params['energy'] / params['U']
         unknowns['len'] = unknowns['volume'] / params['cross_section']
 
+    def linearize(self, params, unknowns, resids):
+        J = {}
+        J['mass', 'energy'] = 1.0 / params['e']
+        J['mass', 'e'] = -unknowns['mass'] / params['e']
+        J['volume', 'energy'] = 1.0 / params['U']
+        J['volume', 'U'] = -unknowns['volume'] / params['U']
+        J['len', 'energy'] = J['volume', 'energy'] / params['cross_section']
+        J['len', 'U'] = J['volume', 'U'] / params['cross_section']
+        J['len', 'cross_section'] = -unknowns['len'] / params['cross_section']
+        return J
+
 if __name__ == '__main__':
     from openmdao.core.problem import Problem
     from openmdao.core.group import Group
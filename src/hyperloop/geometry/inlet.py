@@ -24,6 +24,22 @@ class InletGeom(Component):
         unknowns['bypass_area'] = params['tube_area'] - params['cross_section']
         unknowns['area_frontal'] = pi * (unknowns['r_back_outer']) ** 2
 
+    def linearize(self, params, unknowns, resids):
+        J = {}
+        r_back_inner = unknowns['r_back_inner']
+        hub_to_tip = params['hub_to_tip']
+        # sqrt is not differentiable at zero flow area
+        J['r_back_inner', 'area_out'] = 0.5 / (pi * (1.0 - hub_to_tip ** 2) * r_back_inner) if r_back_inner > 0.0 else 0.0
+        J['r_back_inner', 'hub_to_tip'] = r_back_inner * hub_to_tip / (1.0 - hub_to_tip ** 2)
+        J['r_back_outer', 'area_out'] = J['r_back_inner', 'area_out']
+        J['r_back_outer', 'hub_to_tip'] = J['r_back_inner', 'hub_to_tip']
+        J['r_back_outer', 'wall_thickness'] = 1.0
+        J['bypass_area', 'tube_area'] = 1.0
+        J['bypass_area', 'cross_section'] = -1.0
+        for name in ('area_out', 'hub_to_tip', 'wall_thickness'):
+            J['area_frontal', name] = 2.0 * pi * unknowns['r_back_outer'] * J['r_back_outer', name]
+        return J
+
 if __name__ == '__main__':
     from openmdao.core.problem import Problem
     from openmdao.core.group import Group
@@ -17,5 +17,17 @@ class TubeStructural(Component):
         self.add_output('tube_area', 2.33, desc='cross sectional area inside of tube', units='m**2')
 
     def solve_nonlinear(self, params, unknowns, resids):
-        unknowns['tube_r_outer'] = params['tube_r'] * (1.0 + THICKNESS_RATIO)
-        unknowns['tube_area'] = pi * params['tube_r'] ** 2 - params['fill_area']
+        unknowns['tube_r_outer'], unknowns['tube_area'] = TubeStructural.calc(params['tube_r'],
+                params['fill_area'])
+
+    def linearize(self, params, unknowns, resids):
+        J = {}
+        J['tube_r_outer', 'tube_r'] = 1.0 + THICKNESS_RATIO
+        J['tube_area', 'tube_r'] = 2.0 * pi * params['tube_r']
+        J['tube_area', 'fill_area'] = -1.0
+        return J
+
+    @staticmethod
+    def calc(tube_r, fill_area):
+        '''Returns (tube_r_outer, tube_area); accepts scalars or NumPy arrays.'''
+        return tube_r * (1.0 + THICKNESS_RATIO), pi * tube_r ** 2 - fill_area
@@ -0,0 +1,222 @@
+'''
+grid_table.py -
+    Binary format for gridded tables (compressor maps, property tables),
+    memory mapped read only when loaded: opening a table reads only its
+    header, whatever its size, and every process of a parallel sweep that
+    loads the same file shares its pages through the OS cache instead of
+    holding a copy.
+
+    A table file is
+        8 bytes     MAGIC
+        4 bytes     header length, little endian uint32
+        header      JSON {"axes": [[name, length], ...], "vars": [name, ...],
+                    "units": {name: units}}, padded with spaces so the data
+                    starts on a multiple of ALIGN bytes
+        data        little endian float64: the values of every axis in
+                    order, then the grid in C order, shaped (axis lengths...,
+                    number of vars)
+
+    python grid_table.py convert map.csv map.tbl --axes Nc beta
+    python grid_table.py validate map.tbl
+'''
+
+import os
+import json
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = 'HLTABLE1'
+ALIGN = 64
+DTYPE = np.dtype('<f8')
+
+
+class Table(object):
+    '''
+    A loaded table. `axes` is a list of (name, values) pairs, `vars` the
+    names along the last axis of `values`, which is shaped (axis
+    lengths..., len(vars)). The arrays are read only views of the file.
+    '''
+
+    def __init__(self, axes, vars, values, units=None):
+        self.axes = axes
+        self.vars = tuple(vars)
+        self.values = values
+        self.units = units or {}
+
+    def axis(self, name):
+        '''Values of the axis `name`.'''
+        return dict(self.axes)[name]
+
+    def __getitem__(self, name):
+        '''Grid of the var `name`.'''
+        return self.values[..., self.vars.index(name)]
+
+
+def _layout(filename, f):
+    '''Header and data offset of the open table file `f`.'''
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError('%s is not a table file' % filename)
+    try:
+        size = struct.unpack('<I', f.read(4))[0]
+        header = json.loads(f.read(size))
+    except (struct.error, ValueError):
+        raise ValueError('%s has a corrupt table header' % filename)
+    return header, len(MAGIC) + 4 + size
+
+
+def read_table(filename):
+    '''Memory maps the table in `filename`; see `load_table`.'''
+    with open(filename, 'rb') as f:
+        header, offset = _layout(filename, f)
+    lengths = [int(n) for name, n in header['axes']]
+    n_vars = len(header['vars'])
+    n_axes = sum(lengths)
+    count = n_axes + int(np.prod(lengths)) * n_vars
+    if os.path.getsize(filename) != offset + count * DTYPE.itemsize:
+        raise ValueError('%s holds %d bytes of data, not the %d of its header' %
+                (filename, os.path.getsize(filename) - offset, count * DTYPE.itemsize))
+
+    data = np.memmap(filename, dtype=DTYPE, mode='r', offset=offset, shape=(count,))
+    axes = []
+    start = 0
+    for name, n in header['axes']:
+        axes.append((name, data[start:start + n]))
+        start += n
+    values = data[n_axes:].reshape(tuple(lengths) + (n_vars,))
+    return Table(axes, header['vars'], values, header.get('units'))
+
+
+_tables = {}
+
+def load_table(filename):
+    '''
+    `read_table`, reusing the mapped table while the file is unchanged.
+    Only the header is read here; the data is paged in as it is used.
+    '''
+    key = (os.path.abspath(filename), os.path.getmtime(filename))
+    if key not in _tables:
+        _tables[key] = read_table(filename)
+    return _tables[key]
+
+
+def write_table(filename, axes, vars, units=None):
+    '''
+    Writes a table.
+
+    Parameters
+    ----------
+    filename : str
+        Written to a temporary file first and renamed, so processes that
+        have the old table mapped keep a consistent copy.
+    axes : list
+        (name, values) pairs of the grid axes, values strictly ascending.
+    vars : list
+        (name, grid) pairs, every grid shaped by the axis lengths.
+    units : dict
+        Units of the axes and vars by name, if any.
+    '''
+    lengths = tuple(len(values) for name, values in axes)
+    grid = np.empty(lengths + (len(vars),), dtype=DTYPE)
+    for i, (name, values) in enumerate(vars):
+        values = np.asarray(values, dtype=float)
+        if values.shape != lengths:
+            raise ValueError('%r is shaped %s, not %s' % (name, values.shape, lengths))
+        grid[..., i] = values
+
+    header = json.dumps({'axes': [[name, len(values)] for name, values in axes],
+            'vars': [name for name, values in vars], 'units': units or {}})
+    pad = -(len(MAGIC) + 4 + len(header)) % ALIGN
+    header += ' ' * pad
+
+    path = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(suffix='.tmp', dir=path)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for name, values in axes:
+            f.write(np.asarray(values, dtype=DTYPE).tostring())
+        f.write(grid.tostring())
+    os.rename(tmp_name, filename)
+
+
+def read_csv_grid(filename, axes, delimiter=','):
+    '''
+    Reads a CSV file with a header line and one row per grid point into
+    (axes, vars) pairs for `write_table`: the columns named in `axes` span
+    the grid, every other column is a var. Raises ValueError unless the
+    rows cover the grid exactly once.
+    '''
+    data = np.genfromtxt(filename, delimiter=delimiter, names=True)
+    for name in axes:
+        if name not in data.dtype.names:
+            raise ValueError('%s has no %r column (columns: %s)' %
+                    (filename, name, ', '.join(data.dtype.names)))
+    axis_values, index = [], []
+    for name in axes:
+        values, i = np.unique(data[name], return_inverse=True)
+        axis_values.append((name, values))
+        index.append(i)
+    lengths = tuple(len(values) for name, values in axis_values)
+    flat = np.ravel_multi_index(index, lengths)
+    if len(data) != np.prod(lengths) or len(np.unique(flat)) != len(data):
+        raise ValueError('%s is not a full %s grid' % (filename, ' by '.join(axes)))
+
+    vars = []
+    for name in data.dtype.names:
+        if name not in axes:
+            grid = np.empty(lengths)
+            grid.ravel()[flat] = data[name]
+            vars.append((name, grid))
+    return axis_values, vars
+
+
+def csv_to_table(csv_file, table_file, axes, units=None, delimiter=','):
+    '''Converts a CSV grid (see `read_csv_grid`) to a table file.'''
+    axis_values, vars = read_csv_grid(csv_file, axes, delimiter)
+    write_table(table_file, axis_values, vars, units)
+    return table_file
+
+
+def validate_table(filename, axes=None, vars=None):
+    '''
+    Checks that `filename` is a complete table with strictly ascending axes
+    and finite values and, if given, the `axes` and `vars` named. Raises
+    ValueError on the first problem, returns the Table otherwise.
+    '''
+    table = read_table(filename)
+    names = [name for name, values in table.axes]
+    if axes is not None and list(axes) != names:
+        raise ValueError('%s has axes %s, not %s' % (filename, names, list(axes)))
+    if vars is not None and not set(vars) <= set(table.vars):
+        raise ValueError('%s has no %s' % (filename, ', '.join(sorted(set(vars) -
+                set(table.vars)))))
+    for name, values in table.axes:
+        if len(values) < 2 or np.any(np.diff(values) <= 0.0):
+            raise ValueError('axis %r of %s is not strictly ascending' % (name, filename))
+    if not np.all(np.isfinite(table.values)):
+        raise ValueError('%s has values that are not finite' % filename)
+    return table
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description='Converts and checks gridded table files.')
+    commands = parser.add_subparsers(dest='command')
+    convert = commands.add_parser('convert', help='CSV grid to table file')
+    convert.add_argument('csv', help='CSV with a header line, one row per grid point')
+    convert.add_argument('table', help='table file to write')
+    convert.add_argument('--axes', nargs='+', required=True, help='columns spanning the grid')
+    validate = commands.add_parser('validate', help='check a table file')
+    validate.add_argument('table')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        csv_to_table(args.csv, args.table, args.axes)
+    table = validate_table(args.table)
+    print '%s: %s over %s' % (args.table, ', '.join(table.vars),
+            ' x '.join('%s[%d]' % (name, len(values)) for name, values in table.axes))
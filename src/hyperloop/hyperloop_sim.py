@@ -2,7 +2,6 @@ from openmdao.core.group import Group
 from openmdao.core.component import Component
 from openmdao.components.indep_var_comp import IndepVarComp
 from openmdao.components.exec_comp import ExecComp
-from openmdao.drivers.scipy_optimizer import ScipyOptimizer
 from openmdao.units.units import convert_units as cu
 
 from pycycle.components.flow_start import FlowStart
@@ -11,8 +10,17 @@ from cycle.compression_system import CompressionSystem
 from cycle.splitter import SplitterW
 from geometry.pod import Pod
 from aero import Aero
+from vacuum import VacuumSystem
+from util import set_unknowns
 
-from math import pi, sqrt
+import numpy as np
+from math import pi
+
+# operating point variables that HyperloopSim.run_batch is typically swept over
+BATCH_PARAMS = ('pod_MN', 'tube_P', 'tube_T', 'inlet_area', 'cross_section')
+# results recorded by HyperloopSim.run_batch unless others are requested
+BATCH_OUTPUTS = ('bypass_W', 'comp1_cfm', 'compression_system.comp1.power',
+        'compression_system.perf.Fnet')
 
 
 class TubeFlow(Component):
@@ -38,15 +46,50 @@ class TubeFlow(Component):
         self.add_param('converted_inlet_area', 0.0, units='m**2')
 
     def solve_nonlinear(self, params, unknowns, resids):
-        gam = params['gamma']
-        MN = params['pod_MN']
-        Ts = params['tube_T']
-        Ps = params['tube_P']
-        R = params['R']
-        multiplier = (1.0 + (gam - 1.0) / 2.0 * MN ** 2)
-        unknowns['Pt'] = Ps * multiplier ** (gam / (gam - 1.0))
-        unknowns['Tt'] = Ts * multiplier
-        unknowns['W'] = Ps / R / Ts * params['tube_area'] * MN * sqrt(gam * R * Ts)
+        unknowns['Pt'], unknowns['Tt'], unknowns['W'] = TubeFlow.calc(params['pod_MN'],
+                params['tube_T'], params['tube_P'], params['tube_area'], params['gamma'],
+                params['R'])
+
+    def linearize(self, params, unknowns, resids):
+        pod_MN, gamma, R = params['pod_MN'], params['gamma'], params['R']
+        tube_T, tube_P, tube_area = params['tube_T'], params['tube_P'], params['tube_area']
+        multiplier = (1.0 + (gamma - 1.0) / 2.0 * pod_MN ** 2)
+        exponent = gamma / (gamma - 1.0)
+        W = unknowns['W']
+
+        J = {}
+        J['Pt', 'tube_P'] = multiplier ** exponent
+        J['Pt', 'pod_MN'] = unknowns['Pt'] * exponent * (gamma - 1.0) * pod_MN / multiplier
+        J['Pt', 'gamma'] = unknowns['Pt'] * (exponent * pod_MN ** 2 / (2.0 * multiplier) -
+                np.log(multiplier) / (gamma - 1.0) ** 2)
+        J['Tt', 'tube_T'] = multiplier
+        J['Tt', 'pod_MN'] = tube_T * (gamma - 1.0) * pod_MN
+        J['Tt', 'gamma'] = tube_T * pod_MN ** 2 / 2.0
+        # W = tube_P * tube_area * pod_MN * sqrt(gamma / (R * tube_T))
+        J['W', 'pod_MN'] = tube_P * tube_area * np.sqrt(gamma / (R * tube_T))
+        J['W', 'tube_P'] = tube_area * pod_MN * np.sqrt(gamma / (R * tube_T))
+        J['W', 'tube_area'] = tube_P * pod_MN * np.sqrt(gamma / (R * tube_T))
+        J['W', 'tube_T'] = -W / (2.0 * tube_T)
+        J['W', 'gamma'] = W / (2.0 * gamma)
+        J['W', 'R'] = -W / (2.0 * R)
+        return J
+
+    @staticmethod
+    def calc(pod_MN, tube_T, tube_P, tube_area, gamma=1.41, R=286.0):
+        '''
+        Closed-form tube flow relations; arguments may be scalars or NumPy
+        arrays, which are broadcast against each other.
+
+        Returns
+        -------
+        tuple
+            (Pt, Tt, W) in the units of the component outputs.
+        '''
+        multiplier = (1.0 + (gamma - 1.0) / 2.0 * pod_MN ** 2)
+        Pt = tube_P * multiplier ** (gamma / (gamma - 1.0))
+        Tt = tube_T * multiplier
+        W = tube_P / R / tube_T * tube_area * pod_MN * np.sqrt(gamma * R * tube_T)
+        return Pt, Tt, W
 
 
 class BypassFlow(Component):
@@ -69,18 +112,58 @@ class BypassFlow(Component):
         self.add_output('bypass_W', 0.0, desc='mass flow through bypass', units='kg/s')
 
     def solve_nonlinear(self, params, unknowns, resids):
-        gam = params['gamma']
-        MN = params['bypass_MN']
-        multiplier = (1.0 + (gam - 1.0) / 2.0 * MN ** 2)
-        rhos = params['rhot'] * multiplier ** (1.0 / (1.0 - gam))
-        Ts = params['Tt'] / multiplier
-        Vflow = MN * sqrt(gam * params['R'] * Ts)
-        unknowns['bypass_W'] = min(rhos * Vflow * params['bypass_area'],
-                params['total_W'] * params['percent_into_bypass'])
+        unknowns['bypass_W'] = BypassFlow.calc(params['rhot'], params['Tt'], params['bypass_MN'],
+                params['bypass_area'], params['total_W'], params['percent_into_bypass'],
+                params['gamma'], params['R'])
+
+    def linearize(self, params, unknowns, resids):
+        rhot, Tt, bypass_MN = params['rhot'], params['Tt'], params['bypass_MN']
+        gamma, R, bypass_area = params['gamma'], params['R'], params['bypass_area']
+        multiplier = (1.0 + (gamma - 1.0) / 2.0 * bypass_MN ** 2)
+        # rhos * Vflow * bypass_area = rhot * sqrt(gamma * R * Tt) * bypass_area * bypass_MN *
+        # multiplier ** exponent
+        exponent = 1.0 / (1.0 - gamma) - 0.5
+        sonic_W = rhot * np.sqrt(gamma * R * Tt) * bypass_area
+        W_flow = sonic_W * bypass_MN * multiplier ** exponent
+        names = ('rhot', 'Tt', 'bypass_MN', 'gamma', 'R', 'bypass_area', 'total_W',
+                'percent_into_bypass')
+
+        dW = dict.fromkeys(names, 0.0)
+        if W_flow < params['total_W'] * params['percent_into_bypass']:
+            dW['rhot'] = np.sqrt(gamma * R * Tt) * bypass_area * bypass_MN * multiplier ** exponent
+            dW['Tt'] = W_flow / (2.0 * Tt)
+            dW['R'] = W_flow / (2.0 * R)
+            dW['bypass_area'] = rhot * np.sqrt(gamma * R * Tt) * bypass_MN * multiplier ** exponent
+            dW['bypass_MN'] = sonic_W * multiplier ** exponent * \
+                    (1.0 + exponent * (gamma - 1.0) * bypass_MN ** 2 / multiplier)
+            dW['gamma'] = W_flow * (1.0 / (2.0 * gamma) + np.log(multiplier) / (1.0 - gamma) ** 2 +
+                    exponent * bypass_MN ** 2 / (2.0 * multiplier))
+        else:
+            dW['total_W'] = params['percent_into_bypass']
+            dW['percent_into_bypass'] = params['total_W']
+
+        return dict((('bypass_W', name), dW[name]) for name in names)
+
+    @staticmethod
+    def calc(rhot, Tt, bypass_MN, bypass_area, total_W, percent_into_bypass=1.0 - 1e-4,
+            gamma=1.41, R=286.0):
+        '''
+        Closed-form bypass weight flow; arguments may be scalars or NumPy
+        arrays, which are broadcast against each other.
+        '''
+        multiplier = (1.0 + (gamma - 1.0) / 2.0 * bypass_MN ** 2)
+        rhos = rhot * multiplier ** (1.0 / (1.0 - gamma))
+        Ts = Tt / multiplier
+        Vflow = bypass_MN * np.sqrt(gamma * R * Ts)
+        return np.minimum(rhos * Vflow * bypass_area, total_W * percent_into_bypass)
 
 
 class HyperloopSim(Group):
-    def __init__(self):
+    '''
+    Pod, tube flow and compression system. `compressor_maps` runs the
+    compressors it names off design (see CompressionSystem).
+    '''
+    def __init__(self, compressor_maps=None):
         super(HyperloopSim, self).__init__()
 
         pod_promotes = ('cross_section', 'bypass_area', 'tube_P', 'tube_T', 'tube_r', 'tube_area',
@@ -94,7 +177,8 @@ class HyperloopSim(Group):
         self.add('start', FlowStart())
         self.add('bypass_flow', BypassFlow(), promotes=bypass_fl_promotes)
         self.add('split', SplitterW(mode='area'))
-        self.add('compression_system', CompressionSystem())
+        self.add('compression_system', CompressionSystem(compressor_maps))
+        self.add('vacuum', VacuumSystem(), promotes=('tube_P', 'tube_r', 'fill_area'))
 
         # non-essential boundary params here to provide definite default values
         self.add('tube_P_param', IndepVarComp('tube_P', 99.0, units='Pa'), promotes=['*'])
@@ -108,6 +192,17 @@ class HyperloopSim(Group):
         self.add('comp2_exit_MN_param', IndepVarComp('comp2_exit_MN', 0.8), promotes=['*'])
         self.add('inlet_area_param', IndepVarComp('inlet_area', 0.785, units='m**2'),
                 promotes=['*'])
+        self.add('cross_section_param', IndepVarComp('cross_section', 1.4, units='m**2'),
+                promotes=['*'])
+        self.add('tube_r_param', IndepVarComp('tube_r', 0.9, units='m'), promotes=['*'])
+
+        # compressor design values; mapped compressors take them on their map
+        for comp in ('comp1', 'comp2'):
+            self.add('%s_design_param' % comp, IndepVarComp([('%s_PR_design' % comp, 1.5),
+                    ('%s_eff_design' % comp, 0.8)]), promotes=['*'])
+            target = comp + '_map' if comp in self.compression_system.maps else comp
+            self.connect('%s_PR_design' % comp, 'compression_system.%s.PR_design' % target)
+            self.connect('%s_eff_design' % comp, 'compression_system.%s.eff_design' % target)
 
         # connect known flow values to FlowStart component
         self.connect('tube_flow.W', 'start.W')
@@ -146,7 +241,8 @@ class HyperloopSim(Group):
 
     @staticmethod
     def p_factory(tube_P=99.0, tube_T=292.6, pod_MN=0.2, inlet_area=0.33,
-        cross_section=0.82, tube_r=0.9, fill_area=0.214, bypass_MN=0.9):
+        cross_section=0.82, tube_r=0.9, fill_area=0.214, bypass_MN=0.9, cache=None,
+        compressor_maps=None):
         '''
         Sets up an OpenMDAO system for a basic scenario and returns the top-
         level problem.
@@ -169,6 +265,14 @@ class HyperloopSim(Group):
             Cross-sectional area of tube filled by concrete floor in m**2.
         bypass_MN : float
             Desired maximum Mach number of air passing around pod.
+        cache : cache.ResultCache
+            If given, p.run() restores previously converged solutions of the
+            same inputs from this cache instead of solving again.
+        compressor_maps : dict
+            compressor_map.MapData keyed by 'comp1' and/or 'comp2' to run
+            those compressors off design; their design PR and efficiency
+            ('comp1_PR_design' and so on) then feed the map components.
+            Size them with `size_compressors`.
 
         Returns
         -------
@@ -177,7 +281,7 @@ class HyperloopSim(Group):
 
         from openmdao.core.problem import Problem
 
-        g = HyperloopSim()
+        g = HyperloopSim(compressor_maps)
         p = Problem(root=g)
         
         p.setup(check=False)
@@ -193,20 +297,108 @@ class HyperloopSim(Group):
         # compression system
         p['inlet_area'] = inlet_area
         p['cross_section'] = cross_section
-        p['compression_system.comp1.PR_design'] = 1.5
-        p['compression_system.comp1.eff_design'] = 0.8
+        p['comp1_PR_design'] = 1.5
+        p['comp1_eff_design'] = 0.8
         p['comp1_exit_MN'] = 0.35 # keep internal MN greater than or equal to MN of bypass to avoid
                 # trailing vacuum
         p['air_bearing_W'] = 1e-4 # negligible
         p['internal_bypass_MN'] = 0.9
         p['comp2_mouth_MN'] = 0.8
         p['compression_system.nozzle.dPqP'] = 0.0
-        p['compression_system.comp2.PR_design'] = 1.0
-        p['compression_system.comp2.eff_design'] = 1.0
+        p['comp2_PR_design'] = 1.0
+        p['comp2_eff_design'] = 1.0
         p['comp2_exit_MN'] = 0.8
 
+        if cache is not None:
+            cache.attach(p)
+
         return p
 
+    @staticmethod
+    def size_compressors(p):
+        '''
+        Sizes the mapped compressors of `p` (a p_factory problem with
+        compressor_maps) at the current operating point, which becomes
+        their design point: runs p, sets each map's Wc_design and Tt_design
+        to the corrected flow and inlet temperature it receives and runs
+        again, so that the map passes PR_design and eff_design here. Off
+        design, the corrected speed then follows from the inlet temperature
+        and the mechanical speed set with the 'N' param of the map
+        components.
+        '''
+        p.run()
+        for comp in ('comp1', 'comp2'):
+            if comp in p.root.compression_system.maps:
+                path = 'compression_system.%s_map' % comp
+                p[path + '.Wc_design'] = p[path + '.Wc']
+                p[path + '.Tt_design'] = p[path + '.Tt']
+        p.run()
+        return p
+
+    @staticmethod
+    def run_batch(points, outputs=BATCH_OUTPUTS, p=None, n_procs=1, **kwargs):
+        '''
+        Evaluates the model over arrays of operating points, one solve per
+        point, with `sweep.run_points`: serially in `p` or spread over
+        `n_procs` worker processes.
+
+        Parameters
+        ----------
+        points : dict of numpy.array
+            Values keyed by variable name, usually a subset of `BATCH_PARAMS`.
+            Arrays are broadcast against each other; variables that are not
+            given keep their current value in `p`, or in the problems the
+            workers build when run in parallel.
+        outputs : sequence of str
+            OpenMDAO variable names to record for every point.
+        p : openmdao.core.problem.Problem
+            Problem for serial runs. A default `p_factory` problem is built
+            if omitted.
+        n_procs : int
+            Number of worker processes; None uses every CPU and 1 runs
+            serially in `p`.
+
+        Other keyword arguments (factory_kwargs, settings, chunksize,
+        callback, continuation, cache, pool) are passed to `run_points`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Structured array shaped like the broadcast inputs with one field
+            per input, one field per output and a boolean 'failed' field.
+            Outputs of failed points are NaN. The inputs and solution of
+            `p` are restored afterwards.
+        '''
+        from sweep import run_points
+
+        names = list(points)
+        arrays = np.broadcast_arrays(*[np.asarray(points[name], dtype=float) for name in names])
+        shape = arrays[0].shape
+        columns = [arr.ravel() for arr in arrays]
+
+        # p is left with the inputs and solution it came with
+        if p is not None:
+            saved = [(name, np.array(p[name], copy=True)) for name in names]
+            saved_unknowns = p.root.unknowns.vec.copy()
+        try:
+            y, errors = run_points([dict(zip(names, x)) for x in zip(*columns)], outputs, p=p,
+                    n_procs=n_procs, **kwargs)
+        finally:
+            if p is not None:
+                for name, val in saved:
+                    p[name] = val
+                set_unknowns(p, saved_unknowns)
+
+        fields = names + [name for name in outputs if name not in names]
+        result = np.zeros(arrays[0].size, dtype=[(name, float) for name in fields] +
+                [('failed', bool)])
+        for name, column in zip(names, columns):
+            result[name] = column
+        for name, values in zip(outputs, y):
+            result[name] = values
+        result['failed'][list(errors)] = True
+        return result.reshape(shape)
+
 
 if __name__ == "__main__":
     print 'Setting up...'
@@ -223,8 +415,8 @@ if __name__ == "__main__":
     print 'Ambient tube temperature:', ' ' * 14, cu(p['tube_T'], 'degK', 'degC'), 'degC'
     print 'Maximum pod cross-section:', ' ' * 13, p['cross_section'], 'm**2'
     print 'Inlet area:', ' ' * 28, p['inlet_area'], 'm**2'
-    print 'Comp 1 PR:', ' ' * 29, p['compression_system.comp1.PR_design']
-    print 'Comp 2 PR:', ' ' * 29, p['compression_system.comp2.PR_design']
+    print 'Comp 1 PR:', ' ' * 29, p['comp1_PR_design']
+    print 'Comp 2 PR:', ' ' * 29, p['comp2_PR_design']
     print ''
     print 'WARNING: Temp values for compressors are wrong. With temp, proceed with caution.'
     print 'Optimizing...'
@@ -244,7 +436,7 @@ if __name__ == "__main__":
     print 'Mass flow through bypass:', ' ' * 14, p['bypass_W'], 'kg/s'
     print 'Mass flow through compression system:', ' ' * 2, p['split.split_calc.W2'], 'kg/s'
     print ''
-    print 'Comp 1 PR:', ' ' * 23, p['compression_system.comp1.PR_design']
+    print 'Comp 1 PR:', ' ' * 23, p['comp1_PR_design']
     print 'Comp 1 pwr req:', ' ' * 24, -cu(p['compression_system.comp1.power'], 'hp', 'W'), 'W'
     print 'Total pressure comp 1 exit:', ' ' * 3, cu(p['compression_system.comp1.Fl_O:tot:P'],
             'psi', 'Pa'), 'Pa'
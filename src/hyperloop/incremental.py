@@ -0,0 +1,236 @@
+'''
+incremental.py -
+    Incremental execution of a set up OpenMDAO problem: after a converged
+    run, the next run re-executes only the components downstream of the
+    boundary inputs that changed since, following the connections of the
+    model, and skips every other subsystem, whose outputs are still valid.
+'''
+
+from collections import defaultdict
+
+import numpy as np
+
+from openmdao.core.group import Group
+from openmdao.solvers.run_once import RunOnce
+
+from util import input_names, set_unknowns
+
+
+def _owner(pathname):
+    return pathname.rsplit('.', 1)[0]
+
+
+def _value(val):
+    return np.array(val, copy=True) if isinstance(val, np.ndarray) else val
+
+
+def _same(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    return a == b
+
+
+class IncrementalRun(object):
+    '''
+    Makes p.run() skip the subsystems of `p` that no changed input reaches.
+
+    The boundary inputs (util.input_names) are compared with their values
+    at the end of the last run. The components owning the changed ones and
+    everything downstream of them in the connection graph are dirty; each
+    subsystem of a group run in order (RunOnce) is executed only if it
+    contains a dirty component, and groups with iterative solvers run
+    whole. The first run, and the first after `reset`, runs everything.
+
+    Usage:
+
+        with IncrementalRun(p) as inc:
+            p.run()
+            p['comp2_PR_design'] = 1.2
+            p.run() # runs comp2 and what depends on it
+
+    Attributes
+    ----------
+    executed, skipped : list
+        Pathnames of the subsystems run and skipped by the last run.
+    '''
+
+    def __init__(self, p):
+        self.p = p
+        root = p.root
+        self._originals = []
+        self._snapshot = None
+        self.dirty = None
+        self.executed = []
+        self.skipped = []
+
+        # component graph of the connections
+        self._downstream = defaultdict(set)
+        connections = p._probdata.connections
+        for tgt, (src, idxs) in connections.items():
+            self._downstream[_owner(src)].add(_owner(tgt))
+
+        # components owning each boundary input
+        sysdata = root._sysdata
+        self._inputs = {}
+        for name in input_names(p):
+            owners = set(_owner(path) for path in sysdata.to_abs_pnames.get(name, ())
+                    if path not in connections)
+            if name in sysdata.to_abs_uname:
+                owners.add(_owner(sysdata.to_abs_uname[name]))
+            self._inputs[name] = owners
+
+        # components under every group
+        self._components = {}
+        for system in root.subsystems(recurse=True, include_self=True):
+            if isinstance(system, Group):
+                self._components[system.pathname] = set(comp.pathname
+                        for comp in system.components(recurse=True))
+            else:
+                self._components[system.pathname] = set([system.pathname])
+
+        self._wrap_root(root)
+        self._wrap_children(root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.remove()
+
+    def remove(self):
+        '''Restores the original methods; later runs execute everything.'''
+        for obj, attr, original in reversed(self._originals):
+            if original is None:
+                delattr(obj, attr)
+            else:
+                setattr(obj, attr, original)
+        self._originals = []
+
+    def reset(self):
+        '''Makes the next run execute every subsystem.'''
+        self._snapshot = None
+
+    def inputs(self):
+        '''Current values of every boundary input, keyed by name.'''
+        return dict((name, _value(self.p[name])) for name in self._inputs)
+
+    def changed(self):
+        '''Boundary inputs changed since the last run, or None before the first run.'''
+        if self._snapshot is None:
+            return None
+        return [name for name in self._inputs if not _same(self.p[name], self._snapshot[name])]
+
+    def dirty_components(self):
+        '''Pathnames of the components the next run has to execute, or None for all.'''
+        changed = self.changed()
+        if changed is None:
+            return None
+        dirty = set()
+        stack = [comp for name in changed for comp in self._inputs[name]]
+        while stack:
+            comp = stack.pop()
+            if comp not in dirty:
+                dirty.add(comp)
+                stack.extend(self._downstream[comp])
+        return dirty
+
+    def checkpoint(self):
+        '''Current solution and inputs, for `restore`; valid after a run.'''
+        return self.p.root.unknowns.vec.copy(), dict(self._snapshot)
+
+    def restore(self, checkpoint):
+        '''
+        Returns the problem to a `checkpoint`: its inputs, its solution and
+        the reference the next run is compared against, so that a run after
+        changing one input only executes what depends on that input.
+        '''
+        vec, snapshot = checkpoint
+        for name, val in snapshot.items():
+            self.p[name] = val
+        set_unknowns(self.p, vec)
+        self._snapshot = dict(snapshot)
+
+    def _wrap_root(self, root):
+        solve = root.solve_nonlinear
+        self._originals.append((root, 'solve_nonlinear', root.__dict__.get('solve_nonlinear')))
+
+        def incremental_solve(*args, **kwargs):
+            self.dirty = self.dirty_components()
+            self.executed = []
+            self.skipped = []
+            try:
+                if self.dirty is None or self.dirty:
+                    solve(*args, **kwargs)
+            except Exception:
+                # a failed run leaves no valid solution to build on
+                self._snapshot = None
+                raise
+            finally:
+                self.dirty = None
+            self._snapshot = self.inputs()
+
+        root.solve_nonlinear = incremental_solve
+
+    def _wrap_children(self, group):
+        if isinstance(group.nl_solver, RunOnce):
+            for sub in group.subsystems():
+                self._wrap(sub)
+                if isinstance(sub, Group):
+                    self._wrap_children(sub)
+
+    def _wrap(self, system):
+        solve = system.solve_nonlinear
+        components = self._components[system.pathname]
+        self._originals.append((system, 'solve_nonlinear',
+                system.__dict__.get('solve_nonlinear')))
+
+        def incremental_solve(*args, **kwargs):
+            if self.dirty is not None and not components & self.dirty:
+                self.skipped.append(system.pathname)
+                return
+            self.executed.append(system.pathname)
+            return solve(*args, **kwargs)
+
+        system.solve_nonlinear = incremental_solve
+
+
+def one_at_a_time(p, steps, outputs, inc=None):
+    '''
+    One factor at a time sensitivities of `outputs` to the inputs in
+    `steps`, by forward differences from the current inputs of `p`. Each
+    perturbed run only executes the subsystems downstream of its input.
+
+    Parameters
+    ----------
+    p : openmdao.core.problem.Problem
+    steps : dict
+        Step size keyed by input name.
+    outputs : sequence of str
+        Variable names to difference.
+    inc : IncrementalRun
+        Attached to `p` if given; otherwise one is attached for the study
+        and removed afterwards.
+
+    Returns
+    -------
+    dict
+        d(output)/d(input) keyed by (output, input).
+    '''
+    own = inc is None
+    if own:
+        inc = IncrementalRun(p)
+    try:
+        p.run()
+        base = dict((name, _value(p[name])) for name in outputs)
+        checkpoint = inc.checkpoint()
+        sens = {}
+        for name, step in steps.items():
+            p[name] = p[name] + step
+            p.run()
+            for out in outputs:
+                sens[out, name] = (p[out] - base[out]) / step
+            inc.restore(checkpoint)
+        return sens
+    finally:
+        if own:
+            inc.remove()
@@ -0,0 +1,148 @@
+'''
+isentropic.py -
+    Isentropic area-Mach relation A/A*(M, gamma) and its inverse, evaluated
+    from a cached monotone interpolation table and polished with Newton
+    steps so that no per-point root finding is needed elsewhere.
+'''
+
+import numpy as np
+from scipy.interpolate import PchipInterpolator
+
+SUBSONIC = 'subsonic'
+SUPERSONIC = 'supersonic'
+
+# Mach range covered by each table; inverses outside it start from the
+# extrapolated table and are left to the Newton steps
+TABLE_MACH = (1e-4, 50.0)
+TABLE_SIZE = 400
+
+# tables built so far, keyed by gamma
+_tables = {}
+
+
+def area_ratio(Mach, gamma=1.41):
+    '''Isentropic area ratio A/A* at `Mach`; accepts scalars or NumPy arrays.'''
+    g_exp = (gamma + 1.0) / (2.0 * (gamma - 1.0))
+    return ((gamma + 1.0) / 2.0) ** -g_exp * (1.0 + (gamma - 1.0) / 2.0 * Mach ** 2) ** g_exp / Mach
+
+
+def log_area_ratio_partials(Mach, gamma=1.41):
+    '''
+    Returns the partial derivatives (d ln(A/A*)/d Mach, d ln(A/A*)/d gamma)
+    of the isentropic area ratio; accepts scalars or NumPy arrays.
+    '''
+    g_exp = (gamma + 1.0) / (2.0 * (gamma - 1.0))
+    multiplier = 1.0 + (gamma - 1.0) / 2.0 * Mach ** 2
+    dMach = (Mach ** 2 - 1.0) / (Mach * multiplier)
+    dgamma = -np.log(2.0 * multiplier / (gamma + 1.0)) / (gamma - 1.0) ** 2 + \
+            g_exp * (Mach ** 2 / (2.0 * multiplier) - 1.0 / (gamma + 1.0))
+    return dMach, dgamma
+
+
+def _log_area_ratio(Mach, gamma):
+    '''ln(A/A*), written with log1p so that it stays accurate next to Mach 1.'''
+    g_exp = (gamma + 1.0) / (2.0 * (gamma - 1.0))
+    return g_exp * np.log1p((gamma - 1.0) / (gamma + 1.0) * (Mach ** 2 - 1.0)) - np.log(Mach)
+
+
+def _sonic_coordinate(Mach, gamma):
+    '''
+    sign(Mach - 1) * sqrt(ln(A/A*)), which increases smoothly and
+    monotonically with Mach across both branches, unlike A/A* itself.
+    '''
+    return np.sign(Mach - 1.0) * np.sqrt(np.maximum(_log_area_ratio(Mach, gamma), 0.0))
+
+
+def table(gamma=1.41):
+    '''
+    Returns the interpolant of ln(Mach) against the sonic coordinate
+    sign(Mach - 1) * sqrt(ln(A/A*)) for `gamma`, building and caching it on
+    first use.
+    '''
+    gamma = float(gamma)
+    if gamma not in _tables:
+        Mach = np.exp(np.linspace(np.log(TABLE_MACH[0]), np.log(TABLE_MACH[1]), TABLE_SIZE))
+        Mach = np.union1d(Mach, [1.0]) # keep the sonic point on a node
+        _tables[gamma] = PchipInterpolator(_sonic_coordinate(Mach, gamma), np.log(Mach),
+                extrapolate=True)
+    return _tables[gamma]
+
+
+def mach_from_area_ratio_partials(Mach, gamma=1.41):
+    '''
+    Returns (d Mach/d ln(AR), d Mach/d gamma) of `mach_from_area_ratio` at
+    the solution `Mach` it returned. Both are zero where Mach is 0 or
+    infinite and unbounded at Mach 1, where A/A* has its minimum.
+    '''
+    Mach = np.asarray(Mach, dtype=float)
+    finite = (Mach > 0.0) & (Mach < np.inf)
+    M = np.where(finite, Mach, 0.5)
+    dMach, dgamma = log_area_ratio_partials(M, gamma)
+    with np.errstate(divide='ignore'):
+        dM_dlnAR = np.where(finite, 1.0 / dMach, 0.0)
+    dM_dgamma = np.where(finite, -dgamma * dM_dlnAR, 0.0)
+    if Mach.ndim:
+        return dM_dlnAR, dM_dgamma
+    return float(dM_dlnAR), float(dM_dgamma)
+
+
+def mach_from_area_ratio(AR, gamma=1.41, branch=SUBSONIC, tol=1e-13, max_iter=20):
+    '''
+    Vectorized inverse of the isentropic area ratio.
+
+    Parameters
+    ----------
+    AR : float or numpy.array
+        Area ratio A/A*.
+    gamma : float
+        Ratio of specific heats.
+    branch : str
+        'subsonic' or 'supersonic' solution.
+    tol : float
+        Newton steps stop once every relative Mach update is below this.
+    max_iter : int
+        Upper bound on the Newton steps after the table lookup.
+
+    Returns
+    -------
+    numpy.array or float
+        Mach number shaped like `AR`; NaN where AR < 1 and 0 (or infinity)
+        where AR is infinite. The result is accurate to better than 1e-10
+        relative; right next to Mach 1, where A/A* flattens out, Mach is
+        only as well defined as sqrt(eps) allows.
+    '''
+    if branch == SUBSONIC:
+        sign = -1.0
+    elif branch == SUPERSONIC:
+        sign = 1.0
+    else:
+        raise ValueError("branch must be '%s' or '%s', not %r" % (SUBSONIC, SUPERSONIC, branch))
+
+    AR = np.asarray(AR, dtype=float)
+    valid = (AR >= 1.0) & (AR < np.inf)
+    target = sign * np.sqrt(np.log(np.where(valid, AR, 1.0)))
+
+    # table lookup, then Newton on the sonic coordinate in ln(Mach), which is
+    # nearly linear at both ends of each branch and smooth through Mach 1
+    log_M = table(gamma)(target)
+    log_M = np.minimum(log_M, 0.0) if sign < 0 else np.maximum(log_M, 0.0)
+    slope_sonic = np.sqrt(2.0 / (gamma + 1.0))
+    for i in range(max_iter):
+        Mach = np.exp(log_M)
+        s = _sonic_coordinate(Mach, gamma)
+        dlnAR = (Mach ** 2 - 1.0) / (1.0 + (gamma - 1.0) / 2.0 * Mach ** 2)
+        near_sonic = np.abs(s) < 1e-6
+        ds = np.where(near_sonic, slope_sonic,
+                np.abs(dlnAR) / (2.0 * np.where(near_sonic, 1.0, np.abs(s))))
+        step = np.where(valid, (target - s) / ds, 0.0)
+        log_M = log_M + step
+        if sign < 0:
+            log_M = np.minimum(log_M, 0.0)
+        else:
+            log_M = np.maximum(log_M, 0.0)
+        if np.all(np.abs(step) < tol):
+            break
+
+    Mach = np.where(valid, np.exp(log_M), np.nan)
+    Mach = np.where(AR == np.inf, 0.0 if sign < 0 else np.inf, Mach)
+    return Mach if Mach.ndim else float(Mach)
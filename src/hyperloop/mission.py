@@ -1,64 +1,248 @@
+'''
+mission.py -
+    Pod trajectory along a route: the speed profile allowed by the
+    acceleration and braking limits, by the speed caps along the route
+    (e.g. from curvature) and optionally by the propulsive thrust, with the
+    power needed against inertia, grade, aerodynamic drag and the net force
+    of the compression system.
+'''
+
 import numpy as np
 
 from openmdao.core.component import Component
 
+from aero import Aero
+
+G = 9.81
+
+
+def curvature_speed_limit(radius, lateral_accel=0.5 * G):
+    '''Highest speed in m/s through a curve of `radius` m at `lateral_accel` m/s**2.'''
+    return np.sqrt(lateral_accel * np.abs(radius))
+
+
+def speed_profile(x, speed_cap, accel, decel, v_start=0.0, v_end=0.0):
+    '''
+    Fastest speed at every position of the ascending grid `x` that stays
+    below `speed_cap` (an array on the grid), starts at `v_start`, ends at
+    `v_end` and accelerates and brakes at no more than `accel` and `decel`
+    (m/s**2, constants or arrays on the grid, each segment taking the value
+    at its start for accelerating and at its end for braking).
+
+    With the acceleration fixed along x, v**2 - 2 * integral(accel dx) is
+    constant, so the envelopes reached from every cap are running minima of
+    v**2 - 2 * integral(accel dx) forward and v**2 + 2 * integral(decel dx)
+    backward; no step by step integration is needed.
+    '''
+    v2 = np.asarray(speed_cap, dtype=float) ** 2 * np.ones(len(x))
+    v2[0] = min(v2[0], v_start ** 2)
+    v2[-1] = min(v2[-1], v_end ** 2)
+    if np.ndim(accel) or np.ndim(decel):
+        dx = np.diff(x)
+        work_accel = np.concatenate(([0.0], np.cumsum(2.0 * (accel * np.ones(len(x)))[:-1] * dx)))
+        work_brake = np.concatenate(([0.0], np.cumsum(2.0 * (decel * np.ones(len(x)))[1:] * dx)))
+    else:
+        work_accel, work_brake = 2.0 * accel * x, 2.0 * decel * x
+    v2_accel = work_accel + np.minimum.accumulate(v2 - work_accel)
+    v2_brake = -work_brake + np.minimum.accumulate((v2 + work_brake)[::-1])[::-1]
+    return np.sqrt(np.maximum(np.minimum(v2, np.minimum(v2_accel, v2_brake)), 0.0))
+
+
+def simulate_mission(route_len=563270.0, max_velocity=308.0, accel=0.5 * G, decel=0.5 * G,
+        speed_cap=None, mass=15000.0, coef_drag=1.0, area_frontal=1.4, rho=1.18e-3,
+        net_force=0.0, pwr_req=0.0, prop_eff=1.0, regen_eff=0.0, dx=1.0, dt=0.1, grade=0.0,
+        thrust_max=None):
+    '''
+    Integrates one trip from standstill to standstill.
+
+    The pod accelerates at `accel` unless `thrust_max` is given and cannot
+    overcome drag and grade at that rate; braking is always at `decel`.
+    Drag comes from `Aero.calc` at the speed of every step.
+
+    Parameters
+    ----------
+    route_len : float
+        Trip length in m.
+    max_velocity : float
+        Speed limit of the pod in m/s.
+    accel, decel : float
+        Largest acceleration and braking rates in m/s**2 (0.5 g by default,
+        as in the Hyperloop Alpha proposal).
+    speed_cap : float, function or (numpy.array, numpy.array)
+        Further speed limit along the route in m/s: a constant, a function
+        of position or (positions, limits) to interpolate, e.g. from
+        `curvature_speed_limit`.
+    mass, coef_drag, area_frontal, rho : float
+        Pod mass (kg), drag coefficient, frontal area (m**2) and tube air
+        density (kg/m**3), as in Aero.
+    net_force : float or function
+        Net force of the compression system in N (CompressionSystem
+        perf.Fnet, converted; positive pushes the pod forward), or a
+        function of speed.
+    pwr_req : float
+        Auxiliary power drawn regardless of motion, e.g. by the compressors
+        and life support, in W; added to the propulsive power.
+    prop_eff, regen_eff : float
+        Efficiency of the propulsion and fraction of braking power
+        recovered.
+    dx : float
+        Position step of the speed profile in m.
+    dt : float
+        Time step of the returned traces in s.
+    grade : float, function or (numpy.array, numpy.array)
+        Rise over run along the route, given like `speed_cap` (e.g.
+        route.Route.grade_at); the pod works against mass * G * grade.
+    thrust_max : float
+        Largest propulsive force in N. If given, acceleration is limited to
+        what it leaves after drag, grade and net_force; ValueError is raised
+        if the pod cannot keep moving.
+
+    Returns
+    -------
+    dict
+        't' (s), 'x' (m), 'v' (m/s), 'a' (m/s**2), 'power' (W) and 'energy'
+        (J, cumulative) traces every `dt`, and 'time_mission' (s) and
+        'energy_total' (J).
+    '''
+    n = max(int(np.ceil(route_len / dx)), 1) + 1
+    x = np.linspace(0.0, route_len, n)
+    cap = np.full(n, float(max_velocity))
+    if callable(speed_cap):
+        cap = np.minimum(cap, speed_cap(x))
+    elif isinstance(speed_cap, tuple):
+        cap = np.minimum(cap, np.interp(x, speed_cap[0], np.minimum(speed_cap[1], cap[0])))
+    elif speed_cap is not None:
+        cap = np.minimum(cap, speed_cap)
+    x_mid = 0.5 * (x[:-1] + x[1:])
+    if callable(grade):
+        grade_at = grade
+    elif isinstance(grade, tuple):
+        grade_at = lambda s: np.interp(s, grade[0], grade[1])
+    else:
+        grade_at = lambda s: grade * np.ones(len(s))
+
+    def resistance(v, slope):
+        # force the pod works against at speed v, net of the compression system
+        return Aero.calc(coef_drag, rho, v, area_frontal) + mass * G * slope - \
+                (net_force(v) if callable(net_force) else net_force)
+
+    v = speed_profile(x, cap, accel, decel)
+    if thrust_max is not None:
+        # the thrust-limited acceleration depends on speed through drag:
+        # alternate between acceleration limits and speed profiles, which
+        # bracket the solution, until they agree
+        grade_nodes = grade_at(x)
+        for _ in range(50):
+            v_prev = v
+            accel_thrust = np.minimum(accel, (thrust_max - resistance(v, grade_nodes)) / mass)
+            v = speed_profile(x, cap, accel_thrust, decel)
+            if np.any(v[1:-1] <= 0.0):
+                raise ValueError('thrust_max of %g N cannot move the pod past %.0f m' %
+                        (thrust_max, x[np.flatnonzero(v[1:-1] <= 0.0)[0] + 1]))
+            if np.max(np.abs(v - v_prev)) < 1e-9 * max_velocity:
+                break
+
+    # constant acceleration over every segment: exact segment times
+    dx_seg = np.diff(x)
+    v_sum = v[:-1] + v[1:]
+    dt_seg = np.where(v_sum > 0.0, 2.0 * dx_seg / np.where(v_sum > 0.0, v_sum, 1.0), 0.0)
+    t_nodes = np.concatenate(([0.0], np.cumsum(dt_seg)))
+    a_seg = (v[1:] ** 2 - v[:-1] ** 2) / (2.0 * dx_seg)
+    v_mid = 0.5 * v_sum
+
+    force = mass * a_seg + resistance(v_mid, grade_at(x_mid))
+    power_prop = force * v_mid
+    power_seg = np.where(power_prop > 0.0, power_prop / prop_eff, power_prop * regen_eff) + \
+            pwr_req
+    energy_nodes = np.concatenate(([0.0], np.cumsum(power_seg * dt_seg)))
+
+    time_mission = t_nodes[-1]
+    t = np.arange(0.0, time_mission + dt, dt)
+    t[-1] = min(t[-1], time_mission)
+    seg = np.clip(np.searchsorted(t_nodes, t, side='right') - 1, 0, n - 2)
+    return {
+        't': t,
+        'x': np.interp(t, t_nodes, x),
+        'v': np.interp(t, t_nodes, v),
+        'a': a_seg[seg],
+        'power': power_seg[seg],
+        'energy': np.interp(t, t_nodes, energy_nodes),
+        'time_mission': time_mission,
+        'energy_total': energy_nodes[-1],
+    }
+
+
 class Mission(Component):
-    '''Place holder for real mission analysis. Could consider a pseudospectral optimal control approach'''
-    def __init__(self):
+    '''
+    Trip time and energy from `simulate_mission`; the traces of the last
+    run are kept in `trace`. Given a route.Route, the trip covers its length
+    within its speed envelope and climbs and descends its grades.
+    '''
+    def __init__(self, tube_len=563270.0, route=None):
+        super(Mission, self).__init__()
+        self.route = route
+        if route is not None:
+            tube_len = route.length
         self.add_param('max_velocity', 308.0, desc='Maximum travel speed for pod', units='m/s')
-        self.add_param('tube_len', 563270.0, desc='length of one trip', units='m')
+        self.add_param('tube_len', tube_len, desc='length of one trip', units='m')
         self.add_param('pwr_marg', 0.3, desc='fractional extra energy requirement')
-        self.add_param('pwr_req', 420.0, desc='average power requirement for a mission', units='kW')
+        self.add_param('pwr_aux', 0.0, desc='auxiliary (hotel) load on top of propulsion, e.g. compressors', units='kW')
+        self.add_param('accel', 0.5 * G, desc='maximum acceleration and braking rate', units='m/s**2')
+        self.add_param('mass', 15000.0, desc='mass of capsule', units='kg')
+        self.add_param('coef_drag', 1.0, desc='capsule drag coefficient')
+        self.add_param('area_frontal', 1.4, desc='frontal area of capsule', units='m**2')
+        self.add_param('rho', 1.18e-3, desc='tube air density', units='kg/m**3')
+        self.add_param('net_force', 0.0, desc='net force of the compression system', units='N')
+        self.add_param('thrust_max', 0.0, desc='largest propulsive force, 0 if accel is always reached', units='N')
 
         self.add_output('time_mission', 0.0, desc='travel time to make one trip', units='s')
         self.add_output('energy', 0.0, desc='total energy storage requirement', units='kW*h')
+        self.add_output('pwr_peak', 0.0, desc='peak power during the trip', units='kW')
+
+        self.trace = None
+
+    def _simulate(self, params, route_len, max_velocity, accel):
+        speed_cap = grade = None
+        if self.route is not None:
+            speed_cap, grade = self.route.speed_envelope(max_velocity), self.route.grade_at
+        return simulate_mission(route_len, max_velocity, accel, accel, speed_cap, params['mass'],
+                params['coef_drag'], params['area_frontal'], params['rho'], params['net_force'],
+                params['pwr_aux'] * 1000.0, grade=0.0 if grade is None else grade,
+                thrust_max=params['thrust_max'] or None)
 
     def solve_nonlinear(self, params, unknowns, resids):
-        '''a VERY coarse approximation that takes the speed profile given in the original proposal as given. It just serves as a place holder for now. It's better than nothing, but a real analysis is needed here'''
-        t1 = (300 - 0) * 1609 / (9.81 * 0.5) / 3600 # time needed to accelerate
-        t2 = (555 - 300) * 1609 / (9.81 * 0.5) / 3600 # time needed to accelerate
-        t3 = (params['max_velocity'] - 555) * 1609 / (9.81 * 0.5) / 3600 # time needed to accelerate
-        #speed profile data from hyperloop alpha proposal, pg43
-        dataStart = np.array([
-            [0, 0],
-            [t1, 300 * 1.609], # (300[mi/h] * 1609[m/mi]) / (9.81[m/s] * 0.5) / 3600[s/h]
-            [167, 300 * 1.609],
-            [167 + t2, 555 * 1.609], # (555 - 300[mi/h] * 1609[m/mi]) / (9.81[m/s] * 0.5) / 3600[s/h]
-            [435, 555 * 1.609],
-            [435 + t3, params['max_velocity']]])
-        startUp = np.trapz(dataStart[:, 1] / 3600, dataStart[:, 0]) * 1000 # km covered during start up Los Angeles Grapevine
-        dataEnd = np.array([
-            [0, params['max_velocity']],
-            [t3, 555 * 1.609],
-            [t3 + 100, 555 * 1.609],
-            [t3 + 100 + t2, 300 * 1.609],
-            [t3 + 100 + t2 + 400, 300 * 1.609],
-            [t3 + 100 + t2 + 400 + t1, 0]])
-        windDown = np.trapz(dataEnd[:, 1] / 3600, dataEnd[:, 0]) * 1000 # km covered during wind down along I-580 to SF      
-        len_middle = params['tube_length'] - (startUp + windDown)
-        time_middle = middleLength / params['max_velocity']
-        unknowns['time_mission'] = time_middle + 435 + t3 + t3 + 100 + t2 + 400 + t1
-
-        unknowns['energy'] = (params['pwr_req'] * unknowns['time_mission'] / 3600.0) * (1 + params['pwr_marg']) # convert to hours
-
-class SubscaleMission(Component):
-    '''Place holder for real mission analysis. Could consider a pseudospectral optimal control approach'''
-    def __init__(self):
+        self.trace = self._simulate(params, params['tube_len'], params['max_velocity'],
+                params['accel'])
+        unknowns['time_mission'] = self.trace['time_mission']
+        unknowns['energy'] = self.trace['energy_total'] / 3.6e6 * (1.0 + params['pwr_marg']) # J to kW*h
+        unknowns['pwr_peak'] = np.max(self.trace['power']) / 1000.0
+
+class SubscaleMission(Mission):
+    '''Subscale test track: the pod is launched to launch_v over launch_time and brakes at the same rate'''
+    def __init__(self, tube_len=1600.0):
+        super(SubscaleMission, self).__init__(tube_len)
         self.add_param('launch_v', 90.0, desc='maximum travel speed for pod', units='m/s')
         self.add_param('launch_time', 5.0, desc='time spent accelerating', units='s')
-        self.add_param('tube_len', 1600.0, desc='length of one trip', units='m')
-        self.add_param('pwr_marg', 0.3, desc='fractional extra energy requirement')
-        self.add_param('pwr_req', 420.0, desc='average power requirement for a mission', units='kW')
 
-        self.add_output('time_mission', 0.0, desc='travel time to make one trip', units='s')
-        self.add_output('energy', 0.0, desc='total energy storage requirement', units='kW*h')
+    def solve_nonlinear(self, params, unknowns, resids):
+        self.trace = self._simulate(params, params['tube_len'], params['launch_v'],
+                params['launch_v'] / params['launch_time'])
+        unknowns['time_mission'] = self.trace['time_mission']
+        unknowns['energy'] = self.trace['energy_total'] / 3.6e6 * (1.0 + params['pwr_marg']) # J to kW*h
+        unknowns['pwr_peak'] = np.max(self.trace['power']) / 1000.0
 
 
 if __name__ == "__main__":
+    from time import time
     from openmdao.core.problem import Problem
     from openmdao.core.group import Group
 
     p = Problem(root=Group())
     p.root.add('comp', Mission())
     p.setup()
+    start = time()
     p.run()
+    print 'Simulated %d s trip in %.3f s' % (p['comp.time_mission'], time() - start)
+    print 'time_mission (min): %f' % (p['comp.time_mission'] / 60.0)
+    print 'energy (kW*h): %f' % p['comp.energy']
+    print 'peak power (kW): %f' % p['comp.pwr_peak']
@@ -0,0 +1,256 @@
+'''
+multipoint.py -
+    Sizes the geometry shared by every operating point of HyperloopSim
+    (inlet area, pod cross section, tube radius, compressor pressure ratio)
+    for the least weighted energy per trip over several operating points
+    at once. The points of an iteration are run in one batch on a pool of
+    worker processes, and each worker also returns the gradient of its
+    point from OpenMDAO's linear solve of the converged model.
+'''
+
+from inspect import getargspec
+
+import numpy as np
+from scipy.optimize import minimize
+
+from openmdao.units.units import convert_units as cu
+
+from hyperloop_sim import HyperloopSim
+from sweep import build_problem, make_pool, run_points
+
+# shared design variables, independent variables of HyperloopSim, and the
+# values HyperloopSim.p_factory starts them at
+DESIGN_VARS = ('inlet_area', 'cross_section', 'tube_r', 'comp1_PR_design')
+DESIGN_DEFAULTS = {'comp1_PR_design': 1.5}
+
+# (name, lower, upper) required at every point; keeps room around the pod
+CONSTRAINTS = (('bypass_area', 0.05, None),)
+
+# variables read at every point to compute the energy per trip
+ENERGY_VARNAMES = ('compression_system.perf.pwr', 'compression_system.perf.Fnet', 'pod_MN',
+        'tube_T', 'tube_flow.gamma', 'tube_flow.R')
+# the ones that depend on the design variables
+ENERGY_OUTPUTS = ENERGY_VARNAMES[:2]
+
+
+def trip_energy(pwr, Fnet, pod_MN, tube_T, trip_len=563270.0, gamma=1.41, R=286.0):
+    '''
+    Energy in kW*h to cover `trip_len` m at a constant `pod_MN`: the
+    compressor power over the trip time plus the work against the net drag.
+    pwr (hp) and Fnet (lbf) follow the sign convention of the compression
+    system, where consumed power and drag are negative. Accepts scalars or
+    NumPy arrays.
+    '''
+    velocity = pod_MN * np.sqrt(gamma * R * tube_T)
+    time_trip = trip_len / velocity
+    energy = -cu(1.0, 'hp', 'W') * pwr * time_trip - cu(1.0, 'lbf', 'N') * Fnet * trip_len
+    return energy / 3.6e6
+
+
+def trip_energy_partials(pod_MN, tube_T, trip_len=563270.0, gamma=1.41, R=286.0):
+    '''Derivatives of `trip_energy` with respect to pwr and Fnet.'''
+    time_trip = trip_len / (pod_MN * np.sqrt(gamma * R * tube_T))
+    return -cu(1.0, 'hp', 'W') * time_trip / 3.6e6, -cu(1.0, 'lbf', 'N') * trip_len / 3.6e6
+
+
+class MultipointOptimizer(object):
+    '''
+    Minimizes the weighted sum of `trip_energy` over operating points with
+    SLSQP, subject to bounds on the design variables and per-point
+    constraints. Each point is run once per iteration, in parallel, and
+    its gradient comes from p.calc_gradient on the converged model, which
+    uses the analytic partials of the closed-form components; an
+    iteration costs len(points) model runs and linear solves in n_procs
+    processes.
+
+    Usage:
+
+        opt = MultipointOptimizer([{'pod_MN': 0.8}, {'pod_MN': 0.3},
+                {'pod_MN': 0.8, 'tube_P': 200.0}], weights=[0.7, 0.2, 0.1])
+        result = opt.optimize()
+        print opt.design(result.x)
+
+    Parameters
+    ----------
+    points : sequence of dict
+        Operating point values keyed by variable name. Every variable given
+        in one point must either be given in all points or be an argument
+        of `HyperloopSim.p_factory`, so that each worker is reset to it.
+    design_vars : sequence of str
+        Shared variables sized by the optimizer; they must be outputs of
+        IndepVarComps in HyperloopSim, such as those in DESIGN_VARS.
+    weights : sequence of float
+        Weight of each point in the objective; defaults to equal weights.
+    bounds : dict
+        (lower, upper) keyed by design variable; None leaves a side open.
+    constraints : sequence of (str, float, float)
+        Unknown, lower and upper bound required at every point.
+    trip_len : float
+        Length of one trip in m.
+    n_procs : int
+        Worker processes; None uses every CPU and 1 runs serially.
+    factory_kwargs, settings :
+        Passed to `HyperloopSim.p_factory` and applied after it for every
+        problem that is built (see `sweep.build_problem`).
+
+    Attributes
+    ----------
+    n_runs : int
+        Model runs so far.
+    history : list of tuple
+        (design dict, objective) of every design evaluated.
+    '''
+
+    def __init__(self, points, design_vars=DESIGN_VARS, weights=None, bounds=None,
+            constraints=CONSTRAINTS, trip_len=563270.0, n_procs=None, factory_kwargs=None,
+            settings=None):
+        self.design_vars = list(design_vars)
+        self.weights = np.ones(len(points)) if weights is None else np.asarray(weights, dtype=float)
+        if len(self.weights) != len(points):
+            raise ValueError('got %d weights for %d points' % (len(self.weights), len(points)))
+        self.bounds = bounds or {}
+        self.constraints = list(constraints)
+        self.trip_len = trip_len
+        self.n_procs = n_procs
+        self.factory_kwargs = factory_kwargs or {}
+        self.settings = list(settings or ())
+        self.n_runs = 0
+        self.history = []
+        self._last = None
+        self._pool = None
+        self._p = None
+
+        argspec = getargspec(HyperloopSim.p_factory)
+        self.start = dict(zip(argspec.args[-len(argspec.defaults):], argspec.defaults))
+        self.start.update(DESIGN_DEFAULTS)
+        self.start.update(self.factory_kwargs)
+        self.start.update(self.settings)
+
+        # every point sets the same variables, so a worker that ran another
+        # point before is reset first
+        names = set()
+        for point in points:
+            names.update(point)
+        self.points = []
+        for point in points:
+            full = dict(point)
+            for name in names - set(point):
+                if name not in self.start:
+                    raise ValueError('%r is not given in every point and has no known default'
+                            % name)
+                full[name] = self.start[name]
+            self.points.append(full)
+
+        self.x0 = np.array([float(self.start[name]) for name in self.design_vars])
+
+    def design(self, x):
+        '''Design variable values keyed by name for the scaled vector `x`.'''
+        return dict(zip(self.design_vars, np.asarray(x) * self.x0))
+
+    def _run(self, design):
+        '''
+        Runs every point for the design values `design`, a dict, and returns
+        (objective, d objective/d design, constraints, d constraints/d
+        design) shaped (), (len(design_vars),), (len(points),
+        len(self.constraints)) and (len(points), len(self.constraints),
+        len(design_vars)).
+        '''
+        con_names = tuple(name for name, lower, upper in self.constraints)
+        batch = []
+        for point in self.points:
+            values = dict(point)
+            values.update(design)
+            batch.append(values)
+
+        if self.n_procs == 1:
+            if self._p is None:
+                self._p = build_problem(self.factory_kwargs, self.settings)
+        elif self._pool is None:
+            self._pool = make_pool(self.n_procs, self.factory_kwargs, self.settings)
+        y, errors, jac = run_points(batch, ENERGY_VARNAMES + con_names, p=self._p,
+                pool=self._pool, wrt=self.design_vars, of=ENERGY_OUTPUTS + con_names)
+        self.n_runs += len(batch)
+        if errors:
+            index = min(errors)
+            raise RuntimeError('point %d failed for design %s: %s' % (index, design,
+                    errors[index]))
+
+        pwr, Fnet, pod_MN, tube_T, gamma, R = y[:len(ENERGY_VARNAMES)]
+        energy = trip_energy(pwr, Fnet, pod_MN, tube_T, self.trip_len, gamma, R)
+        dE_dpwr, dE_dFnet = trip_energy_partials(pod_MN, tube_T, self.trip_len, gamma, R)
+        denergy = dE_dpwr[:, None] * jac[:, 0] + dE_dFnet[:, None] * jac[:, 1]
+        return (energy.dot(self.weights), self.weights.dot(denergy),
+                y[len(ENERGY_VARNAMES):].T, jac[:, len(ENERGY_OUTPUTS):])
+
+    def evaluate(self, x):
+        '''
+        Returns (objective, d objective/dx, constraint margins, d margins/dx)
+        for the scaled design vector `x`, where every margin must be
+        non-negative; the last evaluation is reused for the same `x`.
+        '''
+        x = np.asarray(x, dtype=float)
+        if self._last is not None and np.array_equal(self._last[0], x):
+            return self._last[1]
+
+        objective, dobjective, constraints, dconstraints = self._run(self.design(x))
+
+        margins = []
+        dmargins = []
+        for j, (name, lower, upper) in enumerate(self.constraints):
+            if lower is not None:
+                margins.append(constraints[:, j] - lower)
+                dmargins.append(dconstraints[:, j])
+            if upper is not None:
+                margins.append(upper - constraints[:, j])
+                dmargins.append(-dconstraints[:, j])
+        n_x = len(x)
+        margins = np.hstack(margins) if margins else np.zeros(0)
+        dmargins = np.vstack(dmargins) if dmargins else np.zeros((0, n_x))
+
+        # x is scaled by the starting design
+        result = (objective, dobjective * self.x0, margins, dmargins * self.x0)
+        self._last = (x.copy(), result)
+        self.history.append((self.design(x), objective))
+        return result
+
+    def optimize(self, maxiter=50, tol=1e-6, disp=False):
+        '''
+        Runs SLSQP from the starting design and returns the
+        scipy.optimize.OptimizeResult; result.x is scaled by the starting
+        values, see `design`. The worker pool is shut down afterwards.
+        '''
+        bounds = []
+        for name, x0 in zip(self.design_vars, self.x0):
+            lower, upper = self.bounds.get(name, (None, None))
+            bounds.append((None if lower is None else lower / x0,
+                    None if upper is None else upper / x0))
+        try:
+            return minimize(lambda x: self.evaluate(x)[:2], np.ones(len(self.x0)), jac=True,
+                    method='SLSQP', bounds=bounds, tol=tol,
+                    constraints=[{'type': 'ineq', 'fun': lambda x: self.evaluate(x)[2],
+                    'jac': lambda x: self.evaluate(x)[3]}] if self.constraints else (),
+                    options={'maxiter': maxiter, 'disp': disp})
+        finally:
+            self.close()
+
+    def close(self):
+        '''Stops the worker processes.'''
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+if __name__ == '__main__':
+    from time import time
+
+    opt = MultipointOptimizer([{'pod_MN': 0.8}, {'pod_MN': 0.3}, {'pod_MN': 0.8, 'tube_P': 200.0}],
+            weights=[0.7, 0.2, 0.1], bounds={'inlet_area': (0.1, 2.0),
+            'cross_section': (0.5, 3.0), 'tube_r': (0.8, 2.0),
+            'comp1_PR_design': (1.1, 10.0)})
+    start = time()
+    result = opt.optimize(disp=True)
+    print '\n%s after %d model runs in %.1f s' % (result.message, opt.n_runs, time() - start)
+    for name, val in sorted(opt.design(result.x).items()):
+        print '%-40s %g' % (name, val)
+    print '%-40s %g kW*h' % ('weighted energy per trip', result.fun)
@@ -0,0 +1,173 @@
+'''
+profiling.py -
+    Opt-in instrumentation that records call counts, wall time and nonlinear
+    solver iterations for every subsystem of an OpenMDAO group, reported as
+    a sorted text table or as folded stacks for flame graph tools.
+'''
+
+from collections import defaultdict
+from timeit import default_timer as timer
+
+from openmdao.core.group import Group
+from openmdao.solvers.run_once import RunOnce
+
+METHODS = ('solve_nonlinear', 'apply_nonlinear')
+# label of data transfers into the subsystems of a group
+TRANSFER = 'transfer'
+
+
+class SolveProfiler(object):
+    '''
+    Wraps solve_nonlinear and apply_nonlinear of every system under `root`,
+    the data transfers of every group and the solve of every iterative
+    nonlinear solver. Works on HyperloopSim as well as on standalone groups
+    such as TubeLimitFlow; `root` must already be set up.
+
+    Usage:
+
+        with SolveProfiler(p.root) as prof:
+            p.run()
+        print prof.table()
+        prof.write_folded('hyperloop.folded') # e.g. for flamegraph.pl
+
+    Attributes
+    ----------
+    stats : dict
+        Keyed by system pathname ('' for `root`), each entry holds 'type',
+        'calls' (per method), 'time' (inclusive, s), 'self_time' (excluding
+        wrapped children, s), 'transfer_time' (s), 'solves' and
+        'iterations' of the system's iterative nonlinear solver.
+    folded : dict
+        Self time in seconds keyed by ';'-joined call stack.
+    '''
+
+    def __init__(self, root):
+        self.root = root
+        self._originals = []
+        self._stack = [] # [label, pathname, method, time in children] per active call
+        self.reset()
+
+        for system in root.subsystems(recurse=True, include_self=True):
+            for method in METHODS:
+                self._wrap(system, method, system.pathname, method)
+            if isinstance(system, Group):
+                self._wrap(system, '_transfer_data', system.pathname, TRANSFER)
+                if not isinstance(system.nl_solver, RunOnce):
+                    self._wrap_solver(system.nl_solver, system.pathname)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.remove()
+
+    def reset(self):
+        '''Discards everything recorded so far.'''
+        self.stats = defaultdict(lambda: {'type': None, 'calls': defaultdict(int), 'time': 0.0,
+                'self_time': 0.0, 'transfer_time': 0.0, 'solves': 0, 'iterations': 0})
+        self.folded = defaultdict(float)
+
+    def remove(self):
+        '''Restores the original methods; the recorded statistics are kept.'''
+        for obj, attr, original in reversed(self._originals):
+            if original is None:
+                delattr(obj, attr)
+            else:
+                setattr(obj, attr, original)
+        self._originals = []
+
+    def _wrap(self, obj, attr, pathname, method):
+        func = getattr(obj, attr)
+        self._originals.append((obj, attr, obj.__dict__.get(attr)))
+        type_name = type(obj).__name__
+
+        def timed(*args, **kwargs):
+            self._stack.append([self._label(pathname, method), pathname, method, 0.0])
+            start = timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(pathname, method, type_name, timer() - start)
+
+        setattr(obj, attr, timed)
+
+    def _wrap_solver(self, solver, pathname):
+        solve = solver.solve
+        self._originals.append((solver, 'solve', solver.__dict__.get('solve')))
+
+        def counted_solve(*args, **kwargs):
+            try:
+                return solve(*args, **kwargs)
+            finally:
+                self.stats[pathname]['solves'] += 1
+                self.stats[pathname]['iterations'] += solver.iter_count
+
+        solver.solve = counted_solve
+
+    def _label(self, pathname, method):
+        name = pathname.rsplit('.', 1)[-1] or 'root'
+        if method == 'solve_nonlinear':
+            return name
+        return '%s(%s)' % (name, method.split('_')[0])
+
+    def _record(self, pathname, method, type_name, elapsed):
+        label, _, _, child_time = self._stack.pop()
+        stats = self.stats[pathname]
+        stats['type'] = type_name
+        if method == TRANSFER:
+            stats['transfer_time'] += elapsed
+        else:
+            stats['calls'][method] += 1
+            # a component's solve_nonlinear often calls its own apply_nonlinear
+            if not any(frame[1] == pathname and frame[2] != TRANSFER for frame in self._stack):
+                stats['time'] += elapsed
+            stats['self_time'] += elapsed - child_time
+        self.folded[';'.join([frame[0] for frame in self._stack] + [label])] += \
+                elapsed - child_time
+        if self._stack:
+            self._stack[-1][3] += elapsed
+
+    def table(self, sort='self_time', limit=None):
+        '''
+        Returns the statistics as a text table sorted by `sort` ('self_time',
+        'time', 'transfer_time', 'calls' or 'iterations'), largest first.
+        '''
+        def key(item):
+            stats = item[1]
+            if sort == 'calls':
+                return sum(stats['calls'].values())
+            return stats[sort]
+
+        total = max([s['time'] for s in self.stats.values()] or [0.0]) or 1.0
+        lines = ['%-48s %-20s %7s %7s %10s %10s %6s %10s %6s' % ('system', 'type', 'solves',
+                'applies', 'time (s)', 'self (s)', 'self%', 'xfer (s)', 'iters')]
+        for pathname, stats in sorted(self.stats.items(), key=key, reverse=True)[:limit]:
+            lines.append('%-48s %-20s %7d %7d %10.4f %10.4f %6.1f %10.4f %6d' % (
+                    pathname or 'root', stats['type'], stats['calls']['solve_nonlinear'],
+                    stats['calls']['apply_nonlinear'], stats['time'], stats['self_time'],
+                    100.0 * stats['self_time'] / total, stats['transfer_time'],
+                    stats['iterations']))
+        return '\n'.join(lines)
+
+    def write_folded(self, filename):
+        '''
+        Writes one 'frame;frame;frame count' line per call stack, with
+        counts in microseconds of self time, the input format of
+        flamegraph.pl and speedscope.
+        '''
+        with open(filename, 'w') as f:
+            for stack, seconds in sorted(self.folded.items()):
+                f.write('%s %d\n' % (stack, int(round(seconds * 1e6))))
+
+
+if __name__ == '__main__':
+    import sys
+    from hyperloop_sim import HyperloopSim
+
+    p = HyperloopSim.p_factory()
+    with SolveProfiler(p.root) as prof:
+        p.run()
+    print prof.table(limit=30)
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'hyperloop.folded'
+    prof.write_folded(filename)
+    print '\nFolded stacks written to', filename
@@ -0,0 +1,253 @@
+'''
+route.py -
+    Route alignments: a polyline with elevations loaded from GeoJSON or CSV,
+    with the horizontal and vertical curvature and the grade along it, a
+    spatial index to look up segments by distance along the route or by
+    position, and the comfort limited speed envelope consumed by
+    mission.simulate_mission (as its `speed_cap`) and Mission.
+'''
+
+import os
+import json
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from mission import G, curvature_speed_limit
+
+EARTH_RADIUS = 6371000.0 # m
+
+
+def project(lon, lat, lon0=None, lat0=None):
+    '''
+    Local equirectangular projection of degrees of longitude and latitude
+    to x (east) and y (north) in m around (lon0, lat0), by default the
+    middle of the points. Accurate to a fraction of a percent over a few
+    hundred km, which is well within what curvature limits need.
+    '''
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    lon0 = 0.5 * (lon.min() + lon.max()) if lon0 is None else lon0
+    lat0 = 0.5 * (lat.min() + lat.max()) if lat0 is None else lat0
+    x = EARTH_RADIUS * np.radians(lon - lon0) * np.cos(np.radians(lat0))
+    y = EARTH_RADIUS * np.radians(lat - lat0)
+    return x, y
+
+
+def circle_curvature(x0, y0, x1, y1, x2, y2):
+    '''
+    Signed curvature (1/m, positive turning left) of the circle through
+    three points, for arrays of point triples; 0 where points coincide.
+    '''
+    a = np.hypot(x1 - x0, y1 - y0)
+    b = np.hypot(x2 - x1, y2 - y1)
+    c = np.hypot(x2 - x0, y2 - y0)
+    cross = (x1 - x0) * (y2 - y1) - (y1 - y0) * (x2 - x1)
+    denom = a * b * c
+    return np.where(denom > 0.0, 2.0 * cross / np.where(denom > 0.0, denom, 1.0), 0.0)
+
+
+class Route(object):
+    '''
+    A tube alignment through the vertices (x, y, z) in m.
+
+    Parameters
+    ----------
+    x, y : numpy.array
+        Horizontal positions of the vertices in m (see `project`).
+    z : numpy.array
+        Elevations in m; a flat route if None.
+    name : str
+        Label of the route.
+
+    Attributes
+    ----------
+    s : numpy.array
+        Horizontal distance along the route of every vertex in m.
+    length : float
+        Length of the route in m.
+    grade : numpy.array
+        Rise over run of every segment.
+    '''
+
+    def __init__(self, x, y, z=None, name=''):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        z = np.zeros(len(x)) if z is None else np.asarray(z, dtype=float)
+        ds = np.hypot(np.diff(x), np.diff(y))
+        keep = np.concatenate(([True], ds > 0.0)) # repeated vertices
+        if keep.sum() < 2:
+            raise ValueError('a route needs at least two distinct vertices')
+        self.x, self.y, self.z = x[keep], y[keep], z[keep]
+        self.name = name
+        self.s = np.concatenate(([0.0], np.cumsum(ds[keep[1:]])))
+        self.length = self.s[-1]
+        self.grade = np.diff(self.z) / np.diff(self.s)
+        self._tree = None
+        self._envelopes = {}
+
+    def segment_index(self, s):
+        '''Index of the segment that contains each distance `s` along the route.'''
+        return np.clip(np.searchsorted(self.s, s, side='right') - 1, 0, len(self.s) - 2)
+
+    def position(self, s):
+        '''(x, y, z) at distances `s` along the route.'''
+        return (np.interp(s, self.s, self.x), np.interp(s, self.s, self.y),
+                np.interp(s, self.s, self.z))
+
+    def grade_at(self, s):
+        '''Grade of the segment at distances `s` along the route.'''
+        return self.grade[self.segment_index(s)]
+
+    def locate(self, x, y):
+        '''
+        Distance along the route of the closest point of the route to each
+        position (x, y), and the offset from it in m. The segment midpoints
+        are kept in a k-d tree; the nearest ones are searched until no
+        other midpoint is near enough, within half the longest segment,
+        for its segment to be closer.
+        '''
+        n_seg = len(self.s) - 1
+        if self._tree is None:
+            self._tree = cKDTree(np.column_stack((self.x[:-1] + self.x[1:],
+                    self.y[:-1] + self.y[1:])) / 2.0)
+            self._reach = np.max(np.diff(self.s)) / 2.0
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        px, py = x.reshape(-1, 1), y.reshape(-1, 1)
+        k = min(8, n_seg)
+        while True:
+            dist, seg = self._tree.query(np.column_stack((px, py)), k)
+            dist, seg = dist.reshape(len(px), k), seg.reshape(len(px), k)
+            dx, dy = self.x[seg + 1] - self.x[seg], self.y[seg + 1] - self.y[seg]
+            seg_len = self.s[seg + 1] - self.s[seg]
+            t = np.clip(((px - self.x[seg]) * dx + (py - self.y[seg]) * dy) / seg_len ** 2,
+                    0.0, 1.0)
+            d = np.hypot(self.x[seg] + t * dx - px, self.y[seg] + t * dy - py)
+            best = np.argmin(d, axis=1)
+            rows = np.arange(len(px))
+            best_d = d[rows, best]
+            # segments whose midpoints are further than the k-th are at least
+            # dist[:, -1] - reach away
+            if k == n_seg or np.all(dist[:, -1] - self._reach >= best_d):
+                break
+            k = min(2 * k, n_seg)
+        best_s = self.s[seg[rows, best]] + t[rows, best] * seg_len[rows, best]
+        return best_s.reshape(x.shape), best_d.reshape(x.shape)
+
+    def curvature(self, ds=10.0, window=100.0):
+        '''
+        Horizontal and vertical curvature (1/m) every `ds` m along the
+        route, from the circle through the points `window` / 2 before and
+        after, which smooths out the kinks of a sampled alignment.
+
+        Returns
+        -------
+        tuple
+            (s, horizontal, vertical) arrays.
+        '''
+        n = max(int(np.ceil(self.length / ds)), 1) + 1
+        s = np.linspace(0.0, self.length, n)
+        s_back = np.maximum(s - 0.5 * window, 0.0)
+        s_ahead = np.minimum(s + 0.5 * window, self.length)
+        (x0, y0, z0), (x1, y1, z1), (x2, y2, z2) = [self.position(si)
+                for si in (s_back, s, s_ahead)]
+        horizontal = circle_curvature(x0, y0, x1, y1, x2, y2)
+        vertical = circle_curvature(s_back, z0, s, z1, s_ahead, z2)
+        return s, horizontal, vertical
+
+    def speed_envelope(self, max_velocity=None, lateral_accel=0.5 * G, vertical_accel=0.2 * G,
+            ds=10.0, window=100.0):
+        '''
+        Highest speed in m/s every `ds` m along the route at which the
+        centripetal acceleration of the horizontal and vertical curves stays
+        within `lateral_accel` and `vertical_accel` (m/s**2), capped at
+        `max_velocity` if given.
+
+        Envelopes are cached per route and arguments, so evaluating many pod
+        designs against one alignment computes each only once.
+
+        Returns
+        -------
+        tuple
+            (s, v_max) arrays, as taken by the `speed_cap` argument of
+            mission.simulate_mission.
+        '''
+        key = (max_velocity, lateral_accel, vertical_accel, ds, window)
+        if key not in self._envelopes:
+            s, horizontal, vertical = self.curvature(ds, window)
+            with np.errstate(divide='ignore'):
+                v_max = np.minimum(curvature_speed_limit(1.0 / horizontal, lateral_accel),
+                        curvature_speed_limit(1.0 / vertical, vertical_accel))
+            if max_velocity is not None:
+                v_max = np.minimum(v_max, max_velocity)
+            s.setflags(write=False)
+            v_max.setflags(write=False)
+            self._envelopes[key] = (s, v_max)
+        return self._envelopes[key]
+
+
+def _geojson_coordinates(data):
+    if data['type'] == 'FeatureCollection':
+        for feature in data['features']:
+            if feature['geometry'] and 'LineString' in feature['geometry']['type']:
+                return _geojson_coordinates(feature['geometry'])
+        raise ValueError('GeoJSON has no LineString feature')
+    if data['type'] == 'Feature':
+        return _geojson_coordinates(data['geometry'])
+    if data['type'] == 'LineString':
+        return data['coordinates']
+    if data['type'] == 'MultiLineString':
+        return [point for line in data['coordinates'] for point in line]
+    raise ValueError('GeoJSON geometry must be a LineString, not %s' % data['type'])
+
+
+def read_route(filename, name=None):
+    '''
+    Reads a route from a GeoJSON LineString of [lon, lat(, elevation)]
+    or a CSV file with a header naming either x and y (m) or lon and lat
+    (degrees), and optionally elevation (m).
+    '''
+    name = os.path.splitext(os.path.basename(filename))[0] if name is None else name
+    if filename.endswith('.json') or filename.endswith('.geojson'):
+        with open(filename) as f:
+            coords = _geojson_coordinates(json.load(f))
+        lon, lat = [np.array([point[i] for point in coords], dtype=float) for i in (0, 1)]
+        z = np.array([point[2] if len(point) > 2 else 0.0 for point in coords])
+        return Route(*project(lon, lat), z=z, name=name)
+
+    data = np.genfromtxt(filename, delimiter=',', names=True)
+    names = data.dtype.names
+    z = data['elevation'] if 'elevation' in names else None
+    if 'x' in names and 'y' in names:
+        return Route(data['x'], data['y'], z, name)
+    if 'lon' in names and 'lat' in names:
+        return Route(*project(data['lon'], data['lat']), z=z, name=name)
+    raise ValueError('%s needs x and y or lon and lat columns, not %s' %
+            (filename, ', '.join(names)))
+
+
+_routes = {}
+
+def load_route(filename, name=None):
+    '''`read_route`, reusing the Route (and its envelopes) while the file is unchanged.'''
+    key = (os.path.abspath(filename), os.path.getmtime(filename), name)
+    if key not in _routes:
+        _routes[key] = read_route(filename, name)
+    return _routes[key]
+
+
+if __name__ == '__main__':
+    import sys
+    from time import time
+
+    from mission import simulate_mission
+
+    route = load_route(sys.argv[1])
+    start = time()
+    s, v_max = route.speed_envelope(308.0)
+    print '%s: %.1f km, envelope in %.3f s' % (route.name, route.length / 1000.0, time() - start)
+    print 'slowest curve %.1f m/s at %.1f km, steepest grade %.2f%%' % (v_max.min(),
+            s[np.argmin(v_max)] / 1000.0, 100.0 * np.abs(route.grade).max())
+    trace = simulate_mission(route.length, 308.0, speed_cap=(s, v_max))
+    print 'trip time %.1f min' % (trace['time_mission'] / 60.0)
@@ -0,0 +1,358 @@
+'''
+surrogate.py -
+    Response surfaces of HyperloopSim outputs, trained on Latin hypercube
+    samples of the p_factory inputs that are run in parallel, for studies
+    that need the model far more often than a full solve allows.
+
+    python surrogate.py -n 200 -o hyperloop_surrogate.pkl
+'''
+
+import warnings
+import cPickle as pickle
+from collections import Counter
+
+import numpy as np
+
+from openmdao.core.component import Component
+from openmdao.core.group import Group
+from openmdao.surrogate_models.surrogate_model import SurrogateModel
+from openmdao.surrogate_models.kriging import FloatKrigingSurrogate
+from openmdao.surrogate_models.response_surface import ResponseSurface
+
+from sweep import build_problem, run_points
+from util import units as var_units
+
+# (lower, upper) of every sampled input, inside the range p_factory converges in
+BOUNDS = (
+    ('pod_MN', 0.2, 0.8),
+    ('tube_P', 50.0, 500.0),
+    ('tube_T', 280.0, 320.0),
+    ('inlet_area', 0.2, 0.6),
+    ('cross_section', 0.7, 1.2),
+)
+OUTPUTS = ('compression_system.comp1.power', 'bypass_W', 'comp1_cfm',
+        'compression_system.perf.Fnet')
+
+
+
+class RBFSurrogate(SurrogateModel):
+    '''
+    Thin plate spline interpolation with a linear polynomial tail over all
+    training points, evaluated for many points at once.
+    '''
+
+    def train(self, x, y):
+        super(RBFSurrogate, self).train(x, y)
+        self.X = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float).reshape(len(self.X), -1)
+        n, n_dim = self.X.shape
+        P = np.hstack((np.ones((n, 1)), self.X))
+        A = np.zeros((n + n_dim + 1, n + n_dim + 1))
+        A[:n, :n] = self._phi(self._distance(self.X))
+        A[:n, n:] = P
+        A[n:, :n] = P.T
+        b = np.zeros((n + n_dim + 1, y.shape[1]))
+        b[:n] = y
+        coefs = np.linalg.lstsq(A, b, rcond=None)[0]
+        self.weights, self.poly = coefs[:n], coefs[n:]
+
+    def _distance(self, x):
+        return np.sqrt(((x[:, None, :] - self.X[None, :, :]) ** 2).sum(axis=2))
+
+    def _phi(self, r):
+        return np.where(r > 0.0, r ** 2 * np.log(np.where(r > 0.0, r, 1.0)), 0.0)
+
+    def predict(self, x):
+        super(RBFSurrogate, self).predict(x)
+        x = np.atleast_2d(x)
+        return self._phi(self._distance(x)).dot(self.weights) + self.poly[0] + x.dot(self.poly[1:])
+
+    def linearize(self, x):
+        x = np.atleast_2d(x)[0]
+        r = self._distance(x[None, :])[0]
+        dphi = np.where(r > 0.0, 2.0 * np.log(np.where(r > 0.0, r, 1.0)) + 1.0, 0.0)
+        return ((x - self.X) * dphi[:, None]).T.dot(self.weights).T + self.poly[1:].T
+
+
+KINDS = {
+    'kriging': FloatKrigingSurrogate, # mean only
+    'rbf': RBFSurrogate,
+    'poly': ResponseSurface, # full quadratic
+}
+
+
+def latin_hypercube(n, n_dim, seed=None):
+    '''
+    n points in the unit hypercube [0, 1]**n_dim with exactly one point in
+    each of the n equal intervals of every dimension.
+    '''
+    rng = np.random.RandomState(seed)
+    samples = (np.arange(n)[:, None] + rng.uniform(size=(n, n_dim))) / n
+    for j in range(n_dim):
+        samples[:, j] = samples[rng.permutation(n), j]
+    return samples
+
+
+def sample(n, bounds=BOUNDS, outputs=OUTPUTS, seed=None, min_samples=None, **kwargs):
+    '''
+    Runs HyperloopSim at n Latin hypercube points within `bounds`, a
+    sequence of (name, lower, upper). Keyword arguments are passed to
+    `sweep.run_points`, e.g. n_procs=None to use every CPU.
+
+    Points that fail or give non-finite outputs are dropped with a warning
+    that counts them by reason. RuntimeError is raised if fewer than
+    `min_samples` (default len(bounds) + 1) points are left.
+
+    Returns
+    -------
+    tuple
+        (X, Y) arrays shaped (n_ok, len(bounds)) and (n_ok, len(outputs)),
+        holding only the points that converged.
+    '''
+    names = [name for name, lower, upper in bounds]
+    lower = np.array([b[1] for b in bounds], dtype=float)
+    upper = np.array([b[2] for b in bounds], dtype=float)
+    X = lower + latin_hypercube(n, len(bounds), seed) * (upper - lower)
+    y, errors = run_points([dict(zip(names, x)) for x in X], outputs, **kwargs)
+    ok = np.all(np.isfinite(y), axis=0)
+
+    n_ok = int(ok.sum())
+    if n_ok < n:
+        reasons = Counter(errors.get(index, 'non-finite output') for index in np.flatnonzero(~ok))
+        warnings.warn('%d of %d samples failed and were dropped: %s' % (n - n_ok, n,
+                '; '.join('%d x %s' % (count, reason) for reason, count in reasons.most_common())))
+    if min_samples is None:
+        min_samples = len(bounds) + 1
+    if n_ok < min_samples:
+        raise RuntimeError('only %d of %d samples converged, at least %d are needed' %
+                (n_ok, n, min_samples))
+    return X[ok], y[:, ok].T
+
+
+class Surrogate(object):
+    '''
+    One fitted surrogate per output over inputs scaled to [0, 1] by their
+    bounds.
+
+    Parameters
+    ----------
+    bounds : sequence of (str, float, float)
+        Input name, lower and upper bound.
+    outputs : sequence of str
+        Output names.
+    kind : str
+        'kriging', 'rbf' or 'poly'.
+    units : dict
+        Units of the inputs and outputs in the sampled model keyed by name,
+        None for variables without units; see `SurrogateComp`.
+
+    Attributes
+    ----------
+    cv_error : dict
+        Cross-validated error of each output from `cross_validate`, if run.
+    '''
+
+    def __init__(self, bounds=BOUNDS, outputs=OUTPUTS, kind='kriging', units=None):
+        if kind not in KINDS:
+            raise ValueError('kind must be one of %s, not %r' % (', '.join(sorted(KINDS)), kind))
+        self.inputs = [name for name, lower, upper in bounds]
+        self.lower = np.array([b[1] for b in bounds], dtype=float)
+        self.scale = np.array([b[2] for b in bounds], dtype=float) - self.lower
+        self.outputs = list(outputs)
+        self.kind = kind
+        self.units = dict(units or {})
+        self.models = []
+        self.cv_error = {}
+
+    def _scaled(self, X):
+        return (np.atleast_2d(np.asarray(X, dtype=float)) - self.lower) / self.scale
+
+    def fit(self, X, Y):
+        '''Trains on inputs X (n, n_inputs) and outputs Y (n, n_outputs).'''
+        X = self._scaled(X)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), len(self.outputs))
+        self.models = []
+        for j in range(len(self.outputs)):
+            model = KINDS[self.kind]()
+            model.train(X, Y[:, j:j + 1])
+            self.models.append(model)
+        return self
+
+    def _models(self, outputs):
+        if outputs is None:
+            return self.models
+        return [self.models[self.outputs.index(name)] for name in outputs]
+
+    def predict(self, X, outputs=None):
+        '''
+        Outputs shaped (n, n_outputs) at inputs X shaped (n, n_inputs), for
+        every output or for the names in `outputs`.
+        '''
+        X = self._scaled(X)
+        models = self._models(outputs)
+        Y = np.empty((len(X), len(models)))
+        for j, model in enumerate(models):
+            if self.kind == 'rbf':
+                Y[:, j] = np.asarray(model.predict(X)).reshape(len(X))
+            else: # Kriging and ResponseSurface evaluate one point at a time
+                Y[:, j] = [np.ravel(model.predict(x))[0] for x in X]
+        return Y
+
+    def linearize(self, x, outputs=None):
+        '''
+        Jacobian d outputs/d inputs shaped (n_outputs, n_inputs) at one
+        point x, for every output or for the names in `outputs`.
+        '''
+        x = self._scaled(x)[0]
+        models = self._models(outputs)
+        J = np.empty((len(models), len(self.inputs)))
+        for j, model in enumerate(models):
+            J[j] = np.asarray(model.linearize(x)).ravel()
+        return J / self.scale
+
+    def cross_validate(self, X, Y, k=5, seed=None):
+        '''
+        k-fold cross validation; stores and returns the RMS error of every
+        output divided by the standard deviation of its samples in
+        `cv_error` (0 is exact, 1 is no better than the mean).
+        '''
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), len(self.outputs))
+        folds = np.array_split(np.random.RandomState(seed).permutation(len(X)), k)
+        squared = np.zeros(len(self.outputs))
+        for fold in folds:
+            train = np.ones(len(X), dtype=bool)
+            train[fold] = False
+            fold_model = Surrogate(zip(self.inputs, self.lower, self.lower + self.scale),
+                    self.outputs, self.kind).fit(X[train], Y[train])
+            squared += np.sum((fold_model.predict(X[fold]) - Y[fold]) ** 2, axis=0)
+        error = np.sqrt(squared / len(X)) / np.maximum(Y.std(axis=0), 1e-300)
+        self.cv_error = dict(zip(self.outputs, error))
+        return self.cv_error
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+
+def build_surrogate(n=200, bounds=BOUNDS, outputs=OUTPUTS, kind='kriging', k=5, seed=0,
+        **kwargs):
+    '''
+    Samples HyperloopSim (see `sample`, which gets the keyword arguments),
+    cross validates and fits a `Surrogate` on all converged samples. The
+    units of the inputs and outputs are read from the sampled problem.
+    '''
+    n_dim = len(bounds)
+    # enough points for every cross validation fold to determine the fit
+    n_fit = (n_dim + 1) * (n_dim + 2) // 2 if kind == 'poly' else n_dim + 1
+    kwargs.setdefault('min_samples', int(np.ceil(n_fit * k / (k - 1.0))))
+    p = kwargs.get('p')
+    if p is None:
+        p = build_problem(kwargs.get('factory_kwargs'), kwargs.get('settings'))
+    units = var_units(p, [name for name, lower, upper in bounds] + list(outputs))
+    X, Y = sample(n, bounds, outputs, seed, **kwargs)
+    surrogate = Surrogate(bounds, outputs, kind, units)
+    surrogate.cross_validate(X, Y, k, seed)
+    return surrogate.fit(X, Y)
+
+
+class SurrogateComp(Component):
+    '''
+    Evaluates the named `outputs` of a fitted `Surrogate`, which must all
+    belong to one system of the model, e.g. 'compression_system.comp1.power'.
+    Params are the surrogate inputs and outputs carry the last part of
+    their name ('power'), with the units of the sampled model so that
+    connections convert; see `SurrogateGroup` for the full names.
+    '''
+    def __init__(self, surrogate, outputs):
+        super(SurrogateComp, self).__init__()
+        self.surrogate = surrogate
+        self.outputs = list(outputs)
+        self.local_names = [name.rsplit('.', 1)[-1] for name in self.outputs]
+        for name, lower, scale in zip(surrogate.inputs, surrogate.lower, surrogate.scale):
+            self.add_param(name, float(lower + 0.5 * scale), **self._units_kwargs(name))
+        for name, local_name in zip(self.outputs, self.local_names):
+            self.add_output(local_name, 0.0, **self._units_kwargs(name))
+
+    def _units_kwargs(self, name):
+        units = self.surrogate.units.get(name)
+        return {'units': units} if units else {}
+
+    def _x(self, params):
+        return [params[name] for name in self.surrogate.inputs]
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        y = self.surrogate.predict(self._x(params), self.outputs)[0]
+        for name, val in zip(self.local_names, y):
+            unknowns[name] = val
+
+    def linearize(self, params, unknowns, resids):
+        jac = self.surrogate.linearize(self._x(params), self.outputs)
+        J = {}
+        for i, out in enumerate(self.local_names):
+            for j, name in enumerate(self.surrogate.inputs):
+                J[out, name] = jac[i, j]
+        return J
+
+
+class SurrogateGroup(Group):
+    '''
+    Drop-in replacement for HyperloopSim backed by a fitted `Surrogate`:
+    the surrogate inputs are promoted to the top, as in HyperloopSim, and
+    every output resolves under its model name. Outputs of a subsystem,
+    such as 'compression_system.comp1.power', come from a SurrogateComp
+    'comp1' in a Group 'compression_system'; top-level outputs, such as
+    'bypass_W', from a SurrogateComp 'surrogate' that promotes them.
+
+        p = Problem(root=SurrogateGroup(Surrogate.load('hyperloop_surrogate.pkl')))
+    '''
+    def __init__(self, surrogate):
+        super(SurrogateGroup, self).__init__()
+        inputs = list(surrogate.inputs)
+
+        systems = {}
+        for name in surrogate.outputs:
+            systems.setdefault(name.rpartition('.')[0], []).append(name)
+
+        groups = {'': self}
+        for path in sorted(systems):
+            outputs = systems[path]
+            if not path:
+                self.add('surrogate', SurrogateComp(surrogate, outputs),
+                        promotes=inputs + outputs)
+                continue
+            parent, _, comp_name = path.rpartition('.')
+            if parent not in groups:
+                group = self
+                for depth, sub in enumerate(parent.split('.')):
+                    sub_path = '.'.join(parent.split('.')[:depth + 1])
+                    if sub_path not in groups:
+                        groups[sub_path] = group.add(sub, Group(), promotes=inputs)
+                    group = groups[sub_path]
+            groups[parent].add(comp_name, SurrogateComp(surrogate, outputs), promotes=inputs)
+
+
+if __name__ == '__main__':
+    from argparse import ArgumentParser
+    from time import time
+
+    parser = ArgumentParser(description='Fits a surrogate of HyperloopSim.')
+    parser.add_argument('-n', '--samples', type=int, default=200)
+    parser.add_argument('-k', '--kind', default='kriging', choices=sorted(KINDS))
+    parser.add_argument('-j', '--procs', type=int, default=None,
+            help='worker processes (default: every CPU)')
+    parser.add_argument('-o', '--output', default='hyperloop_surrogate.pkl')
+    args = parser.parse_args()
+
+    start = time()
+    surrogate = build_surrogate(args.samples, kind=args.kind, n_procs=args.procs)
+    print 'Sampled and fitted in %.1f s' % (time() - start)
+    for name in surrogate.outputs:
+        print '%-40s cross-validated error %.2f%%' % (name, 100.0 * surrogate.cv_error[name])
+    surrogate.save(args.output)
+    print 'Saved to', args.output
@@ -0,0 +1,215 @@
+'''
+sweep.py -
+    Runs an OpenMDAO problem over many operating points, either in the
+    current process or sharded across a pool of worker processes that each
+    own one HyperloopSim problem.
+'''
+
+import sys
+from os import devnull
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+
+from hyperloop_sim import HyperloopSim
+
+# problem and result cache owned by a worker process, set once by _init_worker
+_worker_p = None
+_worker_cache = None
+
+
+def build_problem(factory_kwargs=None, settings=None):
+    '''
+    Builds a problem with `HyperloopSim.p_factory` and applies extra settings.
+
+    Parameters
+    ----------
+    factory_kwargs : dict
+        Keyword arguments for `HyperloopSim.p_factory`.
+    settings : sequence of (str, value)
+        Values assigned with p[name] = value after the factory, in order.
+
+    Returns
+    -------
+    openmdao.core.problem.Problem
+    '''
+    p = HyperloopSim.p_factory(**(factory_kwargs or {}))
+    for name, val in (settings or ()):
+        p[name] = val
+    return p
+
+
+def run_point(p, point, y_varnames, quiet=True, cache=None, wrt=None, of=None):
+    '''
+    Sets the variables in `point`, runs `p` (through `cache` if given) and
+    reads `y_varnames`. If `wrt` is given, the Jacobian of the unknowns `of`
+    with respect to the independent variables `wrt` at the converged point
+    is computed as well, with p.calc_gradient.
+
+    Returns
+    -------
+    tuple
+        (list of y values, None) on success or (None, error message) if the
+        run raised an exception. With `wrt` the first item is (list of y
+        values, Jacobian shaped (len(of), len(wrt))).
+    '''
+    for name, val in point.items():
+        p[name] = val
+    if quiet:
+        sys.stdout = open(devnull, 'w')
+    try:
+        if cache is not None:
+            cache.run(p)
+        else:
+            p.run()
+        values = [p[name] for name in y_varnames]
+        if wrt is not None:
+            values = values, p.calc_gradient(list(wrt), list(of), return_format='array')
+        return values, None
+    except Exception as e:
+        return None, '%s: %s' % (type(e).__name__, e)
+    finally:
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+
+
+def _init_worker(factory_kwargs, settings, cache):
+    global _worker_p, _worker_cache
+    _worker_p = build_problem(factory_kwargs, settings)
+    _worker_cache = cache
+
+
+def _run_worker_point(args):
+    index, point, y_varnames, wrt, of = args
+    return (index,) + run_point(_worker_p, point, y_varnames, cache=_worker_cache, wrt=wrt,
+            of=of)
+
+
+def make_pool(n_procs=None, factory_kwargs=None, settings=None, cache=None):
+    '''
+    Starts `n_procs` worker processes (None for every CPU) that each build
+    and own one problem, for repeated `run_points` calls with the same
+    model. The number of processes is kept as pool.n_procs. Call
+    terminate() and join() on the pool when done.
+    '''
+    n_procs = n_procs or cpu_count()
+    pool = Pool(n_procs, initializer=_init_worker, initargs=(factory_kwargs, settings, cache))
+    pool.n_procs = n_procs
+    return pool
+
+
+def run_points(points, y_varnames, p=None, n_procs=1, factory_kwargs=None, settings=None,
+        chunksize=None, callback=None, continuation=None, cache=None, pool=None, wrt=None,
+        of=None):
+    '''
+    Runs a problem once per point and gathers the results in point order.
+
+    Parameters
+    ----------
+    points : sequence of dict
+        Variable values to set for each run, keyed by OpenMDAO variable name.
+    y_varnames : sequence of str
+        OpenMDAO variable names to read after each run.
+    p : openmdao.core.problem.Problem
+        Problem used for serial runs. Built with `build_problem` if omitted.
+        Ignored when running in parallel.
+    n_procs : int
+        Number of worker processes; None uses every CPU and 1 runs serially
+        in this process.
+    factory_kwargs : dict
+        Passed to `HyperloopSim.p_factory` for every problem that is built.
+    settings : sequence of (str, value)
+        Applied to every problem that is built, after the factory.
+    chunksize : int
+        Points handed to a worker at a time. Defaults to a quarter of an even
+        share of the points.
+    callback : function
+        Called as callback(n_done, n_total) after each point completes.
+    continuation : continuation.Continuation
+        Warm-starts each point from its predecessors. It must have been
+        built for `p`, and the points are then run serially in order. Its
+        solver hooks are removed when the sweep ends.
+    cache : cache.ResultCache
+        Restores previously solved points instead of running them. Hit and
+        miss counts are only kept for points run in this process.
+    pool : multiprocessing.Pool
+        Workers from `make_pool` to run the points on; they are left running
+        and n_procs, factory_kwargs, settings and cache are ignored.
+    wrt, of : sequence of str
+        If given, the Jacobian of the unknowns `of` with respect to the
+        independent variables `wrt` is computed at every point as well (see
+        `run_point`).
+
+    Returns
+    -------
+    tuple
+        (y, errors) where y is a numpy.array shaped (len(y_varnames),
+        len(points)) that holds NaN for failed points and errors maps the
+        index of each failed point to its error message. With `wrt`,
+        (y, errors, jac) where jac is shaped (len(points), len(of),
+        len(wrt)), NaN for failed points.
+    '''
+    n_procs = n_procs or cpu_count()
+    y = np.full((len(y_varnames), len(points)), np.nan)
+    if wrt is not None:
+        jac = np.full((len(points), len(of), len(wrt)), np.nan)
+    errors = {}
+    n_done = [0]
+
+    def gather(index, values, error):
+        if error is None and wrt is not None:
+            y[:, index], jac[index] = values
+        elif error is None:
+            y[:, index] = values
+        else:
+            errors[index] = error
+        n_done[0] += 1
+        if callback is not None:
+            callback(n_done[0], len(points))
+
+    if continuation is not None:
+        p = continuation.p
+        n_procs = 1
+        pool = None
+
+    if pool is None and (n_procs == 1 or len(points) <= 1):
+        if p is None:
+            p = build_problem(factory_kwargs, settings)
+        try:
+            for index, point in enumerate(points):
+                if continuation is not None:
+                    continuation.predict(point)
+                values, error = run_point(p, point, y_varnames, cache=cache, wrt=wrt, of=of)
+                if continuation is not None and error is None:
+                    continuation.record(point)
+                gather(index, values, error)
+        finally:
+            if continuation is not None:
+                continuation.remove()
+        return (y, errors) if wrt is None else (y, errors, jac)
+
+    own_pool = pool is None
+    if own_pool:
+        pool = make_pool(min(n_procs, len(points)), factory_kwargs, settings, cache)
+    else:
+        n_procs = pool.n_procs
+    if chunksize is None:
+        chunksize = max(1, len(points) // (4 * n_procs))
+    try:
+        tasks = [(index, point, y_varnames, wrt, of) for index, point in enumerate(points)]
+        for result in pool.imap_unordered(_run_worker_point, tasks, chunksize):
+            gather(*result)
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+    return (y, errors) if wrt is None else (y, errors, jac)
+
+
+def sweep(x_array, x_varname, y_varnames, **kwargs):
+    '''
+    Runs `run_points` with `x_varname` set to each value of `x_array`.
+    Keyword arguments are passed through to `run_points`.
+    '''
+    return run_points([{x_varname: x} for x in x_array], y_varnames, **kwargs)
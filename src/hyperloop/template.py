@@ -0,0 +1,93 @@
+'''
+template.py -
+    Reuses set up OpenMDAO problems across scenario evaluations instead of
+    building and setting up a new one for every scenario.
+'''
+
+from copy import deepcopy
+from contextlib import contextmanager
+
+from hyperloop_sim import HyperloopSim
+from util import set_unknowns
+
+
+class ProblemTemplate(object):
+    '''
+    Builds a problem once, records its freshly configured variable values
+    and hands out problems that are reset to those values plus per-scenario
+    boundary values. Problems are kept in a pool, so setup (the variable
+    graph, connections and thermo tables) only happens when more problems
+    are in use at the same time than ever before.
+
+    Parameters
+    ----------
+    factory : function
+        Returns a set up problem. Defaults to `HyperloopSim.p_factory`.
+    factory_kwargs : dict
+        Keyword arguments for `factory`.
+    settings : sequence of (str, value)
+        Assigned with p[name] = value after the factory, in order, and part
+        of the values every problem is reset to.
+
+    Attributes
+    ----------
+    n_built : int
+        Problems built so far.
+    '''
+
+    def __init__(self, factory=HyperloopSim.p_factory, factory_kwargs=None, settings=None):
+        self.factory = factory
+        self.factory_kwargs = factory_kwargs or {}
+        self.settings = list(settings or ())
+        self.n_built = 0
+        self._free = []
+
+        p = self._build()
+        self._unknowns = p.root.unknowns.vec.copy()
+        # unconnected params are not part of any params vector
+        self._dangling = [(name, deepcopy(p[name])) for name in p.root._probdata.dangling]
+        self._free.append(p)
+
+    def _build(self):
+        p = self.factory(**self.factory_kwargs)
+        for name, val in self.settings:
+            p[name] = val
+        self.n_built += 1
+        return p
+
+    def reset(self, p, values=None):
+        '''
+        Restores every variable of `p` to its state right after the factory
+        and settings, then assigns `values`, a dict keyed by variable name.
+        '''
+        if p.root.unknowns.vec.shape != self._unknowns.shape:
+            raise ValueError('problem was not built by this template')
+        set_unknowns(p, self._unknowns)
+        for name, val in self._dangling:
+            p[name] = deepcopy(val)
+        for name, val in (values or {}).items():
+            p[name] = val
+        return p
+
+    def checkout(self, values=None):
+        '''Returns a pooled (or, if none is free, a new) problem reset to `values`.'''
+        p = self._free.pop() if self._free else self._build()
+        return self.reset(p, values)
+
+    def release(self, p):
+        '''Returns a problem obtained from `checkout` to the pool.'''
+        self._free.append(p)
+
+    @contextmanager
+    def problem(self, values=None):
+        '''
+        Context manager around `checkout` and `release`:
+
+            with template.problem({'pod_MN': 0.4}) as p:
+                p.run()
+        '''
+        p = self.checkout(values)
+        try:
+            yield p
+        finally:
+            self.release(p)
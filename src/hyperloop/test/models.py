@@ -0,0 +1,52 @@
+'''
+Cheap stand-in for HyperloopSim shared by the tests of the sweep, batch,
+and surrogate tools.
+'''
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.components.indep_var_comp import IndepVarComp
+
+from hyperloop.hyperloop_sim import TubeFlow
+from hyperloop.geometry.tube_structure import TubeStructural
+
+# tube area of the default tube_r and fill_area
+TUBE_AREA = TubeStructural.calc(0.9, 0.214)[1]
+
+
+class TubeModel(Group):
+    '''
+    TubeStructural and TubeFlow with their inputs promoted like
+    HyperloopSim. Raises RuntimeError where the TubeFlow param `fail_var`
+    is above `fail_above`.
+    '''
+
+    def __init__(self, fail_var='tube_P', fail_above=455.0):
+        super(TubeModel, self).__init__()
+        self.fail_var = fail_var
+        self.fail_above = fail_above
+        for name, val, units in (('pod_MN', 0.5, None), ('tube_P', 99.0, 'Pa'),
+                ('tube_T', 292.6, 'degK'), ('tube_r', 0.9, 'm'), ('fill_area', 0.214, 'm**2')):
+            kwargs = {'units': units} if units else {}
+            self.add('%s_param' % name, IndepVarComp(name, val, **kwargs), promotes=['*'])
+        self.add('tube_struct', TubeStructural(), promotes=['tube_P', 'tube_T', 'tube_r',
+                'fill_area', 'tube_area'])
+        self.add('tube_flow', TubeFlow(), promotes=['pod_MN', 'tube_P', 'tube_T', 'tube_area'])
+
+    def solve_nonlinear(self, params=None, unknowns=None, resids=None, metadata=None):
+        if self.tube_flow.params[self.fail_var] > self.fail_above:
+            raise RuntimeError('%s out of range' % self.fail_var)
+        super(TubeModel, self).solve_nonlinear(params, unknowns, resids, metadata)
+
+
+def build_problem(factory_kwargs=None, settings=None):
+    '''
+    Replacement for sweep.build_problem: `factory_kwargs` go to TubeModel.
+    Assign it to sweep.build_problem before worker processes are forked so
+    that they build the stand-in too.
+    '''
+    p = Problem(root=TubeModel(**(factory_kwargs or {})))
+    p.setup(check=False)
+    for name, val in (settings or ()):
+        p[name] = val
+    return p
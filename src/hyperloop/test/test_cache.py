@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import unittest
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.core.component import Component
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.solvers.newton import Newton
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.cache import ResultCache
+
+
+class CubeRoot(Component):
+    '''State x with x**3 = c.'''
+
+    def __init__(self):
+        super(CubeRoot, self).__init__()
+        self.add_param('c', 2.0)
+        self.add_state('x', 1.0)
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        pass
+
+    def apply_nonlinear(self, params, unknowns, resids):
+        resids['x'] = unknowns['x'] ** 3 - params['c']
+
+    def linearize(self, params, unknowns, resids):
+        return {('x', 'x'): 3.0 * unknowns['x'] ** 2, ('x', 'c'): -1.0}
+
+
+def cube_root(maxiter):
+    p = Problem(root=Group())
+    p.root.add('c_param', IndepVarComp('c', 2.0), promotes=['c'])
+    p.root.add('comp', CubeRoot(), promotes=['c'])
+    p.root.nl_solver = Newton()
+    p.root.nl_solver.options['maxiter'] = maxiter
+    p.root.ln_solver = ScipyGMRES()
+    p.setup(check=False)
+    return p
+
+
+class ResultCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_unconverged_not_stored(self):
+        cache = ResultCache(self.tmp, version='test')
+        p = cube_root(1)
+        cache.run(p)
+        cache.run(p)
+        self.assertEqual((cache.hits, cache.misses, cache.unconverged), (0, 2, 2))
+
+        p = cube_root(20)
+        cache.run(p)
+        cache.run(p)
+        self.assertEqual((cache.hits, cache.misses, cache.unconverged), (1, 3, 2))
+        assert_rel_error(self, p['comp.x'], 2.0 ** (1.0 / 3.0), 1e-9)
+
+    def test_attach_once(self):
+        cache = ResultCache(self.tmp, version='test')
+        p = cache.attach(cache.attach(cube_root(20)))
+        cache.run(p)
+        self.assertEqual(cache.misses, 1)
+        p.run()
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
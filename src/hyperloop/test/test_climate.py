@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+from hyperloop.climate import climate_sweep
+
+W_CP = 491.8
+W_CP_TT = W_CP * 950.0
+
+
+class ClimateSweepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        hours = np.arange(100)
+        self.weather = np.column_stack((295.0 + 10.0 * np.sin(hours * 2 * np.pi / 24),
+                np.maximum(0.0, 1000.0 * np.sin((hours - 6) * 2 * np.pi / 24))))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_chunked_files_match_array(self):
+        expected = climate_sweep(self.weather, W_CP, W_CP_TT)
+        self.assertEqual(len(expected), 100)
+        self.assertTrue(np.all(np.abs(expected['Qout_tot'] - expected['Qin_tot']) <
+                1e-6 * expected['Qin_tot']))
+
+        csv = os.path.join(self.tmpdir, 'weather.csv')
+        np.savetxt(csv, self.weather[:, ::-1], delimiter=',', header='GHI,T_K', comments='')
+        npy = os.path.join(self.tmpdir, 'results.npy')
+        n = climate_sweep(csv, W_CP, W_CP_TT, npy, chunksize=7,
+                columns={'temp_ambient': 'T_K', 'insolation': 'GHI'})
+        self.assertEqual(n, 100)
+        result = np.load(npy)
+        assert_rel_error(self, result['temp_equilibrium'], expected['temp_equilibrium'], 1e-9)
+
+        out_csv = os.path.join(self.tmpdir, 'results.csv')
+        climate_sweep(npy, W_CP, W_CP_TT, out_csv, chunksize=30,
+                columns={'n_pods': 'n_pods'})
+        result = np.genfromtxt(out_csv, delimiter=',', names=True)
+        assert_rel_error(self, result['temp_equilibrium'], expected['temp_equilibrium'], 1e-9)
+
+    def test_missing_column(self):
+        self.assertRaises(ValueError, climate_sweep, self.weather[:, :1], W_CP, W_CP_TT)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.grid_table import csv_to_table
+from hyperloop.cycle.compressor_map import generic_map, read_map, load_map, CompressorMap, \
+        corrected_flow
+
+
+class CompressorMapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.map_data = generic_map()
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_lookup(self):
+        values = self.map_data.lookup(1.0, 0.5)[0]
+        assert_rel_error(self, values, [1.0, 2.0, 0.85], 1e-2)
+
+        Nc, beta = np.array([0.57, 0.83, 1.2]), np.array([0.25, 0.72, -0.1])
+        values, d_Nc, d_beta = self.map_data.lookup(Nc, beta)
+        self.assertEqual(values.shape, (3, 3))
+        step = 1e-7
+        fd_Nc = (self.map_data.lookup(Nc + step, beta)[0] - values) / step
+        fd_beta = (self.map_data.lookup(Nc, beta + step)[0] - values) / step
+        assert_rel_error(self, d_Nc, fd_Nc, 1e-5)
+        assert_rel_error(self, d_beta, fd_beta, 1e-5)
+
+        beta = self.map_data.solve_beta(0.9, 0.85)
+        assert_rel_error(self, self.map_data.lookup(0.9, beta)[0][0], 0.85, 1e-9)
+        self.assertRaises(RuntimeError, self.map_data.solve_beta, 0.9, 0.85, 0.0, 1e-10, 1)
+
+    def test_read_map(self):
+        m = self.map_data
+        json_file = os.path.join(self.tmp, 'map.json')
+        with open(json_file, 'w') as f:
+            json.dump({'Nc': m.Nc.tolist(), 'beta': m.beta.tolist(),
+                    'Wc': m.values[..., 0].tolist(), 'PR': m.values[..., 1].tolist(),
+                    'eff': m.values[..., 2].tolist()}, f)
+        csv_file = os.path.join(self.tmp, 'map.csv')
+        N, B = np.meshgrid(m.Nc, m.beta, indexing='ij')
+        rows = np.column_stack([N.ravel(), B.ravel(), m.values.reshape(-1, 3)])
+        np.savetxt(csv_file, rows[::-1], delimiter=',', header='Nc,beta,Wc,PR,eff', comments='')
+
+        table_file = csv_to_table(csv_file, os.path.join(self.tmp, 'map.tbl'), ('Nc', 'beta'))
+
+        for filename in (json_file, csv_file, table_file):
+            read = read_map(filename)
+            assert_rel_error(self, read.values, m.values, 1e-12)
+            self.assertTrue(load_map(filename) is load_map(filename))
+
+    def test_component(self):
+        p = Problem(root=Group())
+        p.root.add('map', CompressorMap(self.map_data))
+        p.setup(check=False)
+        p['map.Wc_design'] = corrected_flow(2.0, 600.0, 3.0)
+        p['map.W'] = 2.0
+        p['map.Tt'] = 600.0
+        p['map.Tt_design'] = 600.0
+        p['map.Pt'] = 3.0
+        p.run()
+        assert_rel_error(self, p['map.beta'], 0.5, 1e-9)
+        assert_rel_error(self, p['map.PR'], 1.5, 1e-9)
+        assert_rel_error(self, p['map.eff'], 0.8, 1e-9)
+
+        # at the same shaft speed hotter air lowers the corrected speed
+        p['map.Tt'] = 660.0
+        p.run()
+        assert_rel_error(self, p['map.Nc'], np.sqrt(600.0 / 660.0), 1e-12)
+        self.assertTrue(p['map.PR'] < 1.5)
+
+        # slower and with less flow the compressor moves down its speed line
+        p['map.Tt'] = 600.0
+        p['map.N'] = 0.9
+        p['map.W'] = 1.6
+        p.run()
+        assert_rel_error(self, p['map.Nc'], 0.9, 1e-12)
+        self.assertTrue(p['map.PR'] < 1.5)
+        self.assertTrue(abs(p['map.beta'] - 0.5) > 1e-3)
+
+        data = p.check_partial_derivatives(out_stream=None)['map']
+        for key, val in data.items():
+            assert_rel_error(self, val['J_fwd'], val['J_fd'], 1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.core.component import Component
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.solvers.newton import Newton
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.continuation import Continuation, IterationCounter
+from hyperloop.sweep import run_points
+
+
+class Cube(Component):
+    '''State x with x**3 = c**3; fails where the residual exceeds 50.'''
+
+    def __init__(self):
+        super(Cube, self).__init__()
+        self.add_param('c', 1.0)
+        self.add_state('x', 1.0)
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        pass
+
+    def apply_nonlinear(self, params, unknowns, resids):
+        resids['x'] = unknowns['x'] ** 3 - params['c'] ** 3
+        if abs(resids['x']) > 50.0:
+            raise RuntimeError('started too far from the solution')
+
+    def linearize(self, params, unknowns, resids):
+        return {('x', 'x'): 3.0 * unknowns['x'] ** 2, ('x', 'c'): -3.0 * params['c'] ** 2}
+
+
+def cube():
+    p = Problem(root=Group())
+    p.root.add('c_param', IndepVarComp('c', 1.0), promotes=['c'])
+    p.root.add('comp', Cube(), promotes=['c'])
+    p.root.nl_solver = Newton()
+    p.root.ln_solver = ScipyGMRES()
+    p.setup(check=False)
+    return p
+
+
+class ContinuationTestCase(unittest.TestCase):
+
+    def test_extrapolate(self):
+        p = cube()
+        # x = c**2 at the recorded points, read back for c = 4
+        for order, expected in ((0, 9.0), (1, 14.0), (2, 16.0)):
+            continuation = Continuation(p, 'c', order)
+            for c in (1.0, 2.0, 3.0):
+                p['comp.x'] = c ** 2
+                continuation.record({'c': c})
+            self.assertEqual(len(continuation.history), order + 1)
+            continuation.predict({'c': 4.0})
+            assert_rel_error(self, p['comp.x'], expected, 1e-12)
+
+    def test_iterations_saved(self):
+        p = cube()
+        continuation = Continuation(p, 'c', compare=True)
+        c = [1.0, 2.0, 3.0, 5.0]
+        y, errors = run_points([{'c': val} for val in c], ['comp.x'], continuation=continuation)
+        self.assertEqual(errors, {})
+        assert_rel_error(self, y[0], c, 1e-8)
+
+        # from the last converged x = 3 the cold solve of c = 5 fails, while
+        # the linear prediction x = 5 is exact
+        self.assertEqual(len(continuation.iterations), 4)
+        self.assertEqual(len(continuation.iterations_saved), 4)
+        self.assertFalse(np.any(np.isnan(continuation.iterations_saved[:3])))
+        self.assertTrue(np.isnan(continuation.iterations_saved[3]))
+        self.assertGreater(continuation.iterations_saved[2], 0)
+
+        # the sweep restored the solver
+        self.assertNotIn('solve', p.root.nl_solver.__dict__)
+
+    def test_remove(self):
+        p = cube()
+        with IterationCounter(p.root) as counter:
+            self.assertIn('solve', p.root.nl_solver.__dict__)
+            p['c'] = 2.0
+            p.run()
+        self.assertNotIn('solve', p.root.nl_solver.__dict__)
+        count = counter.count
+        self.assertGreater(count, 0)
+        p['c'] = 3.0
+        p.run()
+        self.assertEqual(counter.count, count)
+
+        # continuations run one after another on the same problem do not stack
+        for c in (2.0, 3.0):
+            with Continuation(p, 'c') as continuation:
+                run_points([{'c': c}], ['comp.x'], continuation=continuation)
+                self.assertNotIn('solve', p.root.nl_solver.__dict__)
+            self.assertEqual(len(continuation.iterations), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
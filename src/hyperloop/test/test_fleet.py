@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.mission import simulate_mission
+from hyperloop.fleet import simulate_fleet, headway_sweep
+
+
+class FleetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.kwargs = dict(trace=simulate_mission(20000.0, 100.0), tube_len=20000.0,
+                n_segments=100, save_every=10)
+
+    def test_air_conserved(self):
+        fleet = simulate_fleet(10, 30.0, **self.kwargs)
+        mass = np.sum(fleet['tube_P'] / fleet['tube_T'], axis=1)
+        assert_rel_error(self, mass[-1], mass[0], 1e-9)
+        self.assertEqual(fleet['max_in_tube'], 8)
+        self.assertTrue(fleet['min_spacing'] > 0.0)
+        # the captured air piles up behind the pods, into the path of the next ones
+        self.assertTrue(np.all(fleet['pods']['P_max'][1:] > 99.0))
+        self.assertTrue(np.all(fleet['pods']['heat_rate'] > 0.0))
+
+    def test_headway(self):
+        sweep = headway_sweep([120.0, 20.0], n_pods=10, **self.kwargs)
+        self.assertTrue(sweep['P_max'][1] > sweep['P_max'][0])
+        assert_rel_error(self, sweep['pods_per_hour'], [30.0, 180.0], 1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.cycle.flow_bundle import FlowPassThrough, station_vars
+
+
+class FlowBundleTestCase(unittest.TestCase):
+
+    def test_station_vars(self):
+        self.assertEqual(len(station_vars()), 23)
+        self.assertEqual(station_vars(connect_stat=False, connect_FAR=False)[-1], 'stat:W')
+
+    def test_pass_through(self):
+        p = Problem(root=Group())
+        comp = p.root.add('passthru', FlowPassThrough('Fl_I', ('Fl_O1', 'Fl_O2'), 3),
+                promotes=['*'])
+        p.root.add('n_param', IndepVarComp('Fl_I:tot:n', np.array([0.1, 0.2, 0.3])),
+                promotes=['*'])
+        p.setup(check=False)
+        p['Fl_I:tot:T'] = 500.0
+        p['Fl_I:FAR'] = 0.01
+        p.run()
+        for out in ('Fl_O1', 'Fl_O2'):
+            assert_rel_error(self, p['%s:tot:T' % out], 500.0, 1e-15)
+            assert_rel_error(self, p['%s:FAR' % out], 0.01, 1e-15)
+            assert_rel_error(self, p['%s:tot:n' % out], [0.1, 0.2, 0.3], 1e-15)
+        self.assertEqual(len(comp.unknowns), 2 * len(comp.names))
+
+        data = p.check_partial_derivatives(out_stream=None)['passthru']
+        for key, val in data.items():
+            assert_rel_error(self, val['J_fwd'], val['J_fd'], 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.grid_table import write_table, read_table, load_table, csv_to_table, \
+        validate_table
+
+
+class GridTableTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.x = np.linspace(0.0, 1.0, 5)
+        self.y = np.array([1.0, 2.0, 4.0])
+        X, Y = np.meshgrid(self.x, self.y, indexing='ij')
+        self.a, self.b = X * Y, X + Y
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        filename = os.path.join(self.tmp, 't.tbl')
+        write_table(filename, [('x', self.x), ('y', self.y)], [('a', self.a), ('b', self.b)],
+                {'x': 'm'})
+        table = read_table(filename)
+        self.assertTrue(isinstance(table.values, np.memmap))
+        self.assertFalse(table.values.flags.writeable)
+        self.assertEqual(table.values.shape, (5, 3, 2))
+        self.assertEqual(table.vars, ('a', 'b'))
+        self.assertEqual(table.units, {'x': 'm'})
+        assert_rel_error(self, table.axis('y'), self.y, 1e-15)
+        assert_rel_error(self, table['b'], self.b, 1e-15)
+        self.assertTrue(load_table(filename) is load_table(filename))
+        validate_table(filename, axes=('x', 'y'), vars=('a',))
+        self.assertRaises(ValueError, validate_table, filename, vars=('c',))
+
+    def test_csv(self):
+        csv_file = os.path.join(self.tmp, 't.csv')
+        X, Y = np.meshgrid(self.x, self.y, indexing='ij')
+        rows = np.column_stack([self.a.ravel(), Y.ravel(), X.ravel()])
+        np.savetxt(csv_file, rows[::-1], delimiter=',', header='a,y,x', comments='')
+        table = read_table(csv_to_table(csv_file, os.path.join(self.tmp, 't.tbl'), ('x', 'y')))
+        assert_rel_error(self, table['a'], self.a, 1e-12)
+
+        np.savetxt(csv_file, rows[1:], delimiter=',', header='a,y,x', comments='')
+        self.assertRaises(ValueError, csv_to_table, csv_file, os.path.join(self.tmp, 'u.tbl'),
+                ('x', 'y'))
+
+    def test_validate(self):
+        filename = os.path.join(self.tmp, 't.tbl')
+        write_table(filename, [('x', self.x[::-1])], [('a', self.x)])
+        self.assertRaises(ValueError, validate_table, filename)
+        with open(filename, 'ab') as f:
+            f.write('\0' * 8)
+        self.assertRaises(ValueError, read_table, filename)
+        with open(filename, 'wb') as f:
+            f.write('x,y\n1,2\n')
+        self.assertRaises(ValueError, read_table, filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
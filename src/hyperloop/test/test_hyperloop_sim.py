@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+
+from hyperloop import sweep
+from hyperloop.hyperloop_sim import HyperloopSim, TubeFlow
+from hyperloop.geometry.tube_structure import TubeStructural
+from hyperloop.test.models import TUBE_AREA, build_problem
+
+# fails above pod_MN = 0.8
+MODEL = {'fail_var': 'pod_MN', 'fail_above': 0.8}
+
+
+class RunBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # worker processes are forked after this, so they build the stand-in too
+        self.build_problem = sweep.build_problem
+        sweep.build_problem = build_problem
+        self.p = build_problem(MODEL)
+        self.p['pod_MN'] = 0.4
+        self.p['tube_P'] = 150.0
+        self.p.run()
+
+    def tearDown(self):
+        sweep.build_problem = self.build_problem
+
+    def test_run_batch(self):
+        for n_procs in (1, 2):
+            self.check_run_batch(n_procs)
+
+    def check_run_batch(self, n_procs):
+        p = self.p
+        unknowns = p.root.unknowns.vec.copy()
+        pod_MN = np.array([0.3, 0.5, 0.9])[:, None]
+        tube_P = np.array([100.0, 200.0])
+        result = HyperloopSim.run_batch({'pod_MN': pod_MN, 'tube_P': tube_P},
+                ('tube_flow.W', 'tube_struct.tube_r_outer'), p, n_procs,
+                factory_kwargs=MODEL)
+
+        self.assertEqual(result.shape, (3, 2))
+        self.assertEqual(sorted(result.dtype.names), ['failed', 'pod_MN', 'tube_P',
+                'tube_flow.W', 'tube_struct.tube_r_outer'])
+        assert_rel_error(self, result['pod_MN'], np.broadcast_to(pod_MN, (3, 2)), 1e-12)
+        self.assertEqual(result['failed'].tolist(), [[False, False], [False, False],
+                [True, True]])
+
+        W = TubeFlow.calc(pod_MN, 292.6, tube_P, TUBE_AREA)[2]
+        assert_rel_error(self, result['tube_flow.W'][:2], W[:2], 1e-12)
+        assert_rel_error(self, result['tube_struct.tube_r_outer'][:2],
+                np.full((2, 2), TubeStructural.calc(0.9, 0.214)[0]), 1e-12)
+        self.assertTrue(np.all(np.isnan(result['tube_flow.W'][2])))
+        self.assertTrue(np.all(np.isnan(result['tube_struct.tube_r_outer'][2])))
+
+        # p is left with its inputs and solution
+        self.assertEqual(p['pod_MN'], 0.4)
+        self.assertEqual(p['tube_P'], 150.0)
+        np.testing.assert_array_equal(p.root.unknowns.vec, unknowns)
+        assert_rel_error(self, p['tube_flow.W'], TubeFlow.calc(0.4, 292.6, 150.0, TUBE_AREA)[2],
+                1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
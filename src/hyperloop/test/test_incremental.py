@@ -0,0 +1,75 @@
+import unittest
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.components.exec_comp import ExecComp
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.incremental import IncrementalRun, one_at_a_time
+
+
+def chain():
+    # a -> c1 -> c2 -> sub.c4, b -> sub.c3 -> sub.c4
+    root = Group()
+    root.add('a_param', IndepVarComp('a', 1.0), promotes=['a'])
+    root.add('c1', ExecComp('y = 2.0 * x'))
+    root.add('c2', ExecComp('y = x + k'))
+    sub = root.add('sub', Group())
+    sub.add('c3', ExecComp('y = 3.0 * x'))
+    sub.add('c4', ExecComp('y = x1 * x2'))
+    root.connect('a', 'c1.x')
+    root.connect('c1.y', 'c2.x')
+    root.connect('c2.y', 'sub.c4.x1')
+    sub.connect('c3.y', 'c4.x2')
+    p = Problem(root=root)
+    p.setup(check=False)
+    p['sub.c3.x'] = 1.0
+    return p
+
+
+class IncrementalRunTestCase(unittest.TestCase):
+
+    def test_skip(self):
+        p = chain()
+        with IncrementalRun(p) as inc:
+            p.run()
+            self.assertEqual(len(inc.skipped), 0)
+            assert_rel_error(self, p['sub.c4.y'], 6.0, 1e-15)
+
+            p['sub.c3.x'] = 2.0
+            p.run()
+            self.assertEqual(set(inc.executed), set(['sub', 'sub.c3', 'sub.c4']))
+            assert_rel_error(self, p['sub.c4.y'], 12.0, 1e-15)
+
+            p['c2.k'] = 1.0
+            p.run()
+            self.assertEqual(set(inc.executed), set(['c2', 'sub', 'sub.c4']))
+            self.assertIn('sub.c3', inc.skipped)
+            assert_rel_error(self, p['sub.c4.y'], 18.0, 1e-15)
+
+            p['a'] = 2.0
+            p.run()
+            self.assertNotIn('sub.c3', inc.executed)
+            assert_rel_error(self, p['sub.c4.y'], 30.0, 1e-15)
+
+            p.run()
+            self.assertEqual(inc.executed, [])
+
+        # detached, everything runs again
+        p['c2.k'] = 0.0
+        p.run()
+        assert_rel_error(self, p['sub.c4.y'], 24.0, 1e-15)
+
+    def test_one_at_a_time(self):
+        p = chain()
+        sens = one_at_a_time(p, {'a': 1e-3, 'sub.c3.x': 1e-3, 'c2.k': 1e-3}, ['sub.c4.y'])
+        assert_rel_error(self, sens['sub.c4.y', 'a'], 6.0, 1e-9)
+        assert_rel_error(self, sens['sub.c4.y', 'sub.c3.x'], 6.0, 1e-3)
+        assert_rel_error(self, sens['sub.c4.y', 'c2.k'], 3.0, 1e-9)
+        assert_rel_error(self, p['a'], 1.0, 1e-15)
+        assert_rel_error(self, p['sub.c4.y'], 6.0, 1e-15)
+
+
+if __name__ == '__main__':
+    unittest.main()
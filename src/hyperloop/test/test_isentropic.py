@@ -0,0 +1,27 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+from hyperloop.isentropic import area_ratio, mach_from_area_ratio
+
+
+class IsentropicTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        for branch, Mach in (('subsonic', np.linspace(0.001, 0.999, 500)),
+                ('supersonic', np.linspace(1.001, 40.0, 500))):
+            for gamma in (1.3, 1.41):
+                result = mach_from_area_ratio(area_ratio(Mach, gamma), gamma, branch)
+                self.assertLess(np.max(np.abs(result - Mach) / Mach), 1e-10)
+
+    def test_limits(self):
+        assert_rel_error(self, mach_from_area_ratio(1.0), 1.0, 1e-10)
+        assert_rel_error(self, mach_from_area_ratio(1.0, branch='supersonic'), 1.0, 1e-10)
+        assert_rel_error(self, mach_from_area_ratio(1.33984, 1.4), 0.5, 1e-5)
+        self.assertTrue(np.isnan(mach_from_area_ratio(0.5)))
+        self.assertRaises(ValueError, mach_from_area_ratio, 2.0, 1.4, 'sonic')
+
+
+if __name__ == '__main__':
+    unittest.main()
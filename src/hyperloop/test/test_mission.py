@@ -0,0 +1,89 @@
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.mission import G, simulate_mission, curvature_speed_limit, Mission, \
+        SubscaleMission
+
+
+class MissionTestCase(unittest.TestCase):
+
+    def test_trapezoid_profile(self):
+        # accelerate, cruise and brake at 0.5 g with no drag
+        a, v_max, L = 4.905, 308.0, 563270.0
+        trace = simulate_mission(L, v_max, a, a, coef_drag=0.0)
+        assert_rel_error(self, trace['time_mission'], L / v_max + v_max / a, 1e-6)
+        assert_rel_error(self, trace['x'][-1], L, 1e-9)
+        self.assertTrue(np.all(np.diff(trace['t']) <= 0.1 + 1e-9))
+        self.assertTrue(np.max(np.abs(trace['a'])) <= a * (1 + 1e-9))
+        # kinetic energy is not recovered without regeneration
+        assert_rel_error(self, trace['energy_total'], 0.5 * 15000.0 * v_max ** 2, 1e-6)
+
+    def test_curvature_cap(self):
+        # a 2 km radius curve halfway slows the pod to its lateral limit
+        L = 100000.0
+        v_curve = curvature_speed_limit(2000.0)
+        cap = (np.array([0.0, 49000.0, 49000.1, 51000.0, 51000.1, L]),
+                np.array([1e3, 1e3, v_curve, v_curve, 1e3, 1e3]))
+        trace = simulate_mission(L, 308.0, speed_cap=cap)
+        near = np.abs(trace['x'] - 50000.0) < 900.0
+        self.assertTrue(np.all(trace['v'][near] <= v_curve * (1 + 1e-6)))
+        self.assertGreater(trace['time_mission'], simulate_mission(L, 308.0)['time_mission'])
+
+    def test_full_route(self):
+        # timed by the simulate_mission.full_route benchmark case
+        trace = simulate_mission(560000.0, dt=0.1)
+        n = int(np.ceil(trace['time_mission'] / 0.1)) + 1
+        for name in ('t', 'x', 'v', 'a', 'power', 'energy'):
+            self.assertIn(len(trace[name]), (n, n + 1))
+        self.assertEqual(trace['t'][-1], trace['time_mission'])
+        assert_rel_error(self, trace['x'][-1], 560000.0, 1e-9)
+
+    def test_grade(self):
+        # with full regeneration and no drag, a 1% climb costs m * g * h
+        level = simulate_mission(20000.0, 100.0, coef_drag=0.0, regen_eff=1.0)
+        climb = simulate_mission(20000.0, 100.0, coef_drag=0.0, regen_eff=1.0, grade=0.01)
+        assert_rel_error(self, climb['energy_total'] - level['energy_total'],
+                15000.0 * G * 200.0, 1e-9)
+        self.assertEqual(climb['time_mission'], level['time_mission'])
+
+    def test_thrust_limit(self):
+        # 2 m/s**2 of thrust below the 10 m/s**2 limit, braking at 5 m/s**2
+        L, v_max = 100000.0, 308.0
+        trace = simulate_mission(L, v_max, 10.0, 5.0, coef_drag=0.0, thrust_max=15000.0 * 2.0)
+        assert_rel_error(self, trace['time_mission'], L / v_max + v_max / 4.0 + v_max / 10.0,
+                1e-6)
+        assert_rel_error(self, np.max(trace['a']), 2.0, 1e-6)
+
+        # drag and a climb slow the pod down
+        drag = simulate_mission(L, v_max, coef_drag=1.0, rho=0.1, thrust_max=40000.0)
+        self.assertGreater(drag['time_mission'],
+                simulate_mission(L, v_max, coef_drag=1.0, rho=0.1)['time_mission'])
+        climb = simulate_mission(L, v_max, coef_drag=1.0, rho=0.1, thrust_max=40000.0,
+                grade=0.02)
+        self.assertGreater(climb['time_mission'], drag['time_mission'])
+        self.assertRaises(ValueError, simulate_mission, L, v_max, thrust_max=1000.0, grade=0.05)
+
+    def test_components(self):
+        p = Problem(root=Group())
+        p.root.add('mission', Mission())
+        p.root.add('subscale', SubscaleMission())
+        p.setup(check=False)
+        p.run()
+        assert_rel_error(self, p['subscale.time_mission'], 1600.0 / 90.0 + 5.0, 1e-3)
+        # only propulsion without an auxiliary load
+        energy = p['mission.energy']
+        assert_rel_error(self, energy, 1.3 * p.root.mission.trace['energy_total'] / 3.6e6, 1e-12)
+
+        p['mission.pwr_aux'] = 100.0
+        p.run()
+        assert_rel_error(self, p['mission.energy'] - energy,
+                1.3 * 100.0 * p['mission.time_mission'] / 3600.0, 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+from hyperloop.multipoint import MultipointOptimizer, trip_energy, trip_energy_partials
+
+
+class QuadraticMultipoint(MultipointOptimizer):
+    '''Replaces the model runs by an energy that is smallest at x = (2, 3)'''
+
+    def _run(self, design):
+        a, b = design['inlet_area'], design['cross_section']
+        n = len(self.points)
+        self.n_runs += n
+        return ((a - 2.0) ** 2 + (b - 3.0) ** 2, np.array([2.0 * (a - 2.0), 2.0 * (b - 3.0)]),
+                np.full((n, 1), b - a), np.tile([-1.0, 1.0], (n, 1, 1)))
+
+
+class MultipointTestCase(unittest.TestCase):
+
+    def test_trip_energy(self):
+        # 100 hp for 1000 s, no net drag
+        velocity = 0.5 * np.sqrt(1.4 * 287.0 * 300.0)
+        energy = trip_energy(-100.0, 0.0, 0.5, 300.0, 1000.0 * velocity, 1.4, 287.0)
+        assert_rel_error(self, energy, 100.0 * 745.69987 * 1000.0 / 3.6e6, 1e-6)
+
+        args = (0.5, 300.0, 1000.0 * velocity, 1.4, 287.0)
+        dE_dpwr, dE_dFnet = trip_energy_partials(*args)
+        assert_rel_error(self, dE_dpwr, trip_energy(-99.0, 0.0, *args) - energy, 1e-9)
+        assert_rel_error(self, dE_dFnet, trip_energy(-100.0, 1.0, *args) - energy, 1e-9)
+
+    def test_points_are_completed(self):
+        opt = MultipointOptimizer([{'pod_MN': 0.8}, {'tube_P': 200.0}], n_procs=1)
+        self.assertEqual(opt.points, [{'pod_MN': 0.8, 'tube_P': 99.0},
+                {'pod_MN': 0.2, 'tube_P': 200.0}])
+        self.assertRaises(ValueError, MultipointOptimizer, [{'comp1_exit_MN': 0.3}, {}])
+        self.assertRaises(ValueError, MultipointOptimizer, [{}, {}], weights=[1.0])
+
+    def test_optimize(self):
+        opt = QuadraticMultipoint([{'pod_MN': 0.8}, {'pod_MN': 0.3}],
+                design_vars=('inlet_area', 'cross_section'),
+                constraints=(('cross_section - inlet_area', 1.5, None),), n_procs=1)
+        result = opt.optimize(tol=1e-10)
+        design = opt.design(result.x)
+        # the constraint b - a >= 1.5 is active at the optimum (1.75, 3.25)
+        assert_rel_error(self, design['inlet_area'], 1.75, 1e-4)
+        assert_rel_error(self, design['cross_section'], 3.25, 1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
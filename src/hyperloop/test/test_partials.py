@@ -0,0 +1,96 @@
+import unittest
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.aero import Aero
+from hyperloop.cycle.compression_system import Performance
+from hyperloop.geometry.air_bearing import AirBearing
+from hyperloop.geometry.battery import Battery
+from hyperloop.geometry.inlet import InletGeom
+from hyperloop.geometry.tube_structure import TubeStructural
+from hyperloop.hyperloop_sim import TubeFlow, BypassFlow
+from hyperloop.tube_limit_flow import AreaRatio, TubeThermo, TubeAero, IsentropicTubeFlow
+
+# component and the params it is checked at; every param is driven by an
+# IndepVarComp so that check_partial_derivatives includes it
+CASES = [
+    (TubeFlow, {'pod_MN': 0.6, 'gamma': 1.4, 'tube_T': 292.6, 'tube_P': 99.0, 'tube_area': 2.2,
+            'R': 287.0}),
+    (BypassFlow, {'rhot': 1.2e-3, 'Tt': 310.0, 'bypass_MN': 0.8, 'gamma': 1.4, 'R': 287.0,
+            'bypass_area': 1.1, 'total_W': 1.0, 'percent_into_bypass': 0.9}),
+    (BypassFlow, {'rhot': 1.2e-3, 'Tt': 310.0, 'bypass_MN': 0.8, 'gamma': 1.4, 'R': 287.0,
+            'bypass_area': 1.1, 'total_W': 0.2, 'percent_into_bypass': 0.9}),
+    (AreaRatio, {'tube_r': 1.5, 'inlet_area': 1.4, 'gamma': 1.4, 'Mach': 0.7}),
+    (TubeThermo, {'Ps': 99.0, 'Ts': 292.1, 'Mach': 0.7, 'gamma': 1.4}),
+    (TubeAero, {'velocity_tube': 200.0, 'velocity_bypass': 300.0, 'bypass_area': 1.1,
+            'tube_r': 1.5, 'rho_tube': 1.2e-3, 'rho_bypass': 1.1e-3}),
+    (IsentropicTubeFlow, {'Pt': 120.0, 'Tt': 320.0, 'Mach': 0.7, 'Mach_bypass': 0.95,
+            'gamma': 1.4, 'R': 287.0}),
+    (Aero, {'coef_drag': 0.9, 'area_frontal': 1.4, 'velocity_capsule': 300.0, 'rho': 1.2e-3,
+            'gross_thrust': 800.0}),
+    (InletGeom, {'wall_thickness': 0.05, 'area_out': 0.8, 'hub_to_tip': 0.4,
+            'cross_section': 1.4, 'tube_area': 2.33}),
+    (TubeStructural, {'tube_r': 1.1, 'fill_area': 0.214}),
+    (Battery, {'time_mission': 2100.0, 'cross_section': 1.3, 'energy': 400.0, 'e': 0.182,
+            'U': 494.0}),
+    (AirBearing, {'tube_radius': 1.1, 'capsule_mass': 15000.0, 'P_in': 9.4,
+            'sweep_angle': 4.0, 'eff': 0.5}),
+    (Performance, {'C1_pwr': 800.0, 'C2_pwr': 300.0, 'Fg': 1200.0, 'F_ram': -900.0,
+            'Ps_bearing_target': 11.0, 'Ps_bearing': 12.0}),
+]
+
+
+class PartialsTestCase(unittest.TestCase):
+
+    def test_check_partials(self):
+        for component, params in CASES:
+            p = Problem(root=Group())
+            p.root.ln_solver = ScipyGMRES()
+            p.root.add('comp', component())
+            for name, val in params.items():
+                p.root.add('p_' + name, IndepVarComp(name, val))
+                p.root.connect('p_%s.%s' % (name, name), 'comp.' + name)
+            p.setup(check=False)
+            p.run()
+
+            data = p.check_partial_derivatives(out_stream=None,
+                    global_options={'check_form': 'central'})
+            states = p.root.comp.states
+            for (out, param), errors in data['comp'].items():
+                if states and out not in states:
+                    # the check differences the residuals of apply_nonlinear,
+                    # which are only set for the states
+                    continue
+                scale = max(1.0, errors['magnitude'][2])
+                self.assertLess(errors['abs error'][0] / scale, 1e-5,
+                        '%s: d%s/d%s' % (component.__name__, out, param))
+                self.assertLess(errors['abs error'][1] / scale, 1e-5,
+                        '%s: d%s/d%s' % (component.__name__, out, param))
+
+    def test_area_ratio_outputs(self):
+        comp = AreaRatio()
+        params = {'tube_r': 1.5, 'inlet_area': 1.4, 'gamma': 1.4, 'Mach': 0.7}
+        unknowns = {}
+        resids = {}
+        comp.apply_nonlinear(params, unknowns, resids)
+        J = comp.linearize(params, unknowns, resids)
+        outputs = ('bypass_area', 'AR', 'AR_resid', 'Mach_limit')
+        for name in ('tube_r', 'inlet_area', 'gamma', 'Mach'):
+            step = 1e-6 * params[name]
+            values = []
+            for sign in (1.0, -1.0):
+                args = dict(params)
+                args[name] += sign * step
+                values.append(AreaRatio.calc(args['tube_r'], args['inlet_area'], args['Mach'],
+                        args['gamma']))
+            for out, plus, minus in zip(outputs, *values):
+                assert_rel_error(self, J.get((out, name), 0.0), (plus - minus) / (2.0 * step),
+                        1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
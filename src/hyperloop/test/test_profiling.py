@@ -0,0 +1,38 @@
+import unittest
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+
+from hyperloop.tube_limit_flow import TubeLimitFlow
+from hyperloop.profiling import SolveProfiler
+
+
+class SolveProfilerTestCase(unittest.TestCase):
+
+    def test_tube_limit_flow(self):
+        p = Problem(root=Group())
+        comp = p.root.add('comp', TubeLimitFlow(engine='analytic'))
+        comp.ln_solver = ScipyGMRES()
+        p.root.ln_solver = ScipyGMRES()
+        p.setup(check=False)
+
+        with SolveProfiler(p.root) as prof:
+            p.run()
+            p.run()
+
+        self.assertEqual(prof.stats['comp.tube_aero']['calls']['solve_nonlinear'], 2)
+        self.assertEqual(prof.stats['comp.tube_aero']['type'], 'TubeAero')
+        self.assertGreaterEqual(prof.stats['']['time'], prof.stats['comp']['time'])
+        self.assertAlmostEqual(sum(prof.folded.values()), prof.stats['']['time'], places=6)
+        self.assertIn('root;comp;tube_aero', prof.folded)
+        self.assertIn('comp.tube_aero', prof.table())
+
+        # the original methods are restored on exit
+        self.assertNotIn('solve_nonlinear', comp.tube_aero.__dict__)
+        p.run()
+        self.assertEqual(prof.stats['comp.tube_aero']['calls']['solve_nonlinear'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
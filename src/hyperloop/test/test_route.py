@@ -0,0 +1,93 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.mission import Mission, G
+from hyperloop.route import Route, read_route, load_route, project
+
+
+def s_curve(radius=5000.0):
+    '''10 km straight, a quarter circle of `radius` and another 10 km straight.'''
+    straight = np.linspace(0.0, 10000.0, 101)
+    theta = np.linspace(0.0, 0.5 * np.pi, 200)[1:]
+    x = np.concatenate((straight, 10000.0 + radius * np.sin(theta),
+            np.full(100, 10000.0 + radius)))
+    y = np.concatenate((np.zeros(101), radius * (1.0 - np.cos(theta)),
+            radius + straight[1:]))
+    return x, y
+
+
+class RouteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.route = Route(*s_curve())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_curvature_envelope(self):
+        assert_rel_error(self, self.route.length, 20000.0 + 2500.0 * np.pi, 1e-4)
+        s, v_max = self.route.speed_envelope(308.0)
+        arc = (s > 10200.0) & (s < 10000.0 + 2500.0 * np.pi - 200.0)
+        assert_rel_error(self, v_max[arc].mean(), np.sqrt(0.5 * G * 5000.0), 3e-3)
+        self.assertTrue(np.all(v_max[s < 9900.0] == 308.0))
+        self.assertTrue(self.route.speed_envelope(308.0) is self.route.speed_envelope(308.0))
+
+    def test_locate(self):
+        s = np.array([500.0, 10000.0 + 1250.0 * np.pi, 20000.0])
+        x, y, z = self.route.position(s)
+        s_found, offset = self.route.locate(x + 3.0, y)
+        assert_rel_error(self, s_found, s, 1e-3)
+        self.assertEqual(list(self.route.segment_index([0.0, 50.0, 1e9])), [0, 0, 398])
+
+        # a hairpin: a single 10 km segment, then a densely sampled turn and
+        # straight back 200 m away, whose vertices are closer to the middle
+        # of the long segment than its ends
+        theta = np.linspace(0.0, np.pi, 50)
+        back = np.linspace(10000.0, 5000.0, 501)[1:]
+        route = Route(np.concatenate(([0.0], 10000.0 + 100.0 * np.sin(theta), back)),
+                np.concatenate(([0.0], 100.0 * (1.0 - np.cos(theta)), np.full(500, 200.0))))
+        s_found, offset = route.locate([5000.0, 6000.0, 4000.0], [90.0, 210.0, -50.0])
+        turn = route.s[50]
+        assert_rel_error(self, s_found, [5000.0, turn + 4000.0, 4000.0], 1e-9)
+        assert_rel_error(self, offset, [90.0, 10.0, 50.0], 1e-9)
+
+    def test_read_files(self):
+        lon = np.linspace(-118.0, -118.5, 50)
+        lat = np.linspace(34.0, 34.5, 50)
+        elevation = np.linspace(0.0, 500.0, 50)
+        geojson = os.path.join(self.tmpdir, 'route.geojson')
+        with open(geojson, 'w') as f:
+            json.dump({'type': 'Feature', 'geometry': {'type': 'LineString',
+                    'coordinates': np.column_stack((lon, lat, elevation)).tolist()}}, f)
+        csv = os.path.join(self.tmpdir, 'route.csv')
+        np.savetxt(csv, np.column_stack((lon, lat, elevation)), delimiter=',',
+                header='lon,lat,elevation', comments='')
+
+        route = read_route(geojson)
+        assert_rel_error(self, route.length, read_route(csv).length, 1e-12)
+        x, y = project(lon, lat)
+        assert_rel_error(self, route.length, np.hypot(x[-1] - x[0], y[-1] - y[0]), 1e-9)
+        assert_rel_error(self, route.grade_at(100.0), 500.0 / route.length, 1e-9)
+        self.assertTrue(load_route(csv) is load_route(csv))
+
+    def test_mission(self):
+        p = Problem(root=Group())
+        p.root.add('mission', Mission(route=self.route))
+        p.setup(check=False)
+        p.run()
+        assert_rel_error(self, p['mission.tube_len'], self.route.length, 1e-12)
+        self.assertLess(np.max(p.root.mission.trace['v']), 308.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
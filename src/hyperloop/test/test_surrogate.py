@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.components.indep_var_comp import IndepVarComp
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.hyperloop_sim import TubeFlow
+from hyperloop.surrogate import Surrogate, SurrogateGroup, build_surrogate, latin_hypercube, \
+        sample
+from hyperloop.test.models import build_problem
+
+BOUNDS = (('pod_MN', 0.2, 0.8), ('tube_P', 50.0, 500.0), ('tube_T', 280.0, 320.0))
+OUTPUTS = ('tube_flow.Pt', 'tube_flow.W')
+UNITS = {'pod_MN': None, 'tube_P': 'Pa', 'tube_T': 'degK', 'tube_flow.Pt': 'Pa',
+        'tube_flow.W': 'kg/s'}
+
+
+def tube_flow(X):
+    Pt, Tt, W = TubeFlow.calc(X[:, 0], X[:, 2], X[:, 1], 2.0)
+    return np.column_stack((Pt, W))
+
+
+class SurrogateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        lower = np.array([b[1] for b in BOUNDS])
+        upper = np.array([b[2] for b in BOUNDS])
+        self.X = lower + latin_hypercube(60, 3, seed=1) * (upper - lower)
+        self.Y = tube_flow(self.X)
+
+    def test_latin_hypercube(self):
+        samples = latin_hypercube(10, 3, seed=0)
+        for j in range(3):
+            self.assertEqual(sorted(np.floor(samples[:, j] * 10)), range(10))
+
+    def test_kinds(self):
+        X_test = np.array([[0.5, 200.0, 300.0], [0.3, 400.0, 290.0]])
+        for kind in ('kriging', 'rbf', 'poly'):
+            surrogate = Surrogate(BOUNDS, OUTPUTS, kind)
+            error = surrogate.cross_validate(self.X, self.Y, seed=0)
+            self.assertTrue(all(e < 0.1 for e in error.values()), (kind, error))
+            surrogate.fit(self.X, self.Y)
+            assert_rel_error(self, surrogate.predict(X_test), tube_flow(X_test), 0.02)
+        self.assertRaises(ValueError, Surrogate, BOUNDS, OUTPUTS, 'spline')
+
+    def test_component_and_persistence(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'surrogate.pkl')
+            Surrogate(BOUNDS, OUTPUTS, units=UNITS).fit(self.X, self.Y).save(filename)
+            surrogate = Surrogate.load(filename)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(surrogate.units, UNITS)
+
+        # the outputs resolve under their model names, and params convert units
+        p = Problem(root=SurrogateGroup(surrogate))
+        p.root.add('MN', IndepVarComp('pod_MN', 0.5), promotes=['*'])
+        p.root.add('T', IndepVarComp('tube_T', 26.85, units='degC'), promotes=['*'])
+        p.setup(check=False)
+        p['tube_P'] = 200.0
+        p.run()
+        self.assertEqual(p.root.tube_flow.unknowns.metadata('W')['units'], 'kg/s')
+        assert_rel_error(self, p['tube_flow.W'], tube_flow(np.array([[0.5, 200.0, 300.0]]))[0, 1],
+                0.01)
+        data = p.check_partial_derivatives(out_stream=None)
+        for errors in data['tube_flow'].values():
+            self.assertLess(errors['rel error'][0], 1e-3)
+
+    def test_sample_failures(self):
+        p = build_problem()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            X, Y = sample(20, BOUNDS, OUTPUTS, seed=0, p=p)
+        # the two highest of the 20 tube_P intervals lie above 455 Pa
+        self.assertEqual(X.shape, (18, 3))
+        self.assertEqual(Y.shape, (18, 2))
+        self.assertTrue(np.all(X[:, 1] <= 455.0))
+        self.assertEqual(len(caught), 1)
+        self.assertIn('2 of 20 samples failed', str(caught[0].message))
+        self.assertIn('tube_P out of range', str(caught[0].message))
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.assertRaises(RuntimeError, sample, 20, BOUNDS, OUTPUTS, 0, 19, p=p)
+
+    def test_build_surrogate(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            surrogate = build_surrogate(30, BOUNDS, OUTPUTS, 'rbf', p=build_problem())
+        # units of the sampled model
+        self.assertEqual(surrogate.units, UNITS)
+        self.assertEqual(sorted(surrogate.cv_error), sorted(OUTPUTS))
+
+
+if __name__ == '__main__':
+    unittest.main()
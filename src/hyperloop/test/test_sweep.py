@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+
+from hyperloop import sweep
+from hyperloop.hyperloop_sim import TubeFlow
+from hyperloop.test.models import TUBE_AREA, build_problem
+
+
+def tube_W(tube_P, tube_T=292.6):
+    return TubeFlow.calc(0.5, tube_T, np.asarray(tube_P), TUBE_AREA)[2]
+
+
+class SweepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # worker processes are forked after this, so they build the stand-in too
+        self.build_problem = sweep.build_problem
+        sweep.build_problem = build_problem
+        self.tube_P = np.linspace(100.0, 400.0, 8)
+
+    def tearDown(self):
+        sweep.build_problem = self.build_problem
+
+    def test_order(self):
+        done = []
+        y, errors = sweep.sweep(self.tube_P, 'tube_P', ['tube_flow.W', 'tube_P'], n_procs=2,
+                chunksize=1, settings=[('tube_T', 300.0)],
+                callback=lambda n_done, n_total: done.append((n_done, n_total)))
+        self.assertEqual(errors, {})
+        self.assertEqual(y.shape, (2, 8))
+        assert_rel_error(self, y[0], tube_W(self.tube_P, 300.0), 1e-12)
+        assert_rel_error(self, y[1], self.tube_P, 1e-12)
+        self.assertEqual(done, [(n, 8) for n in range(1, 9)])
+
+    def test_failed_point(self):
+        tube_P = [100.0, 500.0, 200.0]
+        for n_procs in (1, 2):
+            y, errors = sweep.sweep(tube_P, 'tube_P', ['tube_flow.W'], n_procs=n_procs)
+            self.assertEqual(sorted(errors), [1])
+            self.assertIn('RuntimeError: tube_P out of range', errors[1])
+            self.assertTrue(np.isnan(y[0, 1]))
+            assert_rel_error(self, y[0, [0, 2]], tube_W([100.0, 200.0]), 1e-12)
+
+    def test_pool(self):
+        pool = sweep.make_pool(2)
+        try:
+            self.assertEqual(pool.n_procs, 2)
+            points = [{'tube_P': tube_P} for tube_P in self.tube_P]
+            for chunksize in (None, 3):
+                y, errors = sweep.run_points(points, ['tube_flow.W'], pool=pool,
+                        chunksize=chunksize)
+                self.assertEqual(errors, {})
+                assert_rel_error(self, y[0], tube_W(self.tube_P), 1e-12)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def test_jacobian(self):
+        points = [{'tube_P': 100.0}, {'tube_P': 500.0}, {'tube_P': 300.0}]
+        for n_procs in (1, 2):
+            y, errors, jac = sweep.run_points(points, ['tube_flow.W'], n_procs=n_procs,
+                    wrt=['tube_P', 'pod_MN'], of=['tube_flow.W'])
+            self.assertEqual(jac.shape, (3, 1, 2))
+            self.assertEqual(sorted(errors), [1])
+            self.assertTrue(np.all(np.isnan(jac[1])))
+            for index in (0, 2):
+                # W is proportional to tube_P and pod_MN
+                assert_rel_error(self, jac[index, 0], y[0, index] /
+                        np.array([points[index]['tube_P'], 0.5]), 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
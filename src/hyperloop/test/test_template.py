@@ -0,0 +1,52 @@
+import unittest
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.tube_limit_flow import TubeLimitFlow
+from hyperloop.template import ProblemTemplate
+
+
+def _factory(tube_r=1.5):
+    p = Problem(root=Group())
+    comp = p.root.add('comp', TubeLimitFlow(engine='analytic'))
+    comp.ln_solver = ScipyGMRES()
+    p.root.ln_solver = ScipyGMRES()
+    p.setup(check=False)
+    p['comp.tube_r'] = tube_r
+    return p
+
+
+class ProblemTemplateTestCase(unittest.TestCase):
+
+    def test_reset(self):
+        template = ProblemTemplate(_factory, {'tube_r': 1.2}, [('comp.inlet_area', 1.0)])
+        with template.problem({'comp.Mach': 0.5, 'comp.AR_comp.gamma': 1.3}) as p:
+            p.run()
+            W_excess = p['comp.W_excess']
+
+        with template.problem() as p:
+            self.assertEqual(p['comp.AR_comp.gamma'], 1.41)
+            self.assertEqual(p['comp.Mach'], 1.0)
+            self.assertEqual(p['comp.tube_r'], 1.2)
+            self.assertEqual(p['comp.inlet_area'], 1.0)
+            self.assertEqual(p['comp.W_excess'], 0.0)
+            p['comp.Mach'] = 0.5
+            p['comp.AR_comp.gamma'] = 1.3
+            p.run()
+            assert_rel_error(self, p['comp.W_excess'], W_excess, 1e-12)
+
+    def test_pool(self):
+        template = ProblemTemplate(_factory)
+        with template.problem() as p1:
+            with template.problem() as p2:
+                self.assertIsNot(p1, p2)
+        with template.problem() as p3:
+            self.assertIn(p3, (p1, p2))
+        self.assertEqual(template.n_built, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.trajectory import optimize_trajectory, OptimalMission
+
+
+class TrajectoryTestCase(unittest.TestCase):
+
+    def test_minimum_time(self):
+        # without a binding jerk limit the fastest trip is accelerate, cruise, brake
+        a, v_max, L = 4.905, 100.0, 20000.0
+        trace = optimize_trajectory(L, 'time', n_nodes=201, max_velocity=v_max, jerk=100.0)
+        self.assertTrue(trace['success'])
+        assert_rel_error(self, trace['time_mission'], L / v_max + v_max / a, 2e-3)
+
+        jerk_limited = optimize_trajectory(L, 'time', n_nodes=201, max_velocity=v_max, jerk=0.5)
+        self.assertTrue(np.all(np.abs(jerk_limited['jerk']) <= 0.5 * (1 + 1e-4)))
+        # the pod starts and ends at rest, so departure and arrival are jerk limited too
+        self.assertTrue(0.0 < jerk_limited['jerk'][0] <= 0.5 * (1 + 1e-4))
+        self.assertTrue(0.0 < jerk_limited['jerk'][-1] <= 0.5 * (1 + 1e-4))
+        self.assertGreater(jerk_limited['time_mission'], trace['time_mission'])
+
+    def test_minimum_energy(self):
+        # with high drag, cruising slower saves energy
+        pod = dict(n_nodes=201, max_velocity=100.0, coef_drag=1000.0)
+        fastest = optimize_trajectory(20000.0, 'time', **pod)
+        trace = optimize_trajectory(20000.0, 'energy', time_max=1.2 * fastest['time_mission'],
+                **pod)
+        self.assertTrue(trace['success'])
+        self.assertLess(trace['time_mission'], 1.2 * fastest['time_mission'] * (1 + 1e-6))
+        self.assertLess(trace['energy_total'], 0.95 * fastest['energy_total'])
+        self.assertTrue(np.all(trace['v'] <= 100.0 * (1 + 1e-9)))
+
+    def test_component(self):
+        p = Problem(root=Group())
+        p.root.add('mission', OptimalMission(20000.0, n_nodes=101))
+        p.setup(check=False)
+        p.run()
+        self.assertGreater(p['mission.time_mission'], 20000.0 / 308.0)
+        assert_rel_error(self, p['mission.energy'], 1.3 * p.root.mission.trace['energy_total'] /
+                3.6e6, 1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.solvers.scipy_gmres import ScipyGMRES
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.tube_limit_flow import TubeLimitFlow, limit_flow
+
+
+def _problem(engine):
+    p = Problem(root=Group())
+    comp = p.root.add('comp', TubeLimitFlow(engine=engine))
+    comp.ln_solver = ScipyGMRES()
+    p.root.ln_solver = ScipyGMRES()
+    p.setup(check=False)
+    p['comp.tube_r'] = 1.5
+    p['comp.inlet_area'] = 1.4
+    return p
+
+
+class TubeLimitFlowTestCase(unittest.TestCase):
+
+    def test_analytic_matches_pycycle(self):
+        p_cycle = _problem('pycycle')
+        p_analytic = _problem('analytic')
+        for Mach in (0.3, 0.6, 0.9):
+            for p in (p_cycle, p_analytic):
+                p['comp.Mach'] = Mach
+                p.run()
+            for name in ('tube_area', 'W_tube', 'W_kant', 'W_excess'):
+                assert_rel_error(self, p_analytic['comp.%s' % name], p_cycle['comp.%s' % name],
+                        0.01)
+
+    def test_limit_flow_matches_component(self):
+        p = _problem('analytic')
+        Machs = np.array([0.3, 0.6, 0.9])
+        result = limit_flow(Machs, 1.5, 1.4)
+        for i, Mach in enumerate(Machs):
+            p['comp.Mach'] = Mach
+            p.run()
+            for name in ('W_tube', 'W_kant', 'W_excess'):
+                assert_rel_error(self, result[name][i], p['comp.%s' % name], 1e-10)
+
+    def test_mach_limit(self):
+        result = limit_flow(np.array([0.5, 0.8]), 1.5, 1.4)
+        # at the limiting Mach the bypass area is exactly the choked area
+        assert_rel_error(self, limit_flow(result['Mach_limit'][0], 1.5, 1.4)['AR'],
+                result['tube_area'][0] / result['bypass_area'][0], 1e-8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+from hyperloop.tube_wall_temp import heat_balance, equilibrium_temp
+
+# nozzle flow of the tube_wall_temp example: W * Cp and W * Cp * Tt in SI
+W_CP = 0.489880 * 1004.0
+W_CP_TT = W_CP * 950.0
+
+
+class TubeWallEquilibriumTestCase(unittest.TestCase):
+
+    def test_newton_matches_brent(self):
+        T_air = np.linspace(280.0, 320.0, 5)[:, None]
+        insolation = np.array([0.0, 500.0, 1000.0])[None, :]
+        T_newton = equilibrium_temp(T_air, insolation, 34, W_CP, W_CP_TT)
+        T_brent = equilibrium_temp(T_air, insolation, 34, W_CP, W_CP_TT, method='brent')
+        self.assertEqual(T_newton.shape, (5, 3))
+        assert_rel_error(self, T_newton, T_brent, 1e-10)
+        Q = heat_balance(T_newton, T_air, 3.006, 482803.0, 34, W_CP, W_CP_TT, insolation,
+                check_range=False)[0]
+        self.assertTrue(np.all(np.abs(Q) < 1e-6 * 34 * W_CP_TT))
+
+    def test_scalar_and_cold_wall(self):
+        # with no pods and no sun the wall settles at the ambient air temperature
+        T = equilibrium_temp(305.6, 0.0, 0, W_CP, W_CP_TT)
+        self.assertIsInstance(T, float)
+        assert_rel_error(self, T, 305.6, 1e-9)
+
+    def test_derivative(self):
+        T = np.array([290.0, 310.0, 330.0])
+        args = (305.6, 3.006, 482803.0, 34, W_CP, W_CP_TT)
+        dQ_dT = heat_balance(T, *args)[1]
+        fd = (heat_balance(T + 1e-4, *args)[0] - heat_balance(T - 1e-4, *args)[0]) / 2e-4
+        assert_rel_error(self, dQ_dT, fd, 1e-6)
+
+    def test_bad_method(self):
+        self.assertRaises(ValueError, equilibrium_temp, 305.6, 1000.0, 34, W_CP, W_CP_TT,
+                method='cobyla')
+
+
+if __name__ == '__main__':
+    unittest.main()
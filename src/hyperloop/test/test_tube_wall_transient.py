@@ -0,0 +1,28 @@
+import unittest
+
+import numpy as np
+
+from openmdao.test.util import assert_rel_error
+from hyperloop.tube_wall_temp import equilibrium_temp
+from hyperloop.tube_wall_transient import simulate, pod_heat_deposition
+
+
+class TubeWallTransientTestCase(unittest.TestCase):
+
+    def test_steady_state(self):
+        r, L, n_pods, Q_pod, T_air = 1.11252, 482803.0, 34, 519763.0, 305.6
+        result = simulate(n_segments=50, duration=60 * 86400.0, dt=3600.0, tube_len=L,
+                r_tube_outer=r, n_pods=n_pods, heat_rate_per_pod=Q_pod, insolation=1000.0,
+                temp_ambient=T_air)
+        # a constant heat rate per pod is pod_W_cp = 0, pod_W_cp_Tt = Q_pod
+        assert_rel_error(self, result['temp'][-1], equilibrium_temp(T_air, 1000.0, n_pods, 0.0,
+                Q_pod, r, L), 1e-6)
+
+    def test_pod_heat_is_conserved(self):
+        q = pod_heat_deposition(1000.0, 4000, 482803.0, 34, 519763.0, velocity=300.0, dt=10.0)
+        assert_rel_error(self, q.sum(), 34 * 519763.0, 1e-12)
+        self.assertLessEqual(np.count_nonzero(q), 34 * 25) # only segments passed in the step
+
+
+if __name__ == '__main__':
+    unittest.main()
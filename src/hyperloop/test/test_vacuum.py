@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from openmdao.core.problem import Problem
+from openmdao.core.group import Group
+from openmdao.test.util import assert_rel_error
+
+from hyperloop.vacuum import pump_down, leak_power, VacuumSystem, P_ATM
+
+FLAT = (np.array([1e-3, 1e6]), np.array([1.0, 1.0]))
+
+
+class VacuumTestCase(unittest.TestCase):
+
+    def test_pump_down(self):
+        # constant speed S: P = P_inf + (P0 - P_inf) exp(-S t / V), P_inf = leak / S
+        V, S, leak = 1e6, 100.0, 500.0
+        P_target = np.array([100.0, 30.0, 10.0])
+        curve = pump_down(P_target, V, leak, n_pumps=1, speed_per_pump=S, curve=FLAT,
+                n_points=4000)
+        P_inf = leak / S
+        expected = V / S * np.log((P_ATM - P_inf) / (P_target - P_inf))
+        assert_rel_error(self, curve['time'], expected, 1e-5)
+        self.assertEqual(curve['t'].shape, (4000, 3))
+        unreachable = pump_down([15.0, 30.0], V, 2000.0, 1, 100.0, curve=FLAT)
+        self.assertTrue(np.isinf(unreachable['time'][0]))
+        self.assertTrue(np.isinf(unreachable['energy_total'][0]))
+        self.assertTrue(np.isfinite(unreachable['energy_total'][1]))
+        self.assertEqual(unreachable['reachable'].tolist(), [False, True])
+
+    def test_component(self):
+        p = Problem(root=Group())
+        p.root.add('vacuum', VacuumSystem())
+        p.setup(check=False)
+        p['vacuum.tube_P'] = 100.0
+        p.run()
+        assert_rel_error(self, p['vacuum.pwr_leak'], leak_power(100.0, 563.27) / 1000.0, 1e-12)
+        self.assertTrue(p['vacuum.pump_margin'] > 1.0)
+        self.assertTrue(0.0 < p['vacuum.time_pumpdown'] < 86400.0)
+        self.assertTrue(p['vacuum.pwr_pumpdown'] > p['vacuum.pwr_leak'])
+
+
+if __name__ == '__main__':
+    unittest.main()
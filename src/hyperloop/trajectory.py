@@ -0,0 +1,365 @@
+'''
+trajectory.py -
+    Minimum time or minimum energy speed profile of a pod along a route,
+    by direct collocation: the node speeds on a grid of distance along the
+    route are optimized subject to speed caps and acceleration and jerk
+    limits, with sparse constraint Jacobians and Hessians so that problems
+    with thousands of nodes stay cheap.
+'''
+
+import warnings
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize, Bounds, NonlinearConstraint
+
+from mission import G, Mission, speed_profile
+
+
+class TrajectoryProblem(object):
+    '''
+    Collocation of the pod speed at n_nodes evenly spaced along the route,
+    with trapezoidal segments: the acceleration of a segment is
+    (v[i+1]**2 - v[i]**2) / (2 * ds), its time 2 * ds / (v[i] + v[i+1]) and
+    the jerk at a node the change of acceleration over the time between
+    segment midpoints, ds / v[i]. At the end points the pod is at rest
+    before departure and after arrival, so the jerk there is the
+    acceleration of the first and last segment over its time.
+
+    For minimum energy every segment also carries the propulsive work
+    it needs, as a slack variable bounded below by the work and by zero,
+    so that braking is credited only `regen_eff` of its energy without a
+    non-smooth objective.
+
+    Parameters
+    ----------
+    route_len : float
+        Length of the trip in m.
+    objective : str
+        'time' or 'energy'.
+    n_nodes : int
+        Collocation nodes, including the end points.
+    max_velocity, accel, decel, jerk : float
+        Limits in m/s, m/s**2 and m/s**3.
+    speed_cap : float, function or (numpy.array, numpy.array)
+        Further speed limit along the route, as in mission.simulate_mission,
+        e.g. route.Route.speed_envelope().
+    time_max : float
+        Largest trip time in s for minimum energy.
+    mass, coef_drag, area_frontal, rho, net_force, pwr_req, prop_eff, regen_eff :
+        Pod model as in mission.simulate_mission; net_force is a constant.
+    '''
+
+    def __init__(self, route_len=563270.0, objective='energy', n_nodes=1001, max_velocity=308.0,
+            accel=0.5 * G, decel=0.5 * G, jerk=2.0, speed_cap=None, time_max=None,
+            mass=15000.0, coef_drag=1.0, area_frontal=1.4, rho=1.18e-3, net_force=0.0,
+            pwr_req=0.0, prop_eff=1.0, regen_eff=0.0, v_start=0.0, v_end=0.0):
+        if objective not in ('time', 'energy'):
+            raise ValueError("objective must be 'time' or 'energy', not %r" % objective)
+        if objective == 'energy' and time_max is None and pwr_req <= 0.0:
+            raise ValueError('minimum energy needs time_max or pwr_req > 0, '
+                    'otherwise the pod would never arrive')
+        self.objective = objective
+        self.n = n_nodes - 1 # segments
+        self.s = np.linspace(0.0, route_len, n_nodes)
+        self.ds = route_len / self.n
+        self.accel, self.decel, self.jerk = accel, decel, jerk
+        self.time_max = time_max
+        self.mass = mass
+        self.k_drag = 0.5 * coef_drag * rho * area_frontal
+        self.net_force = net_force
+        self.pwr_req = pwr_req
+        self.prop_eff, self.regen_eff = prop_eff, regen_eff
+        self.v_start, self.v_end = v_start, v_end
+
+        cap = np.full(n_nodes, float(max_velocity))
+        if callable(speed_cap):
+            cap = np.minimum(cap, speed_cap(self.s))
+        elif isinstance(speed_cap, tuple):
+            cap = np.minimum(cap, np.interp(self.s, speed_cap[0],
+                    np.minimum(speed_cap[1], max_velocity)))
+        elif speed_cap is not None:
+            cap = np.minimum(cap, speed_cap)
+        self.cap = cap
+
+        # energies are scaled by the kinetic energy at full speed
+        self.e_ref = 0.5 * mass * max_velocity ** 2
+        self.f_ref = route_len / max_velocity if objective == 'time' else \
+                self.e_ref + (pwr_req + self.k_drag * max_velocity ** 3) * route_len / max_velocity
+        self.n_free = n_nodes - 2 + (self.n if objective == 'energy' else 0)
+
+    def _speeds(self, x):
+        return np.concatenate(([self.v_start], x[:self.n - 1], [self.v_end]))
+
+    def _free(self, M):
+        '''Columns (and rows) of the fixed end speeds removed from a full matrix.'''
+        keep = np.r_[1:self.n, self.n + 1:self.n + 1 + (self.n_free - self.n + 1)]
+        return M.tocsr()[:, keep] if M.shape[0] != M.shape[1] else M.tocsr()[keep][:, keep]
+
+    def segment_terms(self, v):
+        '''Acceleration, time and work of every segment for node speeds v.'''
+        w = v[:-1] + v[1:]
+        a = (v[1:] ** 2 - v[:-1] ** 2) / (2.0 * self.ds)
+        dt = 2.0 * self.ds / w
+        work = (self.mass * a + self.k_drag * 0.25 * w ** 2 - self.net_force) * self.ds
+        return a, dt, work
+
+    # objective
+
+    def fun(self, x):
+        v = self._speeds(x)
+        a, dt, work = self.segment_terms(v)
+        if self.objective == 'time':
+            return dt.sum() / self.f_ref
+        q = x[self.n - 1:]
+        r = self.regen_eff
+        energy = ((1.0 / self.prop_eff - r) * q.sum() * self.e_ref + r * work.sum() +
+                self.pwr_req * dt.sum())
+        return energy / self.f_ref
+
+    def _dt_partials(self, v):
+        w = v[:-1] + v[1:]
+        return -2.0 * self.ds / w ** 2, 4.0 * self.ds / w ** 3
+
+    def _work_partials(self, v):
+        w = v[:-1] + v[1:]
+        dk = 0.5 * self.k_drag * w * self.ds
+        return -self.mass * v[:-1] + dk, self.mass * v[1:] + dk
+
+    def grad(self, x):
+        v = self._speeds(x)
+        n = self.n
+        ddt = self._dt_partials(v)[0]
+        g = np.zeros(n + 1 + (n if self.objective == 'energy' else 0))
+        if self.objective == 'time':
+            g[:-1] += ddt
+            g[1:n + 1] += ddt
+        else:
+            r = self.regen_eff
+            dw0, dw1 = self._work_partials(v)
+            g[:n] += self.pwr_req * ddt + r * dw0
+            g[1:n + 1] += self.pwr_req * ddt + r * dw1
+            g[n + 1:] = (1.0 / self.prop_eff - r) * self.e_ref
+        return np.delete(g, [0, n]) / self.f_ref
+
+    def _pair_hessian(self, d00, d01, d11):
+        '''Full sparse matrix summing the 2x2 blocks of every segment.'''
+        n = self.n
+        i = np.arange(n)
+        rows = np.concatenate((i, i, i + 1, i + 1))
+        cols = np.concatenate((i, i + 1, i, i + 1))
+        size = n + 1 + (n if self.objective == 'energy' else 0)
+        return sparse.coo_matrix((np.concatenate((d00, d01, d01, d11)), (rows, cols)),
+                shape=(size, size))
+
+    def hess(self, x):
+        v = self._speeds(x)
+        h_dt = self._dt_partials(v)[1]
+        if self.objective == 'time':
+            H = self._pair_hessian(h_dt, h_dt, h_dt)
+        else:
+            r = self.regen_eff
+            hk = 0.5 * self.k_drag * self.ds
+            H = self._pair_hessian(self.pwr_req * h_dt + r * (hk - self.mass),
+                    self.pwr_req * h_dt + r * hk, self.pwr_req * h_dt + r * (hk + self.mass))
+        return self._free(H) / self.f_ref
+
+    # constraints: acceleration, jerk, end point jerk, work slack and trip time
+
+    def end_jerk(self, v):
+        '''Jerk at departure and arrival, from and to zero acceleration.'''
+        a, dt = self.segment_terms(v)[:2]
+        return np.array([a[0] / dt[0], -a[-1] / dt[-1]])
+
+    def constraints(self, x):
+        v = self._speeds(x)
+        a, dt, work = self.segment_terms(v)
+        c = [a, (a[1:] - a[:-1]) * v[1:-1] / self.ds, self.end_jerk(v)]
+        if self.objective == 'energy':
+            c.append(x[self.n - 1:] - work / self.e_ref)
+        if self.time_max is not None:
+            c.append([dt.sum()])
+        return np.concatenate(c)
+
+    def bounds(self):
+        lb = [np.full(self.n, -self.decel), np.full(self.n + 1, -self.jerk)]
+        ub = [np.full(self.n, self.accel), np.full(self.n + 1, self.jerk)]
+        if self.objective == 'energy':
+            lb.append(np.zeros(self.n))
+            ub.append(np.full(self.n, np.inf))
+        if self.time_max is not None:
+            lb.append([0.0])
+            ub.append([self.time_max])
+        return np.concatenate(lb), np.concatenate(ub)
+
+    def jacobian(self, x):
+        v = self._speeds(x)
+        n, ds = self.n, self.ds
+        i = np.arange(n)
+        size = n + 1 + (n if self.objective == 'energy' else 0)
+        blocks = [sparse.coo_matrix((np.concatenate((-v[:-1] / ds, v[1:] / ds)),
+                (np.concatenate((i, i)), np.concatenate((i, i + 1)))), shape=(n, size))]
+
+        # jerk at node k = 1..n-1: v[k] * (v[k+1]**2 - 2 v[k]**2 + v[k-1]**2) / (2 ds**2)
+        k = np.arange(1, n)
+        vm, vk, vp = v[k - 1], v[k], v[k + 1]
+        blocks.append(sparse.coo_matrix((np.concatenate((vk * vm / ds ** 2,
+                (vp ** 2 - 6.0 * vk ** 2 + vm ** 2) / (2.0 * ds ** 2), vk * vp / ds ** 2)),
+                (np.tile(k - 1, 3), np.concatenate((k - 1, k, k + 1)))), shape=(n - 1, size)))
+
+        # end jerk (v1**2 - v0**2) * (v0 + v1) / (4 ds**2) with v0 fixed, and the
+        # same in v[n-1] with v[n] fixed at arrival
+        v0, v1, vn, vm = v[0], v[1], v[n], v[n - 1]
+        blocks.append(sparse.coo_matrix(([(3.0 * v1 ** 2 + 2.0 * v0 * v1 - v0 ** 2) /
+                (4.0 * ds ** 2), (3.0 * vm ** 2 + 2.0 * vn * vm - vn ** 2) / (4.0 * ds ** 2)],
+                ([0, 1], [1, n - 1])), shape=(2, size)))
+
+        if self.objective == 'energy':
+            dw0, dw1 = self._work_partials(v)
+            blocks.append(sparse.coo_matrix((np.concatenate((-dw0 / self.e_ref,
+                    -dw1 / self.e_ref, np.ones(n))), (np.tile(i, 3),
+                    np.concatenate((i, i + 1, n + 1 + i)))), shape=(n, size)))
+        if self.time_max is not None:
+            ddt = self._dt_partials(v)[0]
+            row = np.zeros(size)
+            row[:n] += ddt
+            row[1:n + 1] += ddt
+            blocks.append(sparse.coo_matrix(row[None, :]))
+        return self._free(sparse.vstack(blocks))
+
+    def constraint_hessian(self, x, lam):
+        v = self._speeds(x)
+        n, ds = self.n, self.ds
+        la = lam[:n]
+        H = self._pair_hessian(-la / ds, np.zeros(n), la / ds).tocsr()
+
+        # jerk: second derivatives of v[k] * (v[k+1]**2 - 2 v[k]**2 + v[k-1]**2) / (2 ds**2)
+        lj = lam[n:2 * n - 1] / ds ** 2
+        k = np.arange(1, n)
+        vm, vk, vp = v[k - 1], v[k], v[k + 1]
+        rows = np.concatenate((k - 1, k + 1, k, k, k - 1, k, k + 1))
+        cols = np.concatenate((k - 1, k + 1, k, k - 1, k, k + 1, k))
+        vals = np.concatenate((lj * vk, lj * vk, -6.0 * lj * vk, lj * vm, lj * vm, lj * vp,
+                lj * vp))
+        H = H + sparse.coo_matrix((vals, (rows, cols)), shape=H.shape)
+
+        le = lam[2 * n - 1:2 * n + 1] / (4.0 * ds ** 2)
+        H = H + sparse.coo_matrix(([le[0] * (6.0 * v[1] + 2.0 * v[0]),
+                le[1] * (6.0 * v[n - 1] + 2.0 * v[n])], ([1, n - 1], [1, n - 1])), shape=H.shape)
+
+        m = 2 * n + 1
+        if self.objective == 'energy':
+            ls = -lam[m:m + n] / self.e_ref
+            hk = 0.5 * self.k_drag * ds
+            H = H + self._pair_hessian(ls * (hk - self.mass), ls * hk, ls * (hk + self.mass))
+            m += n
+        if self.time_max is not None:
+            h_dt = lam[m] * self._dt_partials(v)[1]
+            H = H + self._pair_hessian(h_dt, h_dt, h_dt)
+        return self._free(H)
+
+    def initial_guess(self):
+        '''Speed profile within the speed and acceleration limits, slowed to meet jerk limits.'''
+        v = speed_profile(self.s, self.cap, self.accel, self.decel, self.v_start, self.v_end)
+        v = np.maximum(0.9 * v, 1e-3 * self.cap.max())
+        x = v[1:-1]
+        if self.objective == 'energy':
+            a, dt, work = self.segment_terms(self._speeds(x))
+            x = np.concatenate((x, np.maximum(work / self.e_ref, 0.0) + 1e-3))
+        return x
+
+    def solve(self, maxiter=500, tol=1e-6, verbose=0):
+        '''
+        Runs scipy's trust-constr interior point method from
+        `initial_guess` and returns the trajectory (see `trajectory`) of
+        the result, with 'success', 'message' and 'nit'.
+        '''
+        lb, ub = self.bounds()
+        n_v = self.n - 1
+        lower = np.zeros(self.n_free)
+        upper = np.concatenate((self.cap[1:-1], np.full(self.n_free - n_v, np.inf)))
+        result = minimize(self.fun, self.initial_guess(), method='trust-constr', jac=self.grad,
+                hess=self.hess, bounds=Bounds(lower, upper),
+                constraints=[NonlinearConstraint(self.constraints, lb, ub, jac=self.jacobian,
+                hess=self.constraint_hessian)],
+                options={'maxiter': maxiter, 'gtol': tol, 'xtol': tol, 'verbose': verbose,
+                'initial_barrier_parameter': 1e-3, 'initial_barrier_tolerance': 1e-3})
+        trace = self.trajectory(result.x)
+        trace.update(success=result.status in (1, 2), message=result.message, nit=result.nit)
+        return trace
+
+    def trajectory(self, x):
+        '''
+        Node traces 's' (m), 't' (s), 'v' (m/s), 'energy' (J, cumulative)
+        and segment traces 'a' (m/s**2) and 'power' (W), node 'jerk'
+        (m/s**3), and 'time_mission' (s) and 'energy_total' (J), as from
+        mission.simulate_mission.
+        '''
+        v = self._speeds(x)
+        a, dt, work = self.segment_terms(v)
+        seg_energy = np.where(work > 0.0, work / self.prop_eff, work * self.regen_eff) + \
+                self.pwr_req * dt
+        energy = np.concatenate(([0.0], np.cumsum(seg_energy)))
+        t = np.concatenate(([0.0], np.cumsum(dt)))
+        return {
+            's': self.s,
+            't': t,
+            'v': v,
+            'a': a,
+            'jerk': np.concatenate(([a[0] / dt[0]], (a[1:] - a[:-1]) * v[1:-1] / self.ds,
+                    [-a[-1] / dt[-1]])),
+            'power': seg_energy / dt,
+            'energy': energy,
+            'time_mission': t[-1],
+            'energy_total': energy[-1],
+        }
+
+
+def optimize_trajectory(route_len=563270.0, objective='energy', maxiter=500, tol=1e-6,
+        **kwargs):
+    '''Solves a `TrajectoryProblem`; keyword arguments are passed to it.'''
+    return TrajectoryProblem(route_len, objective, **kwargs).solve(maxiter, tol)
+
+
+class OptimalMission(Mission):
+    '''
+    Mission flown along the speed profile from `optimize_trajectory`:
+    the fastest one within the jerk limit, or the one using the least
+    energy that arrives within time_max. The profile comes from the
+    accel/decel limits alone: grades and thrust_max are not modelled.
+    '''
+    def __init__(self, tube_len=563270.0, route=None, objective='time', n_nodes=1001):
+        super(OptimalMission, self).__init__(tube_len, route)
+        if objective not in ('time', 'energy'):
+            raise ValueError("objective must be 'time' or 'energy', not %r" % objective)
+        self.objective = objective
+        self.n_nodes = n_nodes
+        self.add_param('jerk', 2.0, desc='maximum jerk', units='m/s**3')
+        self.add_param('time_max', 2100.0, desc='latest arrival for minimum energy', units='s')
+
+    def _simulate(self, params, route_len, max_velocity, accel):
+        speed_cap = None if self.route is None else self.route.speed_envelope(max_velocity)
+        trace = optimize_trajectory(route_len, self.objective, n_nodes=self.n_nodes,
+                max_velocity=max_velocity, accel=accel, decel=accel, jerk=params['jerk'],
+                speed_cap=speed_cap,
+                time_max=params['time_max'] if self.objective == 'energy' else None,
+                mass=params['mass'], coef_drag=params['coef_drag'],
+                area_frontal=params['area_frontal'], rho=params['rho'],
+                net_force=params['net_force'], pwr_req=params['pwr_aux'] * 1000.0)
+        if not trace['success']:
+            warnings.warn('OptimalMission: trajectory not converged: %s' % trace['message'])
+        return trace
+
+
+if __name__ == '__main__':
+    from time import time
+
+    for objective, time_max in (('time', None), ('energy', 2100.0)):
+        start = time()
+        trace = optimize_trajectory(objective=objective, n_nodes=2001, time_max=time_max,
+                pwr_req=420e3)
+        print '%-6s %s after %d iterations in %.1f s' % (objective, trace['message'],
+                trace['nit'], time() - start)
+        print '       time_mission %.1f s, energy %.1f kW*h, peak jerk %.2f m/s**3' % (
+                trace['time_mission'], trace['energy_total'] / 3.6e6,
+                np.abs(trace['jerk']).max())
@@ -1,6 +1,5 @@
 from math import pi
 import numpy as np
-from scipy.optimize import newton
 
 import pylab
 
@@ -14,8 +13,8 @@ from pycycle.set_total import SetTotal
 from pycycle.thermo_static import SetStaticMN, SetStaticPs
 from pycycle.constants import AIR_MIX
 
-from geometry.tube_structure import TubeStructural
-from geometry.inlet import InletGeom
+from isentropic import area_ratio, mach_from_area_ratio, log_area_ratio_partials, \
+        mach_from_area_ratio_partials
 
 class AreaRatio(Component):
     def __init__(self):
@@ -28,6 +27,7 @@ class AreaRatio(Component):
 
         self.add_output('bypass_area', 0.0, desc='area between tube wall and pod', units='m**2')
         self.add_output('AR', 0.0, desc='ratio between tube area and bypass area')
+        self.add_output('Mach_limit', 0.0, desc='travel Mach at which the bypass chokes')
 
         self.add_state('AR_resid', 0.0, desc='AR - target AR')
 
@@ -35,13 +35,45 @@ class AreaRatio(Component):
         self.apply_nonlinear(params, unknowns, resids)
 
     def apply_nonlinear(self, params, unknowns, resids):
-        tube_area = pi * (params['tube_r'] ** 2)
-        unknowns['bypass_area'] = tube_area - params['inlet_area']
-        AR_target = tube_area / unknowns['bypass_area']
-        g = params['gamma']
-        g_exp = (g + 1.0) / (2.0 * (g - 1.0))
-        unknowns['AR'] = ((g + 1.0) / 2.0) ** (-1.0 * g_exp) * ((1.0 + (g - 1.0) / 2.0 * params['Mach'] ** 2) ** g_exp) / params['Mach']
-        resids['AR_resid'] = unknowns['AR'] - AR_target
+        unknowns['bypass_area'], unknowns['AR'], resids['AR_resid'], unknowns['Mach_limit'] = \
+                AreaRatio.calc(params['tube_r'], params['inlet_area'], params['Mach'],
+                params['gamma'])
+
+    def linearize(self, params, unknowns, resids):
+        tube_r, inlet_area = params['tube_r'], params['inlet_area']
+        tube_area = pi * tube_r ** 2
+        bypass_area = tube_area - inlet_area
+        AR_target = tube_area / bypass_area
+        dAR_target_dr = -2.0 * pi * tube_r * inlet_area / bypass_area ** 2
+        dAR_target_dinlet = tube_area / bypass_area ** 2
+        dlnAR_dMach, dlnAR_dgamma = log_area_ratio_partials(params['Mach'], params['gamma'])
+        dML_dlnAR, dML_dgamma = mach_from_area_ratio_partials(unknowns['Mach_limit'],
+                params['gamma'])
+
+        J = {}
+        J['bypass_area', 'tube_r'] = 2.0 * pi * tube_r
+        J['bypass_area', 'inlet_area'] = -1.0
+        J['AR', 'Mach'] = J['AR_resid', 'Mach'] = unknowns['AR'] * dlnAR_dMach
+        J['AR', 'gamma'] = J['AR_resid', 'gamma'] = unknowns['AR'] * dlnAR_dgamma
+        J['AR_resid', 'tube_r'] = -dAR_target_dr
+        J['AR_resid', 'inlet_area'] = -dAR_target_dinlet
+        J['Mach_limit', 'tube_r'] = dML_dlnAR * dAR_target_dr / AR_target
+        J['Mach_limit', 'inlet_area'] = dML_dlnAR * dAR_target_dinlet / AR_target
+        J['Mach_limit', 'gamma'] = dML_dgamma
+        return J
+
+    @staticmethod
+    def calc(tube_r, inlet_area, Mach, gamma=1.41):
+        '''
+        Returns (bypass_area, AR, AR_resid, Mach_limit); accepts scalars or
+        NumPy arrays. Mach_limit is read from the isentropic table, so the
+        choking Mach needs no solve for AR_resid.
+        '''
+        tube_area = pi * (tube_r ** 2)
+        bypass_area = tube_area - inlet_area
+        AR_target = tube_area / bypass_area
+        AR = area_ratio(Mach, gamma)
+        return bypass_area, AR, AR - AR_target, mach_from_area_ratio(AR_target, gamma)
 
 class TubeThermo(Component):
     def __init__(self):
@@ -55,9 +87,29 @@ class TubeThermo(Component):
         self.add_output('Tt', 0.0, desc='total temperature in tube', units='degK')
 
     def solve_nonlinear(self, params, unknowns, resids):
-        multiplier = (1.0 + (params['gamma'] - 1.0) / 2.0 * params['Mach'] ** 2)
-        unknowns['Pt'] = params['Ps'] * multiplier ** (params['gamma'] / (params['gamma'] - 1.0))
-        unknowns['Tt'] = params['Ts'] * multiplier
+        unknowns['Pt'], unknowns['Tt'] = TubeThermo.calc(params['Ps'], params['Ts'],
+                params['Mach'], params['gamma'])
+
+    def linearize(self, params, unknowns, resids):
+        Mach, gamma = params['Mach'], params['gamma']
+        multiplier = (1.0 + (gamma - 1.0) / 2.0 * Mach ** 2)
+        exponent = gamma / (gamma - 1.0)
+
+        J = {}
+        J['Pt', 'Ps'] = multiplier ** exponent
+        J['Pt', 'Mach'] = unknowns['Pt'] * exponent * (gamma - 1.0) * Mach / multiplier
+        J['Pt', 'gamma'] = unknowns['Pt'] * (exponent * Mach ** 2 / (2.0 * multiplier) -
+                np.log(multiplier) / (gamma - 1.0) ** 2)
+        J['Tt', 'Ts'] = multiplier
+        J['Tt', 'Mach'] = params['Ts'] * (gamma - 1.0) * Mach
+        J['Tt', 'gamma'] = params['Ts'] * Mach ** 2 / 2.0
+        return J
+
+    @staticmethod
+    def calc(Ps, Ts, Mach, gamma=1.41):
+        '''Returns (Pt, Tt); accepts scalars or NumPy arrays.'''
+        multiplier = (1.0 + (gamma - 1.0) / 2.0 * Mach ** 2)
+        return Ps * multiplier ** (gamma / (gamma - 1.0)), Ts * multiplier
 
 class TubeAero(Component):
     def __init__(self):
@@ -66,8 +118,8 @@ class TubeAero(Component):
         self.add_param('velocity_bypass', 0.0, desc='bypass speed where choking occurs', units='m/s')
         self.add_param('bypass_area', 0.0, desc='bypass area', units='m**2')
         self.add_param('tube_r', 0.0, desc='inner radius of tube', units='m')
-        self.add_param('rho_tube', 0.0, desc='density in tube', units='g/cm**3')
-        self.add_param('rho_bypass', 0.0, desc='density in bypass', units='g/cm**3')
+        self.add_param('rho_tube', 0.0, desc='density in tube', units='kg/m**3')
+        self.add_param('rho_bypass', 0.0, desc='density in bypass', units='kg/m**3')
 
         self.add_output('tube_area', 0.0, desc='cross sectional area of tube', units='m**2')
         self.add_output('W_tube', 0.0, desc='tube demand flow', units='kg/s')
@@ -75,32 +127,151 @@ class TubeAero(Component):
         self.add_output('W_excess', 0.0, desc='Excess mass flow above the Kantrowitz limit', units='kg/s')
 
     def solve_nonlinear(self, params, unknowns, resids):
-        unknowns['tube_area'] = pi * params['tube_r'] ** 2
-        unknowns['W_tube'] = params['rho_tube'] * params['velocity_tube'] * pi * params['tube_r'] ** 2
-        unknowns['W_kant'] = params['rho_bypass'] * params['velocity_bypass'] * params['bypass_area']
-        unknowns['W_excess'] = unknowns['W_tube'] - unknowns['W_kant']
+        unknowns['tube_area'], unknowns['W_tube'], unknowns['W_kant'], unknowns['W_excess'] = \
+                TubeAero.calc(params['velocity_tube'], params['velocity_bypass'],
+                params['bypass_area'], params['tube_r'], params['rho_tube'], params['rho_bypass'])
 
-class TubeLimitFlow(Group):
-    '''Finds the limit velocity for a body traveling through a tube'''
+    def linearize(self, params, unknowns, resids):
+        tube_area = pi * params['tube_r'] ** 2
+        J = {}
+        J['tube_area', 'tube_r'] = 2.0 * pi * params['tube_r']
+        J['W_tube', 'velocity_tube'] = params['rho_tube'] * tube_area
+        J['W_tube', 'rho_tube'] = params['velocity_tube'] * tube_area
+        J['W_tube', 'tube_r'] = params['rho_tube'] * params['velocity_tube'] * J['tube_area', 'tube_r']
+        J['W_kant', 'velocity_bypass'] = params['rho_bypass'] * params['bypass_area']
+        J['W_kant', 'rho_bypass'] = params['velocity_bypass'] * params['bypass_area']
+        J['W_kant', 'bypass_area'] = params['rho_bypass'] * params['velocity_bypass']
+        for name in ('velocity_tube', 'rho_tube', 'tube_r'):
+            J['W_excess', name] = J['W_tube', name]
+        for name in ('velocity_bypass', 'rho_bypass', 'bypass_area'):
+            J['W_excess', name] = -J['W_kant', name]
+        return J
+
+    @staticmethod
+    def calc(velocity_tube, velocity_bypass, bypass_area, tube_r, rho_tube, rho_bypass):
+        '''Returns (tube_area, W_tube, W_kant, W_excess); accepts scalars or NumPy arrays.'''
+        tube_area = pi * tube_r ** 2
+        W_tube = rho_tube * velocity_tube * tube_area
+        W_kant = rho_bypass * velocity_bypass * bypass_area
+        return tube_area, W_tube, W_kant, W_tube - W_kant
+
+class IsentropicTubeFlow(Component):
+    '''Calorically perfect gas replacement for the pyCycle total and static blocks of TubeLimitFlow'''
     def __init__(self):
+        super(IsentropicTubeFlow, self).__init__()
+        self.add_param('Pt', 0.0, desc='total pressure in tube', units='Pa')
+        self.add_param('Tt', 0.0, desc='total temperature in tube', units='degK')
+        self.add_param('Mach', 1.0, desc='travel Mach')
+        self.add_param('Mach_bypass', 0.95, desc='Mach of air passing around pod')
+        self.add_param('gamma', 1.41, desc='ratio of specific heats')
+        self.add_param('R', 286.0, desc='specific gas constant for flow', units='m**2/s**2/degK')
+
+        self.add_output('V_tube', 0.0, desc='flow velocity relative to the pod', units='m/s')
+        self.add_output('V_bypass', 0.0, desc='flow velocity in bypass', units='m/s')
+        self.add_output('rhot', 0.0, desc='total density in tube and bypass', units='kg/m**3')
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        unknowns['V_tube'], unknowns['V_bypass'], unknowns['rhot'] = IsentropicTubeFlow.calc(
+                params['Pt'], params['Tt'], params['Mach'], params['Mach_bypass'], params['gamma'],
+                params['R'])
+
+    def linearize(self, params, unknowns, resids):
+        Tt, gamma, R = params['Tt'], params['gamma'], params['R']
+        J = {}
+        for out, Mach_name in (('V_tube', 'Mach'), ('V_bypass', 'Mach_bypass')):
+            Mach = params[Mach_name]
+            multiplier = 1.0 + (gamma - 1.0) / 2.0 * Mach ** 2
+            J[out, Mach_name] = np.sqrt(gamma * R * Tt / multiplier) / multiplier
+            J[out, 'Tt'] = unknowns[out] / (2.0 * Tt)
+            J[out, 'R'] = unknowns[out] / (2.0 * R)
+            J[out, 'gamma'] = unknowns[out] * (1.0 / (2.0 * gamma) - Mach ** 2 / (4.0 * multiplier))
+        J['rhot', 'Pt'] = 1.0 / (R * Tt)
+        J['rhot', 'Tt'] = -unknowns['rhot'] / Tt
+        J['rhot', 'R'] = -unknowns['rhot'] / R
+        return J
+
+    @staticmethod
+    def calc(Pt, Tt, Mach, Mach_bypass, gamma=1.41, R=286.0):
+        '''Returns (V_tube, V_bypass, rhot); accepts scalars or NumPy arrays.'''
+        Ts_tube = Tt / (1.0 + (gamma - 1.0) / 2.0 * Mach ** 2)
+        Ts_bypass = Tt / (1.0 + (gamma - 1.0) / 2.0 * Mach_bypass ** 2)
+        V_tube = Mach * np.sqrt(gamma * R * Ts_tube)
+        V_bypass = Mach_bypass * np.sqrt(gamma * R * Ts_bypass)
+        return V_tube, V_bypass, Pt / (R * Tt)
+
+def limit_flow(Mach, tube_r, inlet_area, Ps=99.0, Ts=292.1, Mach_bypass=0.95, gamma=1.41,
+        R=286.0):
+    '''
+    Evaluates TubeLimitFlow(engine='analytic') over arrays. All arguments are
+    broadcast against each other, so the Kantrowitz boundary can be mapped
+    over large grids of (tube_r, inlet_area, Mach) at once.
+
+    Returns
+    -------
+    dict of numpy.array
+        'tube_area', 'bypass_area' and 'AR' in the units of TubeLimitFlow,
+        'W_tube', 'W_kant' and 'W_excess' in kg/s, and 'Mach_limit', the
+        travel Mach at which the bypass chokes.
+    '''
+    Mach, tube_r, inlet_area = np.broadcast_arrays(*[np.asarray(a, dtype=float)
+            for a in (Mach, tube_r, inlet_area)])
+    bypass_area, AR, AR_resid, Mach_limit = AreaRatio.calc(tube_r, inlet_area, Mach, gamma)
+    Pt, Tt = TubeThermo.calc(Ps, Ts, Mach, gamma)
+    V_tube, V_bypass, rhot = IsentropicTubeFlow.calc(Pt, Tt, Mach, Mach_bypass, gamma, R)
+    tube_area, W_tube, W_kant, W_excess = TubeAero.calc(V_tube, V_bypass, bypass_area, tube_r,
+            rhot, rhot)
+    return {'tube_area': tube_area, 'bypass_area': bypass_area, 'AR': AR, 'W_tube': W_tube,
+            'W_kant': W_kant, 'W_excess': W_excess, 'Mach_limit': Mach_limit}
+
+class TubeLimitFlow(Group):
+    '''
+    Finds the limit velocity for a body traveling through a tube.
+
+    engine='pycycle' evaluates the tube and bypass flow with pyCycle thermo
+    blocks; engine='analytic' uses calorically perfect gas relations instead,
+    which agree with the pyCycle results to within 1% for air near room
+    temperature and are much cheaper to evaluate (see also `limit_flow`).
+    '''
+    def __init__(self, engine='pycycle'):
         super(TubeLimitFlow, self).__init__()
         self.add('Mach_param', ParamComp('Mach', 1.0), promotes=['Mach'])
+        self.add('tube_r_param', ParamComp('tube_r', 0.9, units='m'), promotes=['tube_r'])
+        self.add('inlet_area_param', ParamComp('inlet_area', 0.785, units='m**2'),
+                promotes=['inlet_area'])
         self.add('Mach_con', ConstraintComp('Mach > 0.0'))
-        self.add('tube_struct', TubeStructural())
-        self.add('inlet', InletGeom())
-        self.add('AR_comp', AreaRatio(), promotes=['Mach_bypass', 'bypass_area'])
+        self.add('AR_comp', AreaRatio(), promotes=['Mach_bypass', 'bypass_area', 'inlet_area',
+                'Mach_limit'])
         self.add('tube_thermo', TubeThermo())
-        self.add('tube_total', SetTotal(init_reacts=AIR_MIX, mode='T'))
-        self.add('tube_static', SetStaticMN(init_reacts=AIR_MIX))
-        self.add('bypass_total', SetTotal(init_reacts=AIR_MIX, mode='T'))
-        self.add('bypass_static', SetStaticMN(init_reacts=AIR_MIX))
         self.add('tube_aero', TubeAero(), promotes=['tube_area', 'W_tube', 'W_kant', 'W_excess'])
 
         self.connect('Mach', 'AR_comp.Mach')
         self.connect('Mach', 'Mach_con.Mach')
-        self.connect('tube_struct.r_inner', 'AR_comp.tube_r')
-        self.connect('inlet.area_in', 'AR_comp.inlet_area')
+        self.connect('tube_r', 'AR_comp.tube_r')
         self.connect('Mach', 'tube_thermo.Mach')
+        self.connect('bypass_area', 'tube_aero.bypass_area')
+        self.connect('tube_r', 'tube_aero.tube_r')
+
+        if engine == 'pycycle':
+            self._add_pycycle_flow()
+        elif engine == 'analytic':
+            self.add('flow', IsentropicTubeFlow())
+            self.connect('tube_thermo.Pt', 'flow.Pt')
+            self.connect('tube_thermo.Tt', 'flow.Tt')
+            self.connect('Mach', 'flow.Mach')
+            self.connect('Mach_bypass', 'flow.Mach_bypass')
+            self.connect('flow.V_tube', 'tube_aero.velocity_tube')
+            self.connect('flow.V_bypass', 'tube_aero.velocity_bypass')
+            self.connect('flow.rhot', 'tube_aero.rho_tube')
+            self.connect('flow.rhot', 'tube_aero.rho_bypass')
+        else:
+            raise ValueError("engine must be 'pycycle' or 'analytic', not %r" % engine)
+
+    def _add_pycycle_flow(self):
+        self.add('tube_total', SetTotal(init_reacts=AIR_MIX, mode='T'))
+        self.add('tube_static', SetStaticMN(init_reacts=AIR_MIX))
+        self.add('bypass_total', SetTotal(init_reacts=AIR_MIX, mode='T'))
+        self.add('bypass_static', SetStaticMN(init_reacts=AIR_MIX))
+
         self.connect('tube_thermo.Pt', 'tube_total.P')
         self.connect('tube_thermo.Tt', 'tube_total.T')
         self.connect('tube_thermo.Pt', 'bypass_total.P')
@@ -119,23 +290,33 @@ class TubeLimitFlow(Group):
         self.connect('bypass_static.V', 'tube_aero.velocity_bypass')
         self.connect('tube_total.rho', 'tube_aero.rho_tube')
         self.connect('bypass_total.rho', 'tube_aero.rho_bypass')
-        self.connect('bypass_area', 'tube_aero.bypass_area')
-        self.connect('tube_struct.r_inner', 'tube_aero.tube_r')
 
-def plot_data(p, c='b'):
-    '''utility function to make the Kantrowitz Limit Plot''' 
+def plot_data(p, c='b', continuation=None):
+    '''
+    utility function to make the Kantrowitz Limit Plot; pass a
+    continuation.Continuation on 'comp.Mach' to warm-start each Mach
+    ''' 
     Machs = []
     W_tube = []
     W_kant = []
-    for Mach in np.arange(.2, 1.1, .1):
-        p['comp.Mach'] = Mach
-        p.run()
-        Machs.append(Mach)
-        W_kant.append(p['comp.W_kant'])
-        W_tube.append(p['comp.W_tube'])
-    print 'Area in:', p['comp.inlet.area_in']
-    fig = pylab.plot(Machs, W_tube, '-', label="%3.1f Req." % (p['comp.tube_area'] / p['comp.inlet.area_in']), lw=3, c=c)
-    pylab.plot(Machs, W_kant, '--', label="%3.1f Limit" % (p['comp.tube_area'] / p['comp.inlet.area_in']), lw=3, c=c)
+    try:
+        for Mach in np.arange(.2, 1.1, .1):
+            point = {'comp.Mach': Mach}
+            if continuation is not None:
+                continuation.predict(point)
+            p['comp.Mach'] = Mach
+            p.run()
+            if continuation is not None:
+                continuation.record(point)
+            Machs.append(Mach)
+            W_kant.append(p['comp.W_kant'])
+            W_tube.append(p['comp.W_tube'])
+    finally:
+        if continuation is not None:
+            continuation.remove()
+    print 'Area in:', p['comp.inlet_area']
+    fig = pylab.plot(Machs, W_tube, '-', label="%3.1f Req." % (p['comp.tube_area'] / p['comp.inlet_area']), lw=3, c=c)
+    pylab.plot(Machs, W_kant, '--', label="%3.1f Limit" % (p['comp.tube_area'] / p['comp.inlet_area']), lw=3, c=c)
     pylab.tick_params(axis='both', which='major', labelsize=15)
     pylab.xlabel('Pod Mach Number', fontsize=18)
     pylab.ylabel('Flow Rate (kg/sec)', fontsize=18)
@@ -149,13 +330,15 @@ if __name__ == '__main__':
     comp = p.root.add('comp', TubeLimitFlow())
     p.setup()
 
-    p['comp.tube_struct.r_inner'] = 100.0
+    p['comp.inlet_area'] = 1.4
+
+    p['comp.tube_r'] = 1.0
     plot_data(p, c='b')
 
-    p['comp.tube_struct.r_inner'] = 150.0
+    p['comp.tube_r'] = 1.5
     plot_data(p, c='g')
 
-    p['comp.tube_struct.r_inner'] = 200.0
+    p['comp.tube_r'] = 2.0
     plot_data(p, c='r')
 
     pylab.legend(loc='best')
@@ -11,14 +11,166 @@ Compatible with OpenMDAO v1.0.5
 
 from math import log, pi, sqrt, e
 
+import numpy as np
+
 from openmdao.units.units import convert_units as cu
 
+from scipy.optimize import brentq
+
 from pycycle.cycle_component import CycleComponent
 
+def air_properties(temp_ambient):
+    '''
+    Returns (GrDelTL3, Pr, k) of the outside air, the Grashof number per
+    degree and cubic length, the Prandtl number and the thermal conductivity;
+    accepts scalars or NumPy arrays.
+    '''
+    # SI units (https://mdao.grc.nasa.gov/publications/Berton-Thesis.pdf pg51)
+    cool = temp_ambient < 400.0
+    GrDelTL3 = np.where(cool, 4.178e19 * temp_ambient ** -4.639, 4.985e18 * temp_ambient ** -4.284)
+    Pr = np.where(cool, 1.23 * temp_ambient ** -0.09685, 0.59 * temp_ambient ** 0.0239)
+    k = np.where(cool, 0.0001423 * temp_ambient ** 0.9138, 0.0002494 * temp_ambient ** 0.8152)
+    return GrDelTL3, Pr, k
+
+def natural_convection(temp_boundary, temp_ambient, r_tube_outer, check_range=True):
+    '''
+    Returns (h, Gr, Ra, Nu, GrDelTL3, Pr, k) for natural convection from the
+    outside of the tube; accepts scalars or NumPy arrays. The Nusselt
+    correlation uses |Ra|, so a wall colder than the air is handled too.
+    '''
+    GrDelTL3, Pr, k = air_properties(temp_ambient)
+    # Grashof # (Gr) < 10^8: laminar; Gr > 10^9: turbulent
+    Gr = GrDelTL3 * (temp_boundary - temp_ambient) * (2.0 * r_tube_outer) ** 3
+    # Rayleigh #: buoyancy driven flow (natural convection)
+    Ra = Pr * Gr
+    if check_range and np.any(np.abs(Ra) > 1e12): # valid in specific flow regime
+        raise Exception('Rayleigh number outside of acceptable range.')
+    # Nusselt # (Nu) = convective heat transfer / conductive heat transfer
+    Nu = (0.6 + 0.387 * np.abs(Ra) ** (1.0 / 6.0) / (1.0 + (0.559 / Pr) ** (9.0 / 16.0)) ** (8.0 / 27.0)) ** 2 # 3rd Ed. of Introduction to Heat Transfer by Incropera and DeWitt, equations (9.33) and (9.34) on page 465
+    h = k * Nu / (2.0 * r_tube_outer) # h = k * Nu / characteristic length
+    return h, Gr, Ra, Nu, GrDelTL3, Pr, k
+
+def solar_flux(insolation, reflectance=0.5, nn_incidence_factor=0.7):
+    '''Solar heat rate absorbed per viewing area in W/m**2.'''
+    return (1.0 - reflectance) * nn_incidence_factor * insolation
+
+def radiated_flux(temp_boundary, temp_ambient, emissivity=0.5, sb_const=5.670373e-8):
+    '''Heat radiated to the outside per area in W/m**2.'''
+    return sb_const * emissivity * (temp_boundary ** 4 - temp_ambient ** 4) # P / A = SB * emmisitivity * (T ** 4 - To ** 4)
+
+def heat_balance(temp_boundary, temp_ambient, r_tube_outer, tube_len, n_pods, pod_W_cp,
+        pod_W_cp_Tt, insolation=1000.0, reflectance=0.5, nn_incidence_factor=0.7, emissivity=0.5,
+        sb_const=5.670373e-8, check_range=True):
+    '''
+    Returns (Qout_tot - Qin_tot, its derivative with respect to
+    temp_boundary) as computed by TubeWallTemp; accepts scalars or NumPy
+    arrays. The pods heat the tube by pod_W_cp_Tt - pod_W_cp * temp_boundary
+    each, where pod_W_cp is the sum of W * Cp (W/degK) and pod_W_cp_Tt the
+    sum of W * Cp * Tt (W) over the nozzle and bearing flows of one pod.
+    '''
+    D = 2.0 * r_tube_outer
+    h, Gr, Ra, Nu, GrDelTL3, Pr, k = natural_convection(temp_boundary, temp_ambient,
+            r_tube_outer, check_range)
+    dT = temp_boundary - temp_ambient
+    radiating_area = pi * tube_len * D
+    # d(h * dT)/dT = h + dT * k / D * dNu/dT, which reduces to the second term
+    # below because |Ra| is proportional to |dT| (Churchill-Chu correlation)
+    B = 0.387 / (1.0 + (0.559 / Pr) ** (9.0 / 16.0)) ** (8.0 / 27.0)
+    Ra_6 = np.abs(Ra) ** (1.0 / 6.0)
+    dconv_dT = h + k / D * (0.6 + B * Ra_6) * B * Ra_6 / 3.0
+
+    Qout = radiating_area * (radiated_flux(temp_boundary, temp_ambient, emissivity, sb_const) +
+            h * dT)
+    Qin = tube_len * D * solar_flux(insolation, reflectance, nn_incidence_factor) + \
+            n_pods * (pod_W_cp_Tt - pod_W_cp * temp_boundary)
+    dQ_dT = radiating_area * (4.0 * sb_const * emissivity * temp_boundary ** 3 + dconv_dT) + \
+            n_pods * pod_W_cp
+    return Qout - Qin, dQ_dT
+
+def equilibrium_temp(temp_ambient, insolation, n_pods, pod_W_cp, pod_W_cp_Tt,
+        r_tube_outer=3.006, tube_len=482803.0, reflectance=0.5, nn_incidence_factor=0.7,
+        emissivity=0.5, sb_const=5.670373e-8, method='newton', tol=1e-9, max_iter=100):
+    '''
+    Tube wall temperature at which `heat_balance` is zero.
+
+    The arguments are broadcast against each other, so arrays of
+    temp_ambient, insolation, n_pods, etc. are solved at once. The root is
+    first bracketed by stepping away from temp_ambient; method='newton' then
+    takes Newton steps with the analytic dQ/dT, falling back to bisection
+    whenever a step would leave the bracket, and method='brent' calls
+    scipy.optimize.brentq on every element instead.
+
+    Returns
+    -------
+    numpy.array or float
+        Equilibrium temperature in degK, shaped like the broadcast inputs.
+    '''
+    args = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in (temp_ambient,
+            insolation, n_pods, pod_W_cp, pod_W_cp_Tt, r_tube_outer, tube_len, reflectance,
+            nn_incidence_factor, emissivity, sb_const)])
+    shape = args[0].shape
+    T_amb, insolation, n_pods, W_cp, W_cp_Tt, r, L, refl, nn, eps, sb = [a.ravel() for a in args]
+
+    def balance(T, i=slice(None)):
+        return heat_balance(T, T_amb[i], r[i], L[i], n_pods[i], W_cp[i], W_cp_Tt[i],
+                insolation[i], refl[i], nn[i], eps[i], sb[i], check_range=False)
+
+    # Qout - Qin rises monotonically with the wall temperature
+    direction = np.where(balance(T_amb)[0] < 0.0, 1.0, -1.0)
+    lo = T_amb.copy()
+    hi = T_amb.copy()
+    step = np.full(T_amb.shape, 10.0)
+    open_ = np.ones(T_amb.shape, dtype=bool)
+    for i in range(60):
+        far = np.maximum(T_amb + direction * step, 1.0)
+        crossed = (balance(far)[0] < 0.0) != (direction > 0.0)
+        lo = np.where(open_ & (direction > 0.0), np.where(crossed, lo, far), lo)
+        lo = np.where(open_ & (direction < 0.0) & crossed, far, lo)
+        hi = np.where(open_ & (direction > 0.0) & crossed, far, hi)
+        hi = np.where(open_ & (direction < 0.0) & ~crossed, far, hi)
+        open_ &= ~crossed
+        if not open_.any():
+            break
+        step *= 2.0
+    if open_.any():
+        raise RuntimeError('could not bracket the tube wall equilibrium temperature')
+
+    if method == 'brent':
+        T = np.array([brentq(lambda t: balance(t, i)[0], lo[i], hi[i], xtol=tol)
+                for i in range(T_amb.size)])
+    elif method == 'newton':
+        T = 0.5 * (lo + hi)
+        for i in range(max_iter):
+            Q, dQ_dT = balance(T)
+            lo = np.where(Q < 0.0, T, lo)
+            hi = np.where(Q < 0.0, hi, T)
+            T_new = T - Q / dQ_dT
+            outside = ~((T_new > lo) & (T_new < hi))
+            T_new = np.where(outside, 0.5 * (lo + hi), T_new)
+            converged = np.all(np.abs(T_new - T) < tol)
+            T = T_new
+            if converged:
+                break
+    else:
+        raise ValueError("method must be 'newton' or 'brent', not %r" % method)
+
+    T = T.reshape(shape)
+    return T if T.ndim else float(T)
+
 class TubeWallTemp(CycleComponent):
-    '''Calculates Q released/absorbed by the hyperloop tube'''
-    def __init__(self):
+    '''
+    Calculates Q released/absorbed by the hyperloop tube
+
+    mode='balance' evaluates the heat balance at temp_boundary; with
+    mode='equilibrium' temp_boundary is ignored and every output is
+    evaluated at the temperature that zeroes Q_resid_signed, which is also
+    reported as temp_equilibrium (see `equilibrium_temp`).
+    '''
+    def __init__(self, mode='balance'):
         super(TubeWallTemp, self).__init__()
+        if mode not in ('balance', 'equilibrium'):
+            raise ValueError("mode must be 'balance' or 'equilibrium', not %r" % mode)
+        self.mode = mode
         self._add_flowstation('flow_nozzle')
         self._add_flowstation('flow_bearings')
 
@@ -55,72 +207,69 @@ class TubeWallTemp(CycleComponent):
         self.add_output('Qout_tot', 286900419.0, desc='total heat released via radiation', units='W')
         self.add_output('Qin_tot', 286900419.0, desc='total heat absorbed/added via pods and solar absorption', units='W')
         self.add_output('Q_resid', 0.0, desc='residual of Qin_tot and Qout_tot', units='W')
+        self.add_output('Q_resid_signed', 0.0, desc='Qout_tot - Qin_tot', units='W')
+        self.add_output('dQ_dT', 0.0, desc='derivative of Q_resid_signed with respect to temp_boundary', units='W/degK')
+        self.add_output('pod_W_cp', 0.0, desc='sum of W * Cp over the nozzle and bearing flows of one pod', units='W/degK')
+        self.add_output('pod_W_cp_Tt', 0.0, desc='sum of W * Cp * Tt over the nozzle and bearing flows of one pod', units='W')
+        self.add_output('temp_equilibrium', 0.0, desc='wall temperature balancing Qin_tot and Qout_tot (equilibrium mode only)', units='degK')
 
     def solve_nonlinear(self, params, unknowns, resids):
         self._clear_unknowns('flow_nozzle', unknowns)
         self._clear_unknowns('flow_bearings', unknowns)
         self._solve_flow_vars('flow_nozzle', params, unknowns)
         self._solve_flow_vars('flow_bearings', params, unknowns)
-        # Q = mdot * cp * deltaT
-        Qbearing = cu(unknowns['flow_bearings:out:W'],'lbm/s', 'kg/s') * cu(unknowns['flow_bearings:out:Cp'], 'Btu/lbm/degR', 'J/kg/K') * (cu(unknowns['flow_bearings:out:Tt'], 'degR', 'degK') - params['temp_boundary'])
-        Qnozzle = cu(unknowns['flow_nozzle:out:W'], 'lbm/s', 'kg/s') * cu(unknowns['flow_nozzle:out:Cp'], 'Btu/lbm/degR', 'J/kg/K') * (cu(unknowns['flow_nozzle:out:Tt'], 'degR', 'degK') - params['temp_boundary'])
-        unknowns['heat_rate_per_pod'] = Qnozzle + Qbearing
+        # Q = mdot * cp * deltaT, summed over the nozzle and bearing flows
+        W_cp = W_cp_Tt = 0.0
+        for fs in ('flow_bearings', 'flow_nozzle'):
+            fs_W_cp = cu(unknowns[fs + ':out:W'], 'lbm/s', 'kg/s') * cu(unknowns[fs + ':out:Cp'], 'Btu/lbm/degR', 'J/kg/K')
+            W_cp += fs_W_cp
+            W_cp_Tt += fs_W_cp * cu(unknowns[fs + ':out:Tt'], 'degR', 'degK')
+        unknowns['pod_W_cp'] = W_cp
+        unknowns['pod_W_cp_Tt'] = W_cp_Tt
+
+        balance_args = (params['temp_ambient'], params['r_tube_outer'], params['tube_len'],
+                params['n_pods'], W_cp, W_cp_Tt, params['insolation'], params['reflectance'],
+                params['nn_incidence_factor'], params['emissivity'], params['sb_const'])
+        if self.mode == 'equilibrium':
+            temp_boundary = unknowns['temp_equilibrium'] = equilibrium_temp(
+                    params['temp_ambient'], params['insolation'], params['n_pods'], W_cp,
+                    W_cp_Tt, params['r_tube_outer'], params['tube_len'], params['reflectance'],
+                    params['nn_incidence_factor'], params['emissivity'], params['sb_const'])
+        else:
+            temp_boundary = params['temp_boundary']
+
+        unknowns['heat_rate_per_pod'] = W_cp_Tt - W_cp * temp_boundary
         unknowns['heat_rate_tot'] = unknowns['heat_rate_per_pod'] * params['n_pods']
         # Determine thermal resistance of outside via natural or forced convection
         # Prandtl # (Pr) = viscous diffusion rate / thermal diffusion rate = Cp * dyanamic viscosity / thermal conductivity
         # Pr << 1: thermal diffusivity dominates; Pr >> 1: momentum diffusivity dominates
-        # SI units (https://mdao.grc.nasa.gov/publications/Berton-Thesis.pdf pg51)
-        if params['temp_ambient'] < 400.0:
-            unknowns['GrDelTL3'] = 4.178e19 * params['temp_ambient'] ** -4.639
-            unknowns['Pr'] = 1.23 * params['temp_ambient'] ** -0.09685
-            unknowns['k'] = 0.0001423 * params['temp_ambient'] ** 0.9138
-        else:
-            unknowns['GrDelTL3'] = 4.985e18 * params['temp_ambient'] ** -4.284
-            unknowns['Pr'] = 0.59 * params['temp_ambient'] ** 0.0239
-            unknowns['k'] = 0.0002494 * params['temp_ambient'] ** 0.8152
-        # Grashof # (Gr) < 10^8: laminar; Gr > 10^9: turbulent
-        unknowns['Gr'] = unknowns['GrDelTL3'] * (params['temp_boundary'] - params['temp_ambient']) * (2.0 * params['r_tube_outer']) ** 3
-        # Rayleigh #: buoyancy driven flow (natural convection)
-        unknowns['Ra'] = unknowns['Pr'] * unknowns['Gr']
-        if unknowns['Ra'] <= 1e12: # valid in specific flow regime
-            # Nusselt # (Nu) = convective heat transfer / conductive heat transfer
-            unknowns['Nu'] = (0.6 + 0.387 * unknowns['Ra'] ** (1.0 / 6.0) / (1.0 + (0.559 / unknowns['Pr']) ** (9.0 / 16.0)) ** (8.0 / 27.0)) ** 2 # 3rd Ed. of Introduction to Heat Transfer by Incropera and DeWitt, equations (9.33) and (9.34) on page 465
-        else:
-            raise Exception('Rayleigh number outside of acceptable range.')
-        unknowns['h'] = unknowns['k'] * unknowns['Nu'] / (2.0 * params['r_tube_outer']) # h = k * Nu / characteristic length
+        unknowns['h'], unknowns['Gr'], unknowns['Ra'], unknowns['Nu'], unknowns['GrDelTL3'], \
+                unknowns['Pr'], unknowns['k'] = natural_convection(temp_boundary,
+                params['temp_ambient'], params['r_tube_outer'])
         unknowns['convection_area'] = pi * params['tube_len'] * 2.0 * params['r_tube_outer']
-        unknowns['Qradiated_nat_convection_per_area'] = unknowns['h'] * (params['temp_boundary'] - params['temp_ambient'])
+        unknowns['Qradiated_nat_convection_per_area'] = unknowns['h'] * (temp_boundary - params['temp_ambient'])
         unknowns['Qradiated_nat_convection_tot'] = unknowns['Qradiated_nat_convection_per_area'] * unknowns['convection_area']
         unknowns['area_viewing'] = params['tube_len'] * 2.0 * params['r_tube_outer'] # sun hits an effective rectangular cross section
-        unknowns['Qsolar_per_area'] = (1.0 - params['reflectance']) * params['nn_incidence_factor'] * params['insolation']
+        unknowns['Qsolar_per_area'] = solar_flux(params['insolation'], params['reflectance'],
+                params['nn_incidence_factor'])
         unknowns['Qsolar_tot'] = unknowns['Qsolar_per_area'] * unknowns['area_viewing']
         unknowns['radiating_area'] = unknowns['convection_area']
-        unknowns['Qradiated_per_area'] = params['sb_const'] * params['emissivity'] * (params['temp_boundary'] ** 4 - params['temp_ambient'] ** 4) # P / A = SB * emmisitivity * (T ** 4 - To ** 4)
+        unknowns['Qradiated_per_area'] = radiated_flux(temp_boundary,
+                params['temp_ambient'], params['emissivity'], params['sb_const'])
         unknowns['Qradiated_tot'] = unknowns['radiating_area'] * unknowns['Qradiated_per_area']
-        unknowns['Qout_tot'] = unknowns['Qradiated_tot'] + unknowns['Qradiated_nat_convection_per_area']
+        unknowns['Qout_tot'] = unknowns['Qradiated_tot'] + unknowns['Qradiated_nat_convection_tot']
         unknowns['Qin_tot'] = unknowns['Qsolar_tot'] + unknowns['heat_rate_tot']
-        unknowns['Q_resid'] = abs(unknowns['Qout_tot'] - unknowns['Qin_tot'])
+        unknowns['Q_resid_signed'] = unknowns['Qout_tot'] - unknowns['Qin_tot']
+        unknowns['Q_resid'] = abs(unknowns['Q_resid_signed'])
+        unknowns['dQ_dT'] = heat_balance(temp_boundary, *balance_args)[1]
 
 if __name__ == '__main__':
     from openmdao.core.group import Group
     from openmdao.core.problem import Problem
-    from openmdao.drivers.scipy_optimizer import ScipyOptimizer
-    from openmdao.components.param_comp import ParamComp
-    from openmdao.components.constraint import ConstraintComp
 
     g = Group()
-    p = Problem(root=g, driver=ScipyOptimizer())
-    p.driver.options['optimizer'] = 'COBYLA'
-
-    g.add('temp_boundary', ParamComp('T', 340.0))
-    g.add('tube_wall', TubeWallTemp())
-    g.connect('temp_boundary.T', 'tube_wall.temp_boundary')
-    g.add('con', ConstraintComp('temp_boundary > 305.7', out='out'))
-    g.connect('temp_boundary.T', 'con.temp_boundary')
-    
-    p.driver.add_param('temp_boundary.T', low=0.0, high=10000.0)
-    p.driver.add_objective('tube_wall.Q_resid')
-    p.driver.add_constraint('con.out')
+    p = Problem(root=g)
+    g.add('tube_wall', TubeWallTemp(mode='equilibrium'))
 
     p.setup()
 
@@ -137,6 +286,6 @@ if __name__ == '__main__':
 
     print '\nCompleted tube heat flux model calculations...\n'
     print 'Compress Q:             %g\nSolar Q:                %g\nRadiation Q:            %g\nConvection Q:           %g' % (g.tube_wall.unknowns['heat_rate_tot'], g.tube_wall.unknowns['Qsolar_tot'], g.tube_wall.unknowns['Qradiated_tot'], g.tube_wall.unknowns['Qradiated_nat_convection_tot'])
-    print 'Equilibrium wall temp.: %g K or %g F' % (g.unknowns['temp_boundary.T'], cu(g.unknowns['temp_boundary.T'], 'degK', 'degF'))
+    print 'Equilibrium wall temp.: %g K or %g F' % (g.tube_wall.unknowns['temp_equilibrium'], cu(g.tube_wall.unknowns['temp_equilibrium'], 'degK', 'degF'))
     print 'Ambient temp.:          %g K or %g F' % (g.tube_wall.params['temp_ambient'], cu(g.tube_wall.params['temp_ambient'], 'degK', 'degF'))
     print 'Q out:                  %g W\nQ in:                   %g W\nError:                  %3.9f%%\n' % (g.tube_wall.unknowns['Qout_tot'], g.tube_wall.unknowns['Qin_tot'], (g.tube_wall.unknowns['Qout_tot'] - g.tube_wall.unknowns['Qin_tot']) / g.tube_wall.unknowns['Qout_tot'] * 100.0)
@@ -0,0 +1,224 @@
+'''
+tube_wall_transient.py -
+    Time-marching, axially discretized temperature of the hyperloop tube
+    wall over a day/night cycle. Uses the heat transfer relations of
+    tube_wall_temp per segment and an implicit (backward Euler) step with a
+    tridiagonal solve, so that thousands of segments and a 24 hour day take
+    seconds.
+'''
+
+from math import pi
+
+import numpy as np
+from scipy.linalg import solve_banded
+
+from openmdao.core.component import Component
+
+from tube_wall_temp import natural_convection, solar_flux, radiated_flux
+
+DAY = 86400.0
+
+
+def diurnal_insolation(t, peak=1000.0, sunrise=6.0, sunset=18.0):
+    '''
+    Solar irradiation in W/m**2 at `t` seconds after midnight: a half sine
+    between `sunrise` and `sunset` (hours) peaking at `peak`, zero at night.
+    '''
+    hours = np.mod(t, DAY) / 3600.0
+    return peak * np.maximum(0.0, np.sin(pi * (hours - sunrise) / (sunset - sunrise))) * \
+            ((hours > sunrise) & (hours < sunset))
+
+
+def diurnal_ambient(t, mean=305.6, amplitude=6.0, hour_max=15.0):
+    '''Outside air temperature in degK at `t` seconds after midnight.'''
+    return mean + amplitude * np.cos(2.0 * pi * (np.mod(t, DAY) / 3600.0 - hour_max) / 24.0)
+
+
+def pod_heat_deposition(t, n_segments, tube_len, n_pods, heat_rate_per_pod, velocity=None,
+        dt=0.0):
+    '''
+    Average heat rate deposited in each segment by the pods over the
+    interval (t - dt, t], in W.
+
+    With a `velocity` (m/s), `n_pods` evenly spaced pods move along the tube
+    and heat the segments they pass in proportion to the time spent in
+    each; without one the pod heat is spread evenly along the tube, as in
+    the lumped TubeWallTemp.
+    '''
+    if velocity is None:
+        return np.full(n_segments, n_pods * heat_rate_per_pod / n_segments)
+    dx = tube_len / n_segments
+    n_sub = max(1, int(np.ceil(velocity * dt / dx)))
+    times = t - dt * (np.arange(n_sub) + 0.5) / n_sub
+    x = np.mod(np.arange(n_pods)[:, None] * tube_len / n_pods + velocity * times[None, :],
+            tube_len)
+    seg = np.minimum((x / dx).astype(int), n_segments - 1)
+    return np.bincount(seg.ravel(), minlength=n_segments) * (heat_rate_per_pod / n_sub)
+
+
+def simulate(n_segments=4000, duration=DAY, dt=60.0, tube_len=482803.0, r_tube_outer=1.11252,
+        wall_thickness=0.0254, rho_wall=7850.0, cp_wall=490.0, k_wall=45.0, n_pods=34,
+        heat_rate_per_pod=519763.0, pod_velocity=None, insolation=diurnal_insolation,
+        temp_ambient=diurnal_ambient, reflectance=0.5, nn_incidence_factor=0.7, emissivity=0.5,
+        sb_const=5.670373e-8, temp_init=None, t_start=0.0, save_every=60):
+    '''
+    Marches the wall temperature of every segment through time.
+
+    Each segment balances its heat capacity against axial conduction, solar
+    absorption on the sunlit projected width, pod heating, natural
+    convection and radiation to the outside air. The outside losses are
+    linearized about the current temperature and the step is backward Euler,
+    so every step is a single tridiagonal solve and large `dt` stay stable.
+    The tube ends are insulated.
+
+    Parameters
+    ----------
+    n_segments : int
+        Number of axial segments.
+    duration, dt : float
+        Simulated time and time step in s.
+    tube_len, r_tube_outer, wall_thickness : float
+        Tube length, outer radius and steel wall thickness in m.
+    rho_wall, cp_wall, k_wall : float
+        Wall density (kg/m**3), specific heat (J/kg/degK) and conductivity
+        (W/m/degK).
+    n_pods, heat_rate_per_pod, pod_velocity :
+        Passed to `pod_heat_deposition`; heat_rate_per_pod is in W, as
+        computed by TubeWallTemp.
+    insolation, temp_ambient : function or float
+        Irradiation (W/m**2) and outside air temperature (degK) as functions
+        of the time of day in s, or constants.
+    temp_init : float or numpy.array
+        Initial wall temperature in degK; defaults to the air temperature.
+    t_start : float
+        Time of day at the start in s.
+    save_every : int
+        Steps between saved temperature profiles.
+
+    Returns
+    -------
+    dict
+        'x' (segment centres, m), 't' and 'temp' (saved times in s and
+        profiles, shaped (len(t), n_segments), degK), 'temp_peak' and
+        't_peak' (per segment maximum and when it happened), 'temp_min' and
+        'temp_mean' (per segment).
+    '''
+    dx = tube_len / n_segments
+    x = (np.arange(n_segments) + 0.5) * dx
+    wall_area = pi * (r_tube_outer ** 2 - (r_tube_outer - wall_thickness) ** 2)
+    capacity = rho_wall * cp_wall * wall_area * dx # J/degK per segment
+    conductance = k_wall * wall_area / dx # W/degK between neighbouring segments
+    outside_area = 2.0 * pi * r_tube_outer * dx # convecting and radiating area per segment
+    viewing_area = 2.0 * r_tube_outer * dx # sun hits an effective rectangular cross section
+
+    if not callable(insolation):
+        insolation = (lambda value: lambda t: value)(insolation)
+    if not callable(temp_ambient):
+        temp_ambient = (lambda value: lambda t: value)(temp_ambient)
+
+    t = t_start
+    temp = np.empty(n_segments)
+    temp[:] = temp_ambient(t) if temp_init is None else temp_init
+
+    # tridiagonal conduction operator in solve_banded layout
+    bands = np.zeros((3, n_segments))
+    bands[0, 1:] = -conductance
+    bands[2, :-1] = -conductance
+    diag_cond = np.full(n_segments, 2.0 * conductance)
+    diag_cond[[0, -1]] = conductance
+
+    n_steps = int(round(duration / dt))
+    saved_t = [t]
+    saved = [temp.copy()]
+    temp_peak = temp.copy()
+    t_peak = np.full(n_segments, t)
+    temp_min = temp.copy()
+    temp_sum = np.zeros(n_segments)
+
+    for step in range(1, n_steps + 1):
+        t = t_start + step * dt
+        T_air = temp_ambient(t)
+        h = natural_convection(temp, T_air, r_tube_outer)[0]
+        # outside loss q(T) ~ q(T0) + dq/dT (T - T0), with h held at T0
+        q_out = outside_area * (h * (temp - T_air) +
+                radiated_flux(temp, T_air, emissivity, sb_const))
+        dq_dT = outside_area * (h + 4.0 * sb_const * emissivity * temp ** 3)
+        q_in = viewing_area * solar_flux(insolation(t), reflectance, nn_incidence_factor) + \
+                pod_heat_deposition(t, n_segments, tube_len, n_pods, heat_rate_per_pod,
+                pod_velocity, dt)
+
+        bands[1] = capacity / dt + diag_cond + dq_dT
+        rhs = capacity / dt * temp + q_in - q_out + dq_dT * temp
+        temp = solve_banded((1, 1), bands, rhs, check_finite=False)
+
+        later = temp > temp_peak
+        temp_peak = np.where(later, temp, temp_peak)
+        t_peak = np.where(later, t, t_peak)
+        temp_min = np.minimum(temp_min, temp)
+        temp_sum += temp
+        if step % save_every == 0 or step == n_steps:
+            saved_t.append(t)
+            saved.append(temp.copy())
+
+    return {'x': x, 't': np.array(saved_t), 'temp': np.array(saved), 'temp_peak': temp_peak,
+            't_peak': t_peak, 'temp_min': temp_min, 'temp_mean': temp_sum / max(n_steps, 1)}
+
+
+class TubeWallTransient(Component):
+    '''Diurnal peak, minimum and mean tube wall temperature from `simulate`'''
+    def __init__(self, n_segments=4000, duration=DAY, dt=60.0, n_days=2):
+        super(TubeWallTransient, self).__init__()
+        self.n_segments = n_segments
+        self.duration = duration
+        self.dt = dt
+        self.n_days = n_days # days simulated before the recorded one, so the cycle settles
+
+        self.add_param('r_tube_outer', 1.11252, desc='outer radius of tube', units='m')
+        self.add_param('tube_len', 482803.0, desc='length of one trip', units='m')
+        self.add_param('wall_thickness', 0.0254, desc='thickness of tube wall', units='m')
+        self.add_param('n_pods', 34, desc='number of Pods in the tube at a given time')
+        self.add_param('heat_rate_per_pod', 519763.0, desc='heating due to a single pod', units='W')
+        self.add_param('pod_velocity', 0.0, desc='pod speed; 0 spreads the pod heat evenly', units='m/s')
+        self.add_param('temp_ambient', 305.6, desc='average temperature of outside air', units='degK')
+        self.add_param('temp_ambient_amplitude', 6.0, desc='day/night swing of outside air temperature', units='degK')
+        self.add_param('insolation', 1000.0, desc='peak solar irradiation at noon', units='W/m**2')
+        self.add_param('nn_incidence_factor', 0.7, desc='non-normal incidence factor')
+        self.add_param('reflectance', 0.5, desc='solar reflectance index')
+        self.add_param('emissivity', 0.5, desc='emissivity of the tube')
+
+        self.add_output('temp_peak', 0.0, desc='highest wall temperature over the day', units='degK')
+        self.add_output('temp_min', 0.0, desc='lowest wall temperature over the day', units='degK')
+        self.add_output('temp_mean', 0.0, desc='time and length averaged wall temperature', units='degK')
+        self.add_output('hour_peak', 0.0, desc='time of day of the highest wall temperature', units='h')
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        kwargs = dict((name, params[name]) for name in ('r_tube_outer', 'tube_len',
+                'wall_thickness', 'n_pods', 'heat_rate_per_pod', 'reflectance',
+                'nn_incidence_factor', 'emissivity'))
+        kwargs['pod_velocity'] = params['pod_velocity'] or None
+        kwargs['insolation'] = lambda t: diurnal_insolation(t, params['insolation'])
+        kwargs['temp_ambient'] = lambda t: diurnal_ambient(t, params['temp_ambient'],
+                params['temp_ambient_amplitude'])
+        settle = simulate(self.n_segments, self.n_days * DAY, self.dt, save_every=10 ** 9,
+                **kwargs)
+        result = simulate(self.n_segments, self.duration, self.dt,
+                temp_init=settle['temp'][-1], save_every=10 ** 9, **kwargs)
+        i = np.argmax(result['temp_peak'])
+        unknowns['temp_peak'] = result['temp_peak'][i]
+        unknowns['hour_peak'] = np.mod(result['t_peak'][i], DAY) / 3600.0
+        unknowns['temp_min'] = np.min(result['temp_min'])
+        unknowns['temp_mean'] = np.mean(result['temp_mean'])
+
+
+if __name__ == '__main__':
+    from time import time
+
+    start = time()
+    settle = simulate(duration=2 * DAY, save_every=10 ** 9)
+    result = simulate(temp_init=settle['temp'][-1], pod_velocity=300.0)
+    i = np.argmax(result['temp_peak'])
+    print 'Simulated 3 days of %d segments in %.2f s' % (len(result['x']), time() - start)
+    print 'Peak wall temp.: %.2f K at %.1f km, %.1f h' % (result['temp_peak'][i],
+            result['x'][i] / 1000.0, np.mod(result['t_peak'][i], DAY) / 3600.0)
+    print 'Min. wall temp.: %.2f K' % result['temp_min'].min()
+    print 'Mean wall temp.: %.2f K' % result['temp_mean'].mean()
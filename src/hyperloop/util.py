@@ -0,0 +1,52 @@
+'''
+util.py -
+    Helpers for inspecting and restoring the variables of a set up OpenMDAO
+    problem.
+'''
+
+from openmdao.components.indep_var_comp import IndepVarComp
+
+
+def state_names(p):
+    '''Names of every implicit state in problem `p`, usable as p[name].'''
+    return [meta['top_promoted_name'] for meta in p.root._unknowns_dict.values()
+            if meta.get('state')]
+
+
+def input_names(p):
+    '''
+    Names of every boundary input of problem `p`, usable as p[name]: the
+    outputs of IndepVarComps and all params without a source.
+    '''
+    names = []
+    for comp in p.root.components(recurse=True):
+        if isinstance(comp, IndepVarComp):
+            for name in comp.unknowns:
+                names.append(p.root._unknowns_dict['%s.%s' % (comp.pathname, name)]
+                        ['top_promoted_name'])
+    connections = p._probdata.connections
+    for name, paths in p.root._sysdata.to_abs_pnames.items():
+        if not any(path in connections for path in paths):
+            names.append(name)
+    return names
+
+
+def set_unknowns(p, vec):
+    '''
+    Restores a copy of p.root.unknowns.vec and transfers it to every
+    connected param so that p[name] reads consistent values without a run.
+    '''
+    p.root.unknowns.vec[:] = vec
+    for group in p.root.subgroups(recurse=True, include_self=True):
+        group._transfer_data()
+
+
+def units(p, names):
+    '''
+    Units of the variables `names` of problem `p`, usable as p[name], keyed
+    by name; None for variables without units.
+    '''
+    meta = {}
+    for var in list(p.root._params_dict.values()) + list(p.root._unknowns_dict.values()):
+        meta[var['top_promoted_name']] = var
+    return dict((name, meta[name].get('units')) for name in names)
@@ -0,0 +1,174 @@
+'''
+vacuum.py -
+    Vacuum system of the tube: the time and energy to pump the tube down
+    from atmosphere and the steady pump power that makes up for leaks at
+    the operating tube pressure, for trading tube pressure against pump
+    effort.
+
+    Pump power is the isothermal compression power of the pumped gas from
+    the tube pressure to atmosphere, throughput * ln(P_atm / P) (throughput
+    in Pa*m**3/s is a power in W), divided by the pump efficiency.
+'''
+
+import numpy as np
+
+from openmdao.core.component import Component
+
+from geometry.tube_structure import TubeStructural
+
+P_ATM = 101325.0 # Pa
+
+# pumping speed relative to the nominal speed over inlet pressure (Pa) of a
+# roughing pump set: flat over most of the range, falling to zero at the
+# ultimate pressure
+PUMP_CURVE = (np.array([0.5, 1.0, 5.0, 10.0, 100.0, 1e4, P_ATM]),
+        np.array([0.0, 0.3, 0.8, 0.95, 1.0, 1.0, 0.9]))
+
+
+def pump_speed(P, n_pumps=500, speed_per_pump=0.5, curve=PUMP_CURVE):
+    '''Total pumping speed in m**3/s at tube pressures P (Pa).'''
+    return n_pumps * speed_per_pump * np.interp(np.log(P), np.log(curve[0]), curve[1])
+
+
+def pump_power(P, throughput, eff=0.3, P_atm=P_ATM):
+    '''Power in W to pump `throughput` (Pa*m**3/s) from pressure P (Pa) to P_atm.'''
+    return throughput * np.log(P_atm / P) / eff
+
+
+def pump_down(P_target, volume, leak=0.0, n_pumps=500, speed_per_pump=0.5, eff=0.3,
+        P_start=P_ATM, curve=PUMP_CURVE, n_points=400):
+    '''
+    Pump-down curve from P_start to P_target of a tube of `volume` (m**3)
+    with a `leak` throughput (Pa*m**3/s), from
+    volume * dP/dt = leak - pump_speed(P) * P
+    integrated in pressure on a logarithmic grid, so that the whole curve
+    is one cumulative sum. Arguments may be arrays, which are broadcast
+    against each other to evaluate many designs at once.
+
+    Returns
+    -------
+    dict
+        'P' (Pa), 't' (s), 'power' (W) and 'energy' (J, cumulative) along
+        the curve, shaped (n_points,) + the broadcast shape, 'time' and
+        'energy_total' at P_target, and 'reachable'. Designs whose pumps
+        cannot hold P_target against the leak are not reachable and get
+        infinite time and energy.
+    '''
+    P_target, volume, leak, n_pumps, speed_per_pump, eff, P_start = np.broadcast_arrays(
+            *[np.asarray(val, dtype=float) for val in (P_target, volume, leak, n_pumps,
+            speed_per_pump, eff, P_start)])
+    u = np.linspace(0.0, 1.0, n_points).reshape((-1,) + (1,) * P_target.ndim)
+    log_P = np.log(P_start) + u * (np.log(P_target) - np.log(P_start))
+    P = np.exp(log_P)
+    throughput = pump_speed(P, n_pumps, speed_per_pump, curve) * P
+    net = throughput - leak
+    with np.errstate(divide='ignore'):
+        # dt = volume dP / (pump_speed P - leak), with dP = P d(log P)
+        rate = np.where(net > 0.0, volume * P / np.where(net > 0.0, net, 1.0), np.inf)
+    d_log_P = -np.diff(log_P, axis=0)
+    t = np.concatenate((np.zeros((1,) + P_target.shape),
+            np.cumsum(0.5 * (rate[1:] + rate[:-1]) * d_log_P, axis=0)))
+    power = pump_power(P, throughput, eff)
+    with np.errstate(invalid='ignore'):
+        energy = np.concatenate((np.zeros((1,) + P_target.shape),
+                np.cumsum(0.5 * (power[1:] + power[:-1]) * np.diff(t, axis=0), axis=0)))
+    # past the pressure the pumps cannot get below, time and energy are infinite
+    # (np.diff of infinite times would give NaN)
+    energy = np.where(np.isinf(t), np.inf, energy)
+    return {'P': P, 't': t, 'power': power, 'energy': energy, 'time': t[-1],
+            'energy_total': energy[-1], 'reachable': np.isfinite(t[-1])}
+
+
+def leak_power(tube_P, leak, eff=0.3, P_atm=P_ATM):
+    '''Steady pump power in W that removes the `leak` throughput at tube_P.'''
+    return pump_power(tube_P, leak, eff, P_atm)
+
+
+class VacuumSystem(Component):
+    '''
+    Pump-down and steady leak make-up of the tube vacuum; all outputs are
+    closed form in the tube pressure except the pump-down, which integrates
+    `pump_down`.
+    '''
+    def __init__(self):
+        super(VacuumSystem, self).__init__()
+        self.add_param('tube_P', 99.0, desc='static pressure in tube', units='Pa')
+        self.add_param('tube_r', 0.9, desc='inner radius of tube', units='m')
+        self.add_param('fill_area', 0.214, desc='cross sectional area filled with solid e.g. concrete floor', units='m**2')
+        self.add_param('tube_len', 563270.0, desc='length of one tube', units='m')
+        self.add_param('leak_rate', 1.0, desc='air leaking into the tube per length of tube', units='Pa*m**3/s/km')
+        self.add_param('n_pumps', 500.0, desc='number of vacuum pumps')
+        self.add_param('speed_per_pump', 0.5, desc='nominal pumping speed of one pump', units='m**3/s')
+        self.add_param('pump_eff', 0.3, desc='isothermal efficiency of the pumps')
+        self.add_param('P_atm', P_ATM, desc='pressure the pumps exhaust to', units='Pa')
+
+        self.add_output('volume', 0.0, desc='evacuated volume of the tube', units='m**3')
+        self.add_output('leak', 0.0, desc='total leak throughput', units='Pa*m**3/s')
+        self.add_output('pwr_leak', 0.0, desc='steady pump power to hold tube_P', units='kW')
+        self.add_output('pump_margin', 0.0, desc='pumping throughput at tube_P over the leak')
+        self.add_output('time_pumpdown', 0.0, desc='time to pump the tube down from P_atm', units='s')
+        self.add_output('energy_pumpdown', 0.0, desc='energy to pump the tube down from P_atm', units='kW*h')
+        self.add_output('pwr_pumpdown', 0.0, desc='peak pump power during pump-down', units='kW')
+
+    def solve_nonlinear(self, params, unknowns, resids):
+        volume = TubeStructural.calc(params['tube_r'], params['fill_area'])[1] * params['tube_len']
+        leak = params['leak_rate'] * params['tube_len'] / 1000.0
+        unknowns['volume'] = volume
+        unknowns['leak'] = leak
+        unknowns['pwr_leak'] = leak_power(params['tube_P'], leak, params['pump_eff'],
+                params['P_atm']) / 1000.0
+        unknowns['pump_margin'] = pump_speed(params['tube_P'], params['n_pumps'],
+                params['speed_per_pump']) * params['tube_P'] / leak
+
+        curve = pump_down(params['tube_P'], volume, leak, params['n_pumps'],
+                params['speed_per_pump'], params['pump_eff'], params['P_atm'])
+        unknowns['time_pumpdown'] = curve['time']
+        unknowns['energy_pumpdown'] = curve['energy_total'] / 3.6e6
+        unknowns['pwr_pumpdown'] = np.max(curve['power']) / 1000.0
+
+
+def tube_pressure_sweep(tube_P, trips_per_day=100.0, days=365.0, pumpdowns_per_year=1.0,
+        trip_len=563270.0, p=None):
+    '''
+    Yearly energy of pods and vacuum pumps over tube pressures, for picking
+    the tube pressure with the least total. Runs HyperloopSim.run_batch
+    over `tube_P` (the vacuum outputs come with every point, since
+    HyperloopSim includes a VacuumSystem) and adds the pod energy per trip
+    from multipoint.trip_energy.
+
+    Returns
+    -------
+    numpy.array
+        Records of 'tube_P' (Pa), 'pod_energy' (kW*h per trip), 'pwr_leak'
+        (kW), 'energy_pumpdown' (kW*h), 'energy_year' (kW*h) and 'failed',
+        which is also set where the pumps cannot reach tube_P.
+    '''
+    from hyperloop_sim import HyperloopSim
+    from multipoint import ENERGY_VARNAMES, trip_energy
+
+    batch = HyperloopSim.run_batch({'tube_P': tube_P}, ENERGY_VARNAMES +
+            ('vacuum.pwr_leak', 'vacuum.energy_pumpdown'), p)
+    pod_energy = trip_energy(*[batch[name] for name in ENERGY_VARNAMES[:4]],
+            trip_len=trip_len, gamma=batch['tube_flow.gamma'], R=batch['tube_flow.R'])
+
+    result = np.zeros(batch.shape, dtype=[(name, float) for name in ('tube_P', 'pod_energy',
+            'pwr_leak', 'energy_pumpdown', 'energy_year')] + [('failed', bool)])
+    result['tube_P'] = batch['tube_P']
+    result['pod_energy'] = pod_energy
+    result['pwr_leak'] = batch['vacuum.pwr_leak']
+    result['energy_pumpdown'] = batch['vacuum.energy_pumpdown']
+    result['energy_year'] = (pod_energy * trips_per_day + batch['vacuum.pwr_leak'] * 24.0) * \
+            days + pumpdowns_per_year * batch['vacuum.energy_pumpdown']
+    result['failed'] = batch['failed'] | np.isinf(batch['vacuum.energy_pumpdown'])
+    return result
+
+
+if __name__ == '__main__':
+    volume = TubeStructural.calc(0.9, 0.214)[1] * 563270.0
+    leak = 1.0 * 563.270
+    tube_P = np.array([10.0, 30.0, 100.0, 300.0, 1000.0])
+    curve = pump_down(tube_P, volume, leak)
+    print '%10s %12s %14s %12s' % ('tube_P', 'pump-down h', 'pump-down MWh', 'leak kW')
+    for row in zip(tube_P, curve['time'] / 3600.0, curve['energy_total'] / 3.6e9,
+            leak_power(tube_P, leak) / 1000.0):
+        print '%10.1f %12.2f %14.2f %12.2f' % row